@@ -0,0 +1,89 @@
+-- Agent session storage and atomic state merge
+-- Migration: 20250601_agent_sessions
+
+-- Sessions used by SupabaseMemoryService
+CREATE TABLE IF NOT EXISTS instabids.agent_sessions (
+    id TEXT PRIMARY KEY,
+    app_name VARCHAR(100) NOT NULL,
+    user_id TEXT NOT NULL,
+    state JSONB NOT NULL DEFAULT '{}'::JSONB,
+    version INTEGER NOT NULL DEFAULT 0,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT now()
+);
+
+-- Tables created before versioning get the column added
+ALTER TABLE instabids.agent_sessions
+    ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 0;
+
+CREATE INDEX IF NOT EXISTS agent_sessions_app_user_idx
+    ON instabids.agent_sessions(app_name, user_id);
+
+-- Events appended to agent sessions
+CREATE TABLE IF NOT EXISTS instabids.agent_events (
+    id BIGSERIAL PRIMARY KEY,
+    session_id TEXT NOT NULL REFERENCES instabids.agent_sessions(id) ON DELETE CASCADE,
+    invocation_id TEXT,
+    author TEXT,
+    timestamp DOUBLE PRECISION,
+    event_data JSONB,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS agent_events_session_timestamp_idx
+    ON instabids.agent_events(session_id, timestamp, id);
+
+DROP TRIGGER IF EXISTS update_agent_sessions_modtime ON instabids.agent_sessions;
+CREATE TRIGGER update_agent_sessions_modtime
+BEFORE UPDATE ON instabids.agent_sessions
+FOR EACH ROW EXECUTE FUNCTION update_modified_column();
+
+-- Merge a state delta into a session in a single statement.
+--
+-- The delta is merged server-side with the JSONB || operator, so concurrent
+-- writers touching different keys never lose each other's updates. When
+-- p_expected_version is given the merge only applies if the session is still
+-- at that version; otherwise a serialization_failure (SQLSTATE 40001) is raised
+-- so the caller can reload the session and retry.
+--
+-- Rows written before this migration stored state as a JSON string; those are
+-- unwrapped to an object before merging.
+--
+-- Returns the new version of the session.
+CREATE OR REPLACE FUNCTION public.merge_agent_session_state(
+    p_session_id TEXT,
+    p_state_delta JSONB,
+    p_expected_version INTEGER DEFAULT NULL
+)
+RETURNS INTEGER AS $$
+DECLARE
+    new_version INTEGER;
+BEGIN
+    UPDATE instabids.agent_sessions AS s
+    SET state = (
+            CASE
+                WHEN jsonb_typeof(s.state) = 'string' THEN (s.state #>> '{}')::JSONB
+                ELSE coalesce(s.state, '{}'::JSONB)
+            END
+        ) || p_state_delta,
+        version = s.version + 1
+    WHERE s.id = p_session_id
+      AND (p_expected_version IS NULL OR s.version = p_expected_version)
+    RETURNING s.version INTO new_version;
+
+    IF NOT FOUND THEN
+        IF EXISTS (SELECT 1 FROM instabids.agent_sessions WHERE id = p_session_id) THEN
+            RAISE EXCEPTION 'agent session % was modified concurrently (expected version %)',
+                p_session_id, p_expected_version
+                USING ERRCODE = '40001';
+        END IF;
+        RAISE EXCEPTION 'agent session % not found', p_session_id
+            USING ERRCODE = 'P0002';
+    END IF;
+
+    RETURN new_version;
+END;
+$$ LANGUAGE plpgsql;
+
+ALTER TABLE instabids.agent_sessions ENABLE ROW LEVEL SECURITY;
+ALTER TABLE instabids.agent_events ENABLE ROW LEVEL SECURITY;
@@ -0,0 +1,63 @@
+-- Session snapshots and event-log compaction
+-- Migration: 20250610_agent_session_snapshots
+
+-- State a session was created with: the base the first snapshot is folded onto
+ALTER TABLE instabids.agent_sessions
+    ADD COLUMN IF NOT EXISTS initial_state JSONB NOT NULL DEFAULT '{}'::JSONB;
+
+-- Latest snapshot per session: state folded from all events up to the watermark
+CREATE TABLE IF NOT EXISTS instabids.agent_session_snapshots (
+    session_id TEXT PRIMARY KEY REFERENCES instabids.agent_sessions(id) ON DELETE CASCADE,
+    state JSONB NOT NULL DEFAULT '{}'::JSONB,
+    watermark_timestamp DOUBLE PRECISION NOT NULL,
+    watermark_id BIGINT NOT NULL,
+    event_count INTEGER NOT NULL DEFAULT 0,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT now()
+);
+
+-- Compacted events, kept out of the hot agent_events table
+CREATE TABLE IF NOT EXISTS instabids.agent_events_archive (
+    LIKE instabids.agent_events INCLUDING DEFAULTS,
+    archived_at TIMESTAMP WITH TIME ZONE DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS agent_events_archive_session_idx
+    ON instabids.agent_events_archive(session_id, timestamp, id);
+
+-- Remove a session's events up to and including the watermark (timestamp, id),
+-- moving them to agent_events_archive when p_archive is true.
+-- Returns the number of events removed.
+CREATE OR REPLACE FUNCTION public.compact_agent_session_events(
+    p_session_id TEXT,
+    p_watermark_timestamp DOUBLE PRECISION,
+    p_watermark_id BIGINT,
+    p_archive BOOLEAN DEFAULT TRUE
+)
+RETURNS INTEGER AS $$
+DECLARE
+    removed INTEGER;
+BEGIN
+    IF p_archive THEN
+        WITH moved AS (
+            DELETE FROM instabids.agent_events
+            WHERE session_id = p_session_id
+              AND (timestamp, id) <= (p_watermark_timestamp, p_watermark_id)
+            RETURNING *
+        )
+        INSERT INTO instabids.agent_events_archive
+            (id, session_id, invocation_id, author, timestamp, event_data, created_at)
+        SELECT id, session_id, invocation_id, author, timestamp, event_data, created_at
+        FROM moved;
+    ELSE
+        DELETE FROM instabids.agent_events
+        WHERE session_id = p_session_id
+          AND (timestamp, id) <= (p_watermark_timestamp, p_watermark_id);
+    END IF;
+
+    GET DIAGNOSTICS removed = ROW_COUNT;
+    RETURN removed;
+END;
+$$ LANGUAGE plpgsql;
+
+ALTER TABLE instabids.agent_session_snapshots ENABLE ROW LEVEL SECURITY;
+ALTER TABLE instabids.agent_events_archive ENABLE ROW LEVEL SECURITY;
@@ -0,0 +1,43 @@
+-- Binary event payloads
+-- Migration: 20250620_agent_event_blobs
+
+-- Event content and actions encoded by the session service's event codec.
+-- Rows written before this migration keep their JSON event_data.
+ALTER TABLE instabids.agent_events
+    ADD COLUMN IF NOT EXISTS event_blob BYTEA;
+
+ALTER TABLE instabids.agent_events_archive
+    ADD COLUMN IF NOT EXISTS event_blob BYTEA;
+
+-- Same as 20250610_agent_session_snapshots, also archiving event_blob
+CREATE OR REPLACE FUNCTION public.compact_agent_session_events(
+    p_session_id TEXT,
+    p_watermark_timestamp DOUBLE PRECISION,
+    p_watermark_id BIGINT,
+    p_archive BOOLEAN DEFAULT TRUE
+)
+RETURNS INTEGER AS $$
+DECLARE
+    removed INTEGER;
+BEGIN
+    IF p_archive THEN
+        WITH moved AS (
+            DELETE FROM instabids.agent_events
+            WHERE session_id = p_session_id
+              AND (timestamp, id) <= (p_watermark_timestamp, p_watermark_id)
+            RETURNING *
+        )
+        INSERT INTO instabids.agent_events_archive
+            (id, session_id, invocation_id, author, timestamp, event_data, event_blob, created_at)
+        SELECT id, session_id, invocation_id, author, timestamp, event_data, event_blob, created_at
+        FROM moved;
+    ELSE
+        DELETE FROM instabids.agent_events
+        WHERE session_id = p_session_id
+          AND (timestamp, id) <= (p_watermark_timestamp, p_watermark_id);
+    END IF;
+
+    GET DIAGNOSTICS removed = ROW_COUNT;
+    RETURN removed;
+END;
+$$ LANGUAGE plpgsql;
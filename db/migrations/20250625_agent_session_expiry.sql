@@ -0,0 +1,25 @@
+-- Idle session expiry support
+-- Migration: 20250625_agent_session_expiry
+
+-- Expired-session scans read the least recently active sessions first
+CREATE INDEX IF NOT EXISTS agent_sessions_updated_at_idx
+    ON instabids.agent_sessions(updated_at);
+
+-- Appending events counts as session activity. A statement-level trigger
+-- touches each session once per insert statement, so bulk event writes cost
+-- one UPDATE per session rather than one per event.
+CREATE OR REPLACE FUNCTION instabids.touch_agent_sessions_on_event()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE instabids.agent_sessions AS s
+    SET updated_at = now()
+    WHERE s.id IN (SELECT DISTINCT session_id FROM new_events);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS touch_agent_sessions_on_event ON instabids.agent_events;
+CREATE TRIGGER touch_agent_sessions_on_event
+AFTER INSERT ON instabids.agent_events
+REFERENCING NEW TABLE AS new_events
+FOR EACH STATEMENT EXECUTE FUNCTION instabids.touch_agent_sessions_on_event();
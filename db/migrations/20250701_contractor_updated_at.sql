@@ -0,0 +1,7 @@
+-- Contractor index refresh support
+-- Migration: 20250701_contractor_updated_at
+
+-- The in-process contractor index fetches contractors changed since its
+-- last refresh, ordered by updated_at
+CREATE INDEX IF NOT EXISTS contractors_updated_at_idx
+    ON instabids.contractors(updated_at);
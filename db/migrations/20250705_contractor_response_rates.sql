@@ -0,0 +1,20 @@
+-- Contractor ranking support
+-- Migration: 20250705_contractor_response_rates
+
+-- Invitation counts per contractor since p_since, aggregated in the database
+-- so the contractor index loads one row per contractor instead of every
+-- invitation. An invitation counts as answered once it has any response.
+CREATE OR REPLACE FUNCTION public.contractor_response_rates(
+    p_since TIMESTAMP WITH TIME ZONE
+)
+RETURNS TABLE (contractor_id UUID, invited BIGINT, responded BIGINT) AS $$
+    SELECT i.contractor_id,
+           count(*) AS invited,
+           count(i.response) AS responded
+    FROM instabids.invitations AS i
+    WHERE i.invitation_sent_at >= p_since
+    GROUP BY i.contractor_id;
+$$ LANGUAGE sql STABLE;
+
+CREATE INDEX IF NOT EXISTS invitations_sent_at_idx
+    ON instabids.invitations(invitation_sent_at);
@@ -0,0 +1,42 @@
+-- Native JSONB bid card columns
+-- Migration: 20250710_bid_card_native_jsonb
+
+-- The tools used to json.dumps the JSONB columns of bid_cards, so those rows
+-- hold a JSON string (e.g. '"{\"city\": \"Austin\"}"') instead of an object.
+-- They now send native JSON; this converts the rows already written. Strings
+-- that are not encoded JSON are left as they are.
+CREATE OR REPLACE FUNCTION pg_temp.unwrap_jsonb_string(value JSONB)
+RETURNS JSONB AS $$
+BEGIN
+    -- Only objects, arrays and strings were written encoded, as in the
+    -- decoder in tools/bid_card_codec.py
+    IF jsonb_typeof(value) IS DISTINCT FROM 'string'
+       OR left(value #>> '{}', 1) NOT IN ('{', '[', '"') THEN
+        RETURN value;
+    END IF;
+    RETURN (value #>> '{}')::JSONB;
+EXCEPTION WHEN invalid_text_representation THEN
+    RETURN value;
+END;
+$$ LANGUAGE plpgsql IMMUTABLE;
+
+-- The conversion does not change any bid card, so it records no revisions
+ALTER TABLE instabids.bid_cards DISABLE TRIGGER track_bid_card_changes;
+
+UPDATE instabids.bid_cards
+SET location = pg_temp.unwrap_jsonb_string(location),
+    timeline = pg_temp.unwrap_jsonb_string(timeline),
+    budget_range = pg_temp.unwrap_jsonb_string(budget_range),
+    materials_preferences = pg_temp.unwrap_jsonb_string(materials_preferences),
+    accessibility_needs = pg_temp.unwrap_jsonb_string(accessibility_needs),
+    scheduling_constraints = pg_temp.unwrap_jsonb_string(scheduling_constraints),
+    image_analysis_results = pg_temp.unwrap_jsonb_string(image_analysis_results)
+WHERE jsonb_typeof(location) = 'string'
+   OR jsonb_typeof(timeline) = 'string'
+   OR jsonb_typeof(budget_range) = 'string'
+   OR jsonb_typeof(materials_preferences) = 'string'
+   OR jsonb_typeof(accessibility_needs) = 'string'
+   OR jsonb_typeof(scheduling_constraints) = 'string'
+   OR jsonb_typeof(image_analysis_results) = 'string';
+
+ALTER TABLE instabids.bid_cards ENABLE TRIGGER track_bid_card_changes;
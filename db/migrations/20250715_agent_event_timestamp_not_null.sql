@@ -0,0 +1,14 @@
+-- Non-null agent event timestamps
+-- Migration: 20250715_agent_event_timestamp_not_null
+
+-- Event pages are read with a (timestamp, id) keyset cursor, and the service
+-- reads a missing timestamp as 0. A NULL timestamp sorts after every other
+-- row but its cursor compares as 0, so the next page started over from the
+-- beginning of the session. Store 0 instead, as the service reads it.
+UPDATE instabids.agent_events SET timestamp = 0 WHERE timestamp IS NULL;
+UPDATE instabids.agent_events_archive SET timestamp = 0 WHERE timestamp IS NULL;
+
+ALTER TABLE instabids.agent_events ALTER COLUMN timestamp SET DEFAULT 0;
+ALTER TABLE instabids.agent_events ALTER COLUMN timestamp SET NOT NULL;
+ALTER TABLE instabids.agent_events_archive ALTER COLUMN timestamp SET DEFAULT 0;
+ALTER TABLE instabids.agent_events_archive ALTER COLUMN timestamp SET NOT NULL;
@@ -8,6 +8,7 @@ from google.genai import types
 
 from .instruction import HOMEOWNER_AGENT_INSTRUCTION
 from ...tools.database_tools import save_bid_card
+from ...tools.async_database_tools import use_async_tools
 from ...tools.vision_tools import analyze_image
 from .tools.bid_card_tools import generate_bid_card
 
@@ -31,5 +32,10 @@ root_agent = Agent(
     output_key="last_response"  # Auto-save agent's response to state
 )
 
+# Under an asyncio server, use the async database tools so a tool call
+# waiting on the database does not block other conversations
+if os.environ.get("ASYNC_DATABASE_TOOLS", "").lower() in ("1", "true"):
+    use_async_tools(root_agent)
+
 # Export the agent as per ADK convention
 homeowner_agent = root_agent
\ No newline at end of file
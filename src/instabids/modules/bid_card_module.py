@@ -9,7 +9,7 @@ import uuid
 import json
 from datetime import datetime
 
-from ..tools.database_tools import save_bid_card, get_bid_card
+from ..tools.database_tools import save_bid_card, get_bid_card, invalidate_bid_cards
 
 class BidCardModule:
     """
@@ -228,6 +228,10 @@ class BidCardModule:
                 "bid_card": None
             }
         
+        # Drop the cached copy under the original ID too, in case the
+        # updates changed the card's ID
+        invalidate_bid_cards([bid_card_id])
+        
         # Return the result
         return {
             "status": "success",
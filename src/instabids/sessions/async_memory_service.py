@@ -0,0 +1,489 @@
+"""
+Asyncio session services for ADK agents.
+
+Async counterparts of InMemorySessionService and SupabaseMemoryService with
+the same semantics, for use inside FastAPI/uvicorn workers and the ADK runner
+where a blocking database call would stall every other conversation on the
+event loop. With these, one worker can have many sessions' I/O in flight at
+the same time.
+
+AsyncSupabaseMemoryService uses supabase's async client when it is available
+and otherwise falls back to running a SupabaseMemoryService on the default
+thread pool.
+"""
+import asyncio
+import os
+from typing import Any, Dict, List, Optional
+
+from google.adk.session import Session
+
+from .event_codec import BinaryEventCodec, EventCodec
+from .memory_service import (
+    InMemorySessionService,
+    SupabaseMemoryService,
+    SessionConflictError,
+    _VERSION_CONFLICT_SQLSTATE,
+    _decode_state,
+    _event_to_row,
+    _get_version,
+    _row_to_event,
+    _set_version,
+)
+from ..utils.db_metrics import db_session, db_tags, execute_async
+from ..utils.logging import get_default_logger
+from ..utils.supabase_client import get_async_supabase_client
+
+logger = get_default_logger()
+
+
+class AsyncInMemorySessionService:
+    """
+    Async wrapper around InMemorySessionService.
+    
+    In-memory operations never wait on I/O, so they run directly on the
+    event loop; that also serializes them, which the underlying
+    (non thread-safe) service requires. Extra attributes of the wrapped
+    service (e.g. ``list_events_page``) are available through ``service``.
+    """
+    
+    def __init__(self, service: Optional[InMemorySessionService] = None):
+        """
+        Initialize the async in-memory session service.
+        
+        Args:
+            service: Service to wrap; a new unbounded one if None
+        """
+        self.service = service or InMemorySessionService()
+    
+    async def create_session(
+        self, app_name: str, user_id: str, state: Optional[Dict[str, Any]] = None
+    ) -> Session:
+        """
+        Create a new session.
+        
+        Args:
+            app_name: Name of the application
+            user_id: User identifier
+            state: Initial state for the session
+            
+        Returns:
+            The created session
+        """
+        return self.service.create_session(app_name, user_id, state)
+    
+    async def get_session(self, app_name: str, user_id: str, session_id: str) -> Optional[Session]:
+        """
+        Get an existing session.
+        
+        Args:
+            app_name: Name of the application
+            user_id: User identifier
+            session_id: Session identifier
+            
+        Returns:
+            The session if found, None otherwise
+        """
+        return self.service.get_session(app_name, user_id, session_id)
+    
+    async def list_sessions(self, app_name: str, user_id: str) -> List[str]:
+        """
+        List all sessions for a user.
+        
+        Args:
+            app_name: Name of the application
+            user_id: User identifier
+            
+        Returns:
+            List of session IDs
+        """
+        return self.service.list_sessions(app_name, user_id)
+    
+    async def delete_session(self, app_name: str, user_id: str, session_id: str) -> bool:
+        """
+        Delete a session.
+        
+        Args:
+            app_name: Name of the application
+            user_id: User identifier
+            session_id: Session identifier
+            
+        Returns:
+            True if the session was deleted, False otherwise
+        """
+        return self.service.delete_session(app_name, user_id, session_id)
+    
+    async def append_event(self, session: Session, event: Any) -> None:
+        """
+        Append an event to a session.
+        
+        Args:
+            session: The session to append the event to
+            event: The event to append
+        """
+        self.service.append_event(session, event)
+    
+    async def list_events(self, app_name: str, user_id: str, session_id: str) -> List[Any]:
+        """
+        List all events for a session.
+        
+        Args:
+            app_name: Name of the application
+            user_id: User identifier
+            session_id: Session identifier
+            
+        Returns:
+            List of events
+        """
+        return self.service.list_events(app_name, user_id, session_id)
+
+
+class AsyncSupabaseMemoryService:
+    """
+    Async Supabase-backed session service.
+    
+    Create instances with ``await AsyncSupabaseMemoryService.create()``.
+    State deltas are merged server-side with the same version guard as
+    SupabaseMemoryService, and a stale writer gets SessionConflictError.
+    """
+    
+    def __init__(
+        self,
+        client: Any = None,
+        sync_service: Optional[SupabaseMemoryService] = None,
+        codec: Optional[EventCodec] = None
+    ):
+        """
+        Initialize the service around an async client or a sync fallback.
+        
+        Args:
+            client: A supabase AsyncClient
+            sync_service: SupabaseMemoryService to run on the thread pool instead
+            codec: Codec for stored event payloads; BinaryEventCodec if None
+            
+        Raises:
+            ValueError: If neither or both of client and sync_service are given
+        """
+        if (client is None) == (sync_service is None):
+            raise ValueError("Exactly one of client and sync_service must be given")
+        
+        self.supabase = client
+        self._sync = sync_service
+        self.codec = codec or BinaryEventCodec()
+    
+    @classmethod
+    async def create(cls, codec: Optional[EventCodec] = None) -> "AsyncSupabaseMemoryService":
+        """
+        Create the service from SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY.
+        
+        Args:
+            codec: Codec for stored event payloads; BinaryEventCodec if None
+        
+        Returns:
+            A service using the async client, or the thread-pool fallback if
+            the installed supabase package has no async client
+            
+        Raises:
+            ValueError: If the Supabase credentials are not set
+        """
+        url = os.environ.get("SUPABASE_URL")
+        key = os.environ.get("SUPABASE_SERVICE_ROLE_KEY")
+        
+        if not url or not key:
+            raise ValueError("SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY must be set")
+        
+        client = await get_async_supabase_client(url, key)
+        if client is None:
+            logger.warning("supabase async client unavailable, using thread-pool fallback")
+            sync_service = await asyncio.to_thread(SupabaseMemoryService, codec=codec)
+            return cls(sync_service=sync_service, codec=codec)
+        
+        logger.info("Initialized AsyncSupabaseMemoryService")
+        return cls(client=client, codec=codec)
+    
+    async def create_session(
+        self, app_name: str, user_id: str, state: Optional[Dict[str, Any]] = None
+    ) -> Session:
+        """
+        Create a new session.
+        
+        Args:
+            app_name: Name of the application
+            user_id: User identifier
+            state: Initial state for the session
+            
+        Returns:
+            The created session
+        """
+        if self._sync is not None:
+            return await asyncio.to_thread(self._sync.create_session, app_name, user_id, state)
+        
+        session = Session(
+            app_name=app_name,
+            user_id=user_id,
+            state=state or {}
+        )
+        
+        query = self.supabase.table("instabids.agent_sessions").insert({
+            "id": session.id,
+            "app_name": app_name,
+            "user_id": user_id,
+            "state": session.state,
+            "initial_state": session.state
+        })
+        with db_tags(session_id=session.id):
+            await execute_async(query, "instabids.agent_sessions", "insert")
+        _set_version(session, 0)
+        
+        logger.info(f"Created session: {session.id} for user: {user_id}")
+        return session
+    
+    @db_session
+    async def get_session(self, app_name: str, user_id: str, session_id: str) -> Optional[Session]:
+        """
+        Get an existing session.
+        
+        Args:
+            app_name: Name of the application
+            user_id: User identifier
+            session_id: Session identifier
+            
+        Returns:
+            The session if found, None otherwise
+        """
+        if self._sync is not None:
+            return await asyncio.to_thread(self._sync.get_session, app_name, user_id, session_id)
+        
+        query = self.supabase.table("instabids.agent_sessions") \
+            .select("*") \
+            .eq("id", session_id)
+        result = await execute_async(query, "instabids.agent_sessions", "select")
+        
+        if not result.data:
+            logger.warning(f"Session not found: {session_id}")
+            return None
+        
+        session_data = result.data[0]
+        
+        # Verify app_name and user_id
+        if session_data["app_name"] != app_name or session_data["user_id"] != user_id:
+            logger.warning(
+                f"Session {session_id} does not match app_name={app_name} "
+                f"and user_id={user_id}"
+            )
+            return None
+        
+        session = Session(
+            id=session_id,
+            app_name=app_name,
+            user_id=user_id,
+            state=_decode_state(session_data["state"])
+        )
+        _set_version(session, session_data.get("version", 0))
+        return session
+    
+    async def list_sessions(self, app_name: str, user_id: str) -> List[str]:
+        """
+        List all sessions for a user.
+        
+        Args:
+            app_name: Name of the application
+            user_id: User identifier
+            
+        Returns:
+            List of session IDs
+        """
+        if self._sync is not None:
+            return await asyncio.to_thread(self._sync.list_sessions, app_name, user_id)
+        
+        query = self.supabase.table("instabids.agent_sessions") \
+            .select("id") \
+            .eq("app_name", app_name) \
+            .eq("user_id", user_id)
+        result = await execute_async(query, "instabids.agent_sessions", "select")
+        
+        return [item["id"] for item in result.data or []]
+    
+    @db_session
+    async def delete_session(self, app_name: str, user_id: str, session_id: str) -> bool:
+        """
+        Delete a session and its events.
+        
+        Args:
+            app_name: Name of the application
+            user_id: User identifier
+            session_id: Session identifier
+            
+        Returns:
+            True if the session was deleted, False otherwise
+        """
+        if self._sync is not None:
+            return await asyncio.to_thread(
+                self._sync.delete_session, app_name, user_id, session_id
+            )
+        
+        if not await self._verify_session_owner(app_name, user_id, session_id):
+            logger.warning(
+                f"Cannot delete session {session_id}: not found or does not match "
+                f"app_name={app_name} and user_id={user_id}"
+            )
+            return False
+        
+        # The two deletes are independent, so issue them concurrently
+        await asyncio.gather(
+            execute_async(
+                self.supabase.table("instabids.agent_sessions").delete().eq("id", session_id),
+                "instabids.agent_sessions", "delete"
+            ),
+            execute_async(
+                self.supabase.table("instabids.agent_events").delete().eq("session_id", session_id),
+                "instabids.agent_events", "delete"
+            ),
+        )
+        
+        logger.info(f"Deleted session: {session_id}")
+        return True
+    
+    @db_session
+    async def append_event(self, session: Session, event: Any) -> None:
+        """
+        Append an event to a session.
+        
+        Args:
+            session: The session to append the event to
+            event: The event to append
+            
+        Raises:
+            SessionConflictError: If another writer changed the session's state
+                since the session object was loaded
+        """
+        if self._sync is not None:
+            return await asyncio.to_thread(self._sync.append_event, session, event)
+        
+        event_data = _event_to_row(session.id, event, self.codec)
+        
+        state_delta = None
+        if hasattr(event, "actions") and hasattr(event.actions, "state_delta"):
+            state_delta = event.actions.state_delta
+        
+        # Merge state first so a version conflict leaves no orphaned event
+        if state_delta:
+            expected_version = _get_version(session)
+            if expected_version is None:
+                # Not loaded through this backend (e.g. served from a cache)
+                expected_version = await self._load_version(session.id)
+            version = await self._merge_state(session.id, state_delta, expected_version)
+            if version is not None:
+                _set_version(session, version)
+        
+        query = self.supabase.table("instabids.agent_events").insert(event_data)
+        await execute_async(query, "instabids.agent_events", "insert")
+        
+        if state_delta:
+            for key, value in state_delta.items():
+                session.state[key] = value
+        
+        logger.debug(f"Appended event to session: {session.id}")
+    
+    @db_session
+    async def list_events(self, app_name: str, user_id: str, session_id: str) -> List[Any]:
+        """
+        List all events for a session.
+        
+        Args:
+            app_name: Name of the application
+            user_id: User identifier
+            session_id: Session identifier
+            
+        Returns:
+            List of events
+        """
+        if self._sync is not None:
+            return await asyncio.to_thread(self._sync.list_events, app_name, user_id, session_id)
+        
+        if not await self._verify_session_owner(app_name, user_id, session_id):
+            logger.warning(
+                f"Cannot list events for session {session_id}: not found or does not match "
+                f"app_name={app_name} and user_id={user_id}"
+            )
+            return []
+        
+        query = self.supabase.table("instabids.agent_events") \
+            .select("*") \
+            .eq("session_id", session_id) \
+            .order("timestamp") \
+            .order("id")
+        events_result = await execute_async(query, "instabids.agent_events", "select")
+        
+        return [_row_to_event(event_data, self.codec) for event_data in events_result.data or []]
+    
+    @db_session
+    async def _verify_session_owner(self, app_name: str, user_id: str, session_id: str) -> bool:
+        """
+        Check that a session exists and belongs to the user/app.
+        
+        Args:
+            app_name: Name of the application
+            user_id: User identifier
+            session_id: Session identifier
+            
+        Returns:
+            True if the session exists and matches
+        """
+        query = self.supabase.table("instabids.agent_sessions") \
+            .select("id") \
+            .eq("id", session_id) \
+            .eq("app_name", app_name) \
+            .eq("user_id", user_id)
+        result = await execute_async(query, "instabids.agent_sessions", "select")
+        return bool(result.data)
+    
+    @db_session
+    async def _merge_state(
+        self, session_id: str, state_delta: Dict[str, Any], expected_version: Optional[int]
+    ) -> Optional[int]:
+        """
+        Merge a state delta into a stored session with a single RPC.
+        
+        Args:
+            session_id: Session identifier
+            state_delta: Keys to merge into the session state
+            expected_version: Only merge if the session is at this version
+            
+        Returns:
+            The session's new version, if the RPC reported one
+            
+        Raises:
+            SessionConflictError: If the session is no longer at expected_version
+        """
+        try:
+            query = self.supabase.rpc("merge_agent_session_state", {
+                "p_session_id": session_id,
+                "p_state_delta": state_delta,
+                "p_expected_version": expected_version
+            })
+            result = await execute_async(query, "merge_agent_session_state", "rpc")
+        except Exception as e:
+            if getattr(e, "code", None) == _VERSION_CONFLICT_SQLSTATE:
+                raise SessionConflictError(session_id, expected_version) from e
+            raise
+        
+        return result.data if isinstance(result.data, int) else None
+    
+    @db_session
+    async def _load_version(self, session_id: str) -> Optional[int]:
+        """
+        Read a session's current version from the database.
+        
+        Args:
+            session_id: Session identifier
+            
+        Returns:
+            The stored version, or None if the session does not exist
+        """
+        query = self.supabase.table("instabids.agent_sessions") \
+            .select("version") \
+            .eq("id", session_id)
+        result = await execute_async(query, "instabids.agent_sessions", "select")
+        if not result.data:
+            return None
+        return result.data[0].get("version", 0)
\ No newline at end of file
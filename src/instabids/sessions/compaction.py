@@ -0,0 +1,67 @@
+"""
+Session snapshots and event-log compaction helpers.
+
+Compacting a session folds the state deltas of all events up to a watermark
+into a SessionSnapshot and removes those events from the live event log.
+Consumers that rebuild or replay a session (for example, to ship its history
+to the model) read the snapshot first and then only the events after its
+watermark. The session services implement ``compact_session``,
+``get_snapshot`` and ``get_history`` on top of these helpers.
+"""
+from typing import Any, Dict, Iterable, NamedTuple, Optional
+
+from .event_pagination import EventCursor
+
+
+class SessionSnapshot(NamedTuple):
+    """
+    Folded session state as of a watermark in the event log.
+    
+    ``event_count`` is the total number of events folded into the snapshot
+    over all compactions. ``created_at`` is epoch seconds for in-memory
+    snapshots and the database timestamp for stored ones.
+    """
+    
+    state: Dict[str, Any]
+    watermark: EventCursor
+    event_count: int
+    created_at: Any
+
+
+def event_state_delta(event: Any) -> Optional[Dict[str, Any]]:
+    """
+    Get the state delta carried by an event object or decoded event dictionary.
+    
+    Args:
+        event: The event
+        
+    Returns:
+        The state delta, or None if the event carries none
+    """
+    actions = event.get("actions") if isinstance(event, dict) else getattr(event, "actions", None)
+    if actions is None:
+        return None
+    if isinstance(actions, dict):
+        return actions.get("state_delta")
+    return getattr(actions, "state_delta", None)
+
+
+def fold_state_deltas(
+    base_state: Optional[Dict[str, Any]], events: Iterable[Any]
+) -> Dict[str, Any]:
+    """
+    Apply the state deltas of events, in order, on top of a base state.
+    
+    Args:
+        base_state: State to start from (not modified)
+        events: Events in append order
+        
+    Returns:
+        The folded state
+    """
+    state = dict(base_state or {})
+    for event in events:
+        state_delta = event_state_delta(event)
+        if state_delta:
+            state.update(state_delta)
+    return state
\ No newline at end of file
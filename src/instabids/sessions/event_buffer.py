@@ -0,0 +1,416 @@
+"""
+Write-behind event buffer for session services.
+
+Queues agent events per session and writes them to the backing store in
+groups (group commit) instead of one round trip per event. A flush happens
+when the number of queued events reaches ``max_batch_size``, when the oldest
+queued event has waited ``max_delay_seconds``, when a session is ended
+explicitly, or when the process shuts down.
+
+Used by SupabaseMemoryService when it is created with ``buffered=True``.
+"""
+import atexit
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from ..utils.logging import get_default_logger
+
+logger = get_default_logger()
+
+# Signature of the function that persists a batch:
+# flush_fn(rows, state_deltas) where rows is the list of event rows in
+# append order and state_deltas maps session_id -> merged state delta.
+FlushFunction = Callable[[List[Dict[str, Any]], Dict[str, Dict[str, Any]]], None]
+
+
+class _PendingSession:
+    """Events and coalesced state delta queued for a single session."""
+
+    __slots__ = ("rows", "state_delta", "first_enqueued_at", "attempts")
+
+    def __init__(self, first_enqueued_at: float):
+        """
+        Initialize an empty pending entry.
+
+        Args:
+            first_enqueued_at: Monotonic time at which the first event was queued
+        """
+        self.rows: List[Dict[str, Any]] = []
+        self.state_delta: Dict[str, Any] = {}
+        self.first_enqueued_at = first_enqueued_at
+        # Flushes of this entry the database has rejected so far
+        self.attempts = 0
+
+
+def _is_rejected(error: Exception) -> bool:
+    """
+    Check whether a flush failed because the database rejected the data.
+
+    PostgREST errors carry the SQLSTATE of the failing statement (e.g. a
+    foreign key violation for a deleted session); transport errors such as
+    timeouts do not, and retrying those later may succeed.
+
+    Args:
+        error: The exception raised by the flush function
+
+    Returns:
+        True if the database rejected the batch
+    """
+    return getattr(error, "code", None) is not None
+
+
+class EventBuffer:
+    """
+    Per-session write-behind queue with size and time based group commit.
+
+    A background daemon thread flushes the queue when the time threshold is
+    reached or when the size threshold is crossed. Callers never wait on the
+    database unless the queue grows past ``max_queue_size``, in which case the
+    appending caller flushes synchronously to apply backpressure.
+
+    Flushes are serialized, so events of a session are always written in the
+    order they were appended. When a batch fails, each of its sessions is
+    retried on its own, so one bad session cannot hold back the others.
+    Sessions that still fail are put back at the front of the queue; once the
+    database has rejected a session's events ``max_attempts`` times they are
+    moved to a dead-letter list instead (see dead_letters()).
+    """
+
+    def __init__(
+        self,
+        flush_fn: FlushFunction,
+        max_batch_size: int = 50,
+        max_delay_seconds: float = 0.2,
+        max_queue_size: int = 5000,
+        max_attempts: int = 3,
+        max_dead_letters: int = 1000
+    ):
+        """
+        Initialize the event buffer and start its flusher thread.
+
+        Args:
+            flush_fn: Function that persists a batch of event rows and state deltas
+            max_batch_size: Number of queued events that triggers a flush
+            max_delay_seconds: Maximum time an event may wait in the queue
+            max_queue_size: Queue depth at which appends flush synchronously
+            max_attempts: Number of rejected flushes after which a session's
+                events are dead-lettered
+            max_dead_letters: Number of dead-lettered entries kept for inspection
+
+        Raises:
+            ValueError: If any of the thresholds is not positive
+        """
+        if (
+            max_batch_size <= 0 or max_delay_seconds <= 0 or max_queue_size <= 0
+            or max_attempts <= 0 or max_dead_letters <= 0
+        ):
+            raise ValueError("EventBuffer thresholds must be positive")
+
+        self._flush_fn = flush_fn
+        self.max_batch_size = max_batch_size
+        self.max_delay_seconds = max_delay_seconds
+        self.max_queue_size = max(max_queue_size, max_batch_size)
+        self.max_attempts = max_attempts
+
+        self._pending: Dict[str, _PendingSession] = {}
+        self._queue_depth = 0
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._flush_lock = threading.Lock()
+        self._closed = False
+        self._dead_letters: Deque[Dict[str, Any]] = deque(maxlen=max_dead_letters)
+
+        # Counters
+        self._events_enqueued = 0
+        self._events_flushed = 0
+        self._flush_count = 0
+        self._flush_failures = 0
+        self._events_dead_lettered = 0
+        self._last_flush_latency = 0.0
+        self._max_flush_latency = 0.0
+        self._total_flush_latency = 0.0
+
+        self._thread = threading.Thread(
+            target=self._run, name="instabids-event-buffer", daemon=True
+        )
+        self._thread.start()
+        atexit.register(self.close)
+
+    def enqueue(
+        self,
+        session_id: str,
+        row: Dict[str, Any],
+        state_delta: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """
+        Queue an event row (and its state delta) for a session.
+
+        Args:
+            session_id: Session the event belongs to
+            row: Database row for the event
+            state_delta: Optional state changes carried by the event
+
+        Raises:
+            RuntimeError: If the buffer has been closed
+        """
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Cannot enqueue events on a closed EventBuffer")
+
+            pending = self._pending.get(session_id)
+            if pending is None:
+                pending = _PendingSession(time.monotonic())
+                self._pending[session_id] = pending
+
+            pending.rows.append(row)
+            if state_delta:
+                pending.state_delta.update(state_delta)
+
+            self._queue_depth += 1
+            self._events_enqueued += 1
+            queue_depth = self._queue_depth
+
+            if queue_depth >= self.max_batch_size:
+                self._wakeup.notify()
+
+        # Backpressure: the flusher is falling behind, write from the caller
+        if queue_depth >= self.max_queue_size:
+            self.flush()
+
+    def flush(self, session_id: Optional[str] = None) -> int:
+        """
+        Synchronously write queued events.
+
+        Args:
+            session_id: Only flush this session's events; flush everything if None
+
+        Returns:
+            Number of events written
+
+        Raises:
+            Exception: Whatever the flush function raised for a session whose
+                events were requeued
+        """
+        with self._flush_lock:
+            with self._lock:
+                if session_id is None:
+                    batch = self._pending
+                    self._pending = {}
+                else:
+                    pending = self._pending.pop(session_id, None)
+                    batch = {session_id: pending} if pending else {}
+                event_count = sum(len(pending.rows) for pending in batch.values())
+                self._queue_depth -= event_count
+
+            if not batch:
+                return 0
+
+            rows = [row for pending in batch.values() for row in pending.rows]
+            state_deltas = {
+                sid: pending.state_delta for sid, pending in batch.items() if pending.state_delta
+            }
+
+            started = time.perf_counter()
+            try:
+                self._flush_fn(rows, state_deltas)
+                errors = {}
+            except Exception as e:
+                if len(batch) > 1:
+                    logger.warning(f"Failed to flush batch, retrying per session: {e}")
+                    errors = self._flush_each(batch)
+                else:
+                    errors = dict.fromkeys(batch, e)
+            latency = time.perf_counter() - started
+            event_count -= sum(len(batch[sid].rows) for sid in errors)
+
+            with self._lock:
+                if errors:
+                    self._flush_failures += 1
+                    retry_error = self._requeue(
+                        {sid: batch[sid] for sid in errors}, errors
+                    )
+                self._flush_count += 1
+                self._events_flushed += event_count
+                self._last_flush_latency = latency
+                self._max_flush_latency = max(self._max_flush_latency, latency)
+                self._total_flush_latency += latency
+
+            if errors and retry_error is not None:
+                raise retry_error
+
+            logger.debug(f"Flushed {event_count} buffered events in {latency * 1000:.1f}ms")
+            return event_count
+
+    def discard(self, session_id: str) -> int:
+        """
+        Drop a session's queued events without writing them.
+
+        Args:
+            session_id: Session whose events should be dropped
+
+        Returns:
+            Number of events dropped
+        """
+        with self._flush_lock, self._lock:
+            pending = self._pending.pop(session_id, None)
+            if pending is None:
+                return 0
+            self._queue_depth -= len(pending.rows)
+            return len(pending.rows)
+
+    def dead_letters(self) -> List[Dict[str, Any]]:
+        """
+        Get the most recent dead-lettered entries.
+
+        Returns:
+            List of dictionaries with the session_id, rows, state_delta and
+            error of each session whose events were given up on, oldest first
+        """
+        with self._lock:
+            return list(self._dead_letters)
+
+    def close(self) -> None:
+        """Flush all queued events and stop the flusher thread."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._wakeup.notify()
+
+        self._thread.join(timeout=max(self.max_delay_seconds * 2, 1.0))
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"Failed to flush buffered events on shutdown: {e}")
+        atexit.unregister(self.close)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get queue depth and flush latency counters.
+
+        Returns:
+            Dictionary of buffer counters
+        """
+        with self._lock:
+            return {
+                "queue_depth": self._queue_depth,
+                "sessions_pending": len(self._pending),
+                "events_enqueued": self._events_enqueued,
+                "events_flushed": self._events_flushed,
+                "flush_count": self._flush_count,
+                "flush_failures": self._flush_failures,
+                "events_dead_lettered": self._events_dead_lettered,
+                "last_flush_latency_ms": self._last_flush_latency * 1000,
+                "max_flush_latency_ms": self._max_flush_latency * 1000,
+                "avg_flush_latency_ms": (
+                    self._total_flush_latency / self._flush_count * 1000
+                    if self._flush_count else 0.0
+                ),
+            }
+
+    def _flush_each(self, batch: Dict[str, _PendingSession]) -> Dict[str, Exception]:
+        """
+        Write a failed batch again one session at a time. Caller holds the flush lock.
+
+        Args:
+            batch: The batch that failed to flush
+
+        Returns:
+            The error of each session that failed again
+        """
+        errors = {}
+        for session_id, pending in batch.items():
+            state_deltas = {session_id: pending.state_delta} if pending.state_delta else {}
+            try:
+                self._flush_fn(pending.rows, state_deltas)
+            except Exception as e:
+                errors[session_id] = e
+        return errors
+
+    def _requeue(
+        self, batch: Dict[str, _PendingSession], errors: Dict[str, Exception]
+    ) -> Optional[Exception]:
+        """
+        Put failed sessions back in front of anything queued since. Caller holds the lock.
+
+        Sessions the database has rejected max_attempts times are moved to the
+        dead-letter list instead.
+
+        Args:
+            batch: The sessions that failed to flush
+            errors: The error of each failed session
+
+        Returns:
+            The error of the first requeued session, or None if all were dead-lettered
+        """
+        retry_error = None
+        for session_id, failed in list(batch.items()):
+            error = errors[session_id]
+            if _is_rejected(error):
+                failed.attempts += 1
+            if failed.attempts >= self.max_attempts:
+                self._dead_letters.append({
+                    "session_id": session_id,
+                    "rows": failed.rows,
+                    "state_delta": failed.state_delta,
+                    "error": str(error),
+                })
+                self._events_dead_lettered += len(failed.rows)
+                del batch[session_id]
+                logger.error(
+                    f"Dead-lettered {len(failed.rows)} events of session {session_id} "
+                    f"after {failed.attempts} rejected flushes: {error}"
+                )
+                continue
+            if retry_error is None:
+                retry_error = error
+
+        for session_id, failed in batch.items():
+            newer = self._pending.get(session_id)
+            if newer is not None:
+                failed.rows.extend(newer.rows)
+                failed.state_delta.update(newer.state_delta)
+            self._pending[session_id] = failed
+            self._queue_depth += len(failed.rows) - (len(newer.rows) if newer else 0)
+
+        # Keep failed sessions first so they are retried in their original order
+        self._pending = {
+            **{sid: self._pending[sid] for sid in batch},
+            **{sid: p for sid, p in self._pending.items() if sid not in batch},
+        }
+        return retry_error
+
+    def _oldest_age(self) -> float:
+        """
+        Get how long the oldest queued event has waited. Caller holds the lock.
+
+        Returns:
+            Age in seconds, or 0.0 if the queue is empty
+        """
+        if not self._pending:
+            return 0.0
+        oldest = min(pending.first_enqueued_at for pending in self._pending.values())
+        return time.monotonic() - oldest
+
+    def _run(self) -> None:
+        """Flusher thread loop: flush on size or age thresholds until closed."""
+        while True:
+            with self._lock:
+                while not self._closed:
+                    if self._queue_depth >= self.max_batch_size:
+                        break
+                    age = self._oldest_age()
+                    if self._pending and age >= self.max_delay_seconds:
+                        break
+                    timeout = self.max_delay_seconds - age if self._pending else None
+                    self._wakeup.wait(timeout)
+                if self._closed:
+                    return
+
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Failed to flush buffered events, will retry: {e}")
+                time.sleep(self.max_delay_seconds)
\ No newline at end of file
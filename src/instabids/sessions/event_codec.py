@@ -0,0 +1,353 @@
+"""
+Codecs for persisted agent event payloads.
+
+SupabaseMemoryService stores each event's ``content`` and ``actions`` in the
+agent_events.event_blob column through an EventCodec. The default
+BinaryEventCodec writes a small versioned header followed by compact,
+type-tagged JSON, compressed with zlib when that pays off. ADK objects
+(``google.genai.types.Content``, ``google.adk`` ``EventActions`` and other
+pydantic models) are tagged with their class and rebuilt on decode, and
+``bytes`` values (e.g. inline image data) survive the round trip.
+
+Rows written before event_blob existed keep their JSON ``event_data`` and are
+still decoded by the session service.
+"""
+import base64
+import importlib
+import json
+import logging
+import random
+import struct
+import time
+import zlib
+from typing import Any, Dict, Optional
+
+from ..utils.logging import get_default_logger
+
+logger = get_default_logger()
+
+# Header: magic, format version, flags
+_HEADER = struct.Struct(">2sBB")
+_MAGIC = b"IE"
+_FORMAT_VERSION = 1
+_FLAG_ZLIB = 0x01
+
+# Key marking a type-tagged value in the JSON payload
+_TAG = "__t"
+
+# Only classes from these packages are rebuilt from their type tag on decode
+_TRUSTED_MODULE_PREFIXES = ("google.genai.", "google.adk.")
+
+# Type tag -> resolved model class (None if untrusted or not importable)
+_model_classes: Dict[str, Optional[Any]] = {}
+
+
+class EventCodec:
+    """
+    Base class for event payload codecs.
+    
+    A codec turns the payload of an event (a dictionary with ``content`` and
+    ``actions``) into bytes and back. Subclasses implement encode and decode.
+    """
+    
+    def encode(self, payload: Dict[str, Any]) -> bytes:
+        """
+        Encode an event payload.
+        
+        Args:
+            payload: Dictionary with the event's content and actions
+            
+        Returns:
+            The encoded payload
+        """
+        raise NotImplementedError
+    
+    def decode(self, data: bytes) -> Dict[str, Any]:
+        """
+        Decode an event payload.
+        
+        Args:
+            data: Bytes produced by encode
+            
+        Returns:
+            Dictionary with the event's content and actions
+        """
+        raise NotImplementedError
+
+
+class BinaryEventCodec(EventCodec):
+    """
+    Default event codec: versioned header plus compact type-tagged JSON.
+    
+    Payloads of at least ``compress_threshold`` bytes are zlib-compressed
+    when that makes them smaller.
+    """
+    
+    def __init__(self, compress_threshold: int = 512, compress_level: int = 6):
+        """
+        Initialize the codec.
+        
+        Args:
+            compress_threshold: Minimum payload size in bytes to try compressing
+            compress_level: zlib compression level
+        """
+        self.compress_threshold = compress_threshold
+        self.compress_level = compress_level
+    
+    def encode(self, payload: Dict[str, Any]) -> bytes:
+        """
+        Encode an event payload.
+        
+        Args:
+            payload: Dictionary with the event's content and actions
+            
+        Returns:
+            Header followed by the (possibly compressed) payload
+        """
+        body = json.dumps(
+            _to_tagged(payload), separators=(",", ":"), ensure_ascii=False
+        ).encode("utf-8")
+        
+        flags = 0
+        if len(body) >= self.compress_threshold:
+            compressed = zlib.compress(body, self.compress_level)
+            if len(compressed) < len(body):
+                body = compressed
+                flags |= _FLAG_ZLIB
+        
+        return _HEADER.pack(_MAGIC, _FORMAT_VERSION, flags) + body
+    
+    def decode(self, data: bytes) -> Dict[str, Any]:
+        """
+        Decode an event payload.
+        
+        Args:
+            data: Bytes produced by encode
+            
+        Returns:
+            Dictionary with the event's content and actions
+            
+        Raises:
+            ValueError: If the data has no valid header or a newer format version
+        """
+        if len(data) < _HEADER.size:
+            raise ValueError("Event payload is too short")
+        
+        magic, version, flags = _HEADER.unpack_from(data)
+        if magic != _MAGIC:
+            raise ValueError("Event payload has no codec header")
+        if version > _FORMAT_VERSION:
+            raise ValueError(f"Unsupported event payload format version: {version}")
+        
+        body = data[_HEADER.size:]
+        if flags & _FLAG_ZLIB:
+            body = zlib.decompress(body)
+        
+        return _from_tagged(json.loads(body))
+
+
+def to_bytea(data: bytes) -> str:
+    """
+    Format bytes for a BYTEA column in a PostgREST request.
+    
+    Args:
+        data: The bytes
+        
+    Returns:
+        The value in PostgreSQL hex format
+    """
+    return "\\x" + data.hex()
+
+
+def from_bytea(value: Any) -> bytes:
+    """
+    Read a BYTEA column value from a PostgREST response.
+    
+    Args:
+        value: The value, in PostgreSQL hex format or already bytes
+        
+    Returns:
+        The bytes
+        
+    Raises:
+        ValueError: If the value is not in hex format
+    """
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return bytes(value)
+    if not value.startswith("\\x"):
+        raise ValueError("BYTEA value is not in hex format")
+    return bytes.fromhex(value[2:])
+
+
+def _to_tagged(value: Any) -> Any:
+    """
+    Convert a value to JSON-native data, tagging types JSON cannot express.
+    
+    Args:
+        value: The value
+        
+    Returns:
+        JSON-serializable data
+    """
+    if value is None or isinstance(value, (str, bool, int, float)):
+        return value
+    
+    if isinstance(value, dict):
+        converted = {str(key): _to_tagged(item) for key, item in value.items()}
+        if _TAG in converted:
+            return {_TAG: "dict", "v": list(converted.items())}
+        return converted
+    
+    if isinstance(value, (list, tuple)):
+        return [_to_tagged(item) for item in value]
+    
+    if isinstance(value, (bytes, bytearray)):
+        return {_TAG: "bytes", "v": base64.b64encode(value).decode("ascii")}
+    
+    cls = type(value)
+    if hasattr(value, "model_dump"):
+        # Pydantic model: nested models are rebuilt from the field types
+        dumped = value.model_dump(exclude_none=True)
+        return {_TAG: f"{cls.__module__}:{cls.__qualname__}", "v": _to_tagged(dumped)}
+    
+    if hasattr(value, "__dict__"):
+        return _to_tagged(vars(value))
+    
+    return str(value)
+
+
+def _from_tagged(value: Any) -> Any:
+    """
+    Rebuild a value converted by _to_tagged.
+    
+    Args:
+        value: Decoded JSON data
+        
+    Returns:
+        The rebuilt value
+    """
+    if isinstance(value, list):
+        return [_from_tagged(item) for item in value]
+    
+    if not isinstance(value, dict):
+        return value
+    
+    tag = value.get(_TAG)
+    if tag is None:
+        return {key: _from_tagged(item) for key, item in value.items()}
+    if tag == "bytes":
+        return base64.b64decode(value["v"])
+    if tag == "dict":
+        return {key: _from_tagged(item) for key, item in value["v"]}
+    
+    fields = _from_tagged(value["v"])
+    model_class = _resolve_model_class(tag)
+    if model_class is None:
+        return fields
+    try:
+        return model_class.model_validate(fields)
+    except Exception as e:
+        logger.warning(f"Could not rebuild {tag} from stored event, keeping raw fields: {e}")
+        return fields
+
+
+def _resolve_model_class(tag: str) -> Optional[Any]:
+    """
+    Look up the model class named by a type tag.
+    
+    Args:
+        tag: Tag in ``module:qualname`` form
+        
+    Returns:
+        The class, or None if it is not trusted or cannot be imported
+    """
+    if tag in _model_classes:
+        return _model_classes[tag]
+    
+    module_name, _, qualname = tag.partition(":")
+    model_class = None
+    if module_name.startswith(_TRUSTED_MODULE_PREFIXES):
+        try:
+            model_class = importlib.import_module(module_name)
+            for attribute in qualname.split("."):
+                model_class = getattr(model_class, attribute)
+        except (ImportError, AttributeError):
+            model_class = None
+        if model_class is not None and not hasattr(model_class, "model_validate"):
+            model_class = None
+    
+    _model_classes[tag] = model_class
+    return model_class
+
+
+def _benchmark(runs: int = 2000) -> None:
+    """
+    Print the stored size and encode/decode time of typical event payloads,
+    against plain json.dumps of the same data.
+    """
+    logger.setLevel(logging.WARNING)
+    rng = random.Random(0)
+    words = (
+        "the bathroom needs a new walk-in shower and we want to replace the old tub "
+        "with tile floors new vanity lighting and a budget around fifteen thousand"
+    ).split()
+    
+    chat_turn = {
+        "content": {"role": "user", "parts": [
+            {"text": " ".join(rng.choice(words) for _ in range(60))}
+        ]},
+        "actions": {"state_delta": {
+            "step": "project_details", "project_type": "Bathroom Remodel"
+        }}
+    }
+    contractors = [{
+        "id": f"{rng.getrandbits(128):032x}",
+        "name": f"{rng.choice(words).title()} {rng.choice(words).title()} Contractors",
+        "services": ["bathroom remodel", "tile", "plumbing"],
+        "service_areas": [{"city": "Austin", "state": "TX", "zip": f"787{rng.randrange(100):02d}"}],
+        "rating": round(rng.uniform(3.0, 5.0), 1),
+        "verified": rng.random() < 0.5,
+        "score": round(rng.random(), 4),
+    } for _ in range(25)]
+    tool_response = {
+        "content": {"role": "tool", "parts": [{"function_response": {
+            "name": "find_contractors",
+            "response": {"status": "success", "contractors": contractors, "count": 25}
+        }}]},
+        "actions": {"state_delta": {}}
+    }
+    image_part = {
+        "content": {"role": "user", "parts": [
+            {"inline_data": {"mime_type": "image/jpeg", "data": rng.randbytes(2048)}}
+        ]},
+        "actions": {"state_delta": {}}
+    }
+    
+    def best_us(fn) -> float:
+        timings = []
+        for _ in range(5):
+            start = time.perf_counter()
+            for _ in range(runs):
+                fn()
+            timings.append(time.perf_counter() - start)
+        return min(timings) / runs * 1e6
+    
+    codec = BinaryEventCodec()
+    for label, payload in (
+        ("chat turn (60 words + state delta)", chat_turn),
+        ("tool response (25 contractors)", tool_response),
+        ("inline image part (2 KB)", image_part),
+    ):
+        try:
+            plain = f"{len(json.dumps(payload).encode('utf-8'))} B"
+        except TypeError:
+            plain = "fails"
+        data = codec.encode(payload)
+        encode_us = best_us(lambda: codec.encode(payload))
+        decode_us = best_us(lambda: codec.decode(data))
+        print(f"{label:<36} json {plain:>7} -> {len(data):>5} B, "
+              f"encode {encode_us:.0f} us, decode {decode_us:.0f} us")
+
+
+if __name__ == "__main__":
+    _benchmark()
\ No newline at end of file
@@ -0,0 +1,41 @@
+"""
+Keyset pagination types for session event listing.
+
+Both session services page through a session's events by a cursor on
+``(timestamp, id)`` rather than by offset, so fetching a page costs the same
+no matter how deep into a long session it is. For SupabaseMemoryService the
+``id`` is the agent_events row ID; for InMemorySessionService it is the
+event's position in the session's event log.
+"""
+from typing import Any, List, NamedTuple, Optional
+
+
+class EventCursor(NamedTuple):
+    """Position of an event in a session's event log."""
+    
+    timestamp: float
+    id: Any
+
+
+class EventPage(NamedTuple):
+    """A page of events and the cursor to continue from."""
+    
+    events: List[Any]
+    next_cursor: Optional[EventCursor]
+
+
+def event_timestamp(event: Any) -> float:
+    """
+    Get the timestamp of an event object or decoded event dictionary.
+    
+    Args:
+        event: The event
+        
+    Returns:
+        The event's timestamp, or 0.0 if it has none
+    """
+    if isinstance(event, dict):
+        timestamp = event.get("timestamp")
+    else:
+        timestamp = getattr(event, "timestamp", None)
+    return timestamp or 0.0
\ No newline at end of file
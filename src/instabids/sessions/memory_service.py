@@ -2,28 +2,251 @@
 Custom memory implementation for ADK agents.
 """
 import os
+import sys
 import json
-from typing import Dict, Any, Optional, List
+import time
+import heapq
+import pickle
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, Iterator, Optional, List, Tuple
 from google.adk.session import Session
 
-from supabase import create_client, Client
+from supabase import Client
 
+from .event_buffer import EventBuffer
+from .event_codec import BinaryEventCodec, EventCodec, from_bytea, to_bytea
+from .event_pagination import EventCursor, EventPage, event_timestamp
+from .compaction import SessionSnapshot, fold_state_deltas
+from .spill_store import SessionSpillStore
+from ..utils.db_metrics import db_session, db_tags, execute
 from ..utils.logging import get_default_logger
+from ..utils.supabase_client import get_supabase_client
 
 logger = get_default_logger()
 
+# Serialization failure raised by merge_agent_session_state on a version mismatch
+_VERSION_CONFLICT_SQLSTATE = "40001"
+
+
+class SessionConflictError(RuntimeError):
+    """
+    Raised when a session's state was changed by another writer.
+    
+    The event that triggered it was not stored. Reload the session with
+    get_session() and retry the append.
+    """
+    
+    def __init__(self, session_id: str, expected_version: Optional[int]):
+        """
+        Initialize the error.
+        
+        Args:
+            session_id: Session whose update conflicted
+            expected_version: Version the writer expected the session to be at
+        """
+        super().__init__(
+            f"Session {session_id} was modified by another writer "
+            f"(expected version {expected_version}); reload it and retry"
+        )
+        self.session_id = session_id
+        self.expected_version = expected_version
+
+
+# Private attribute carrying a session's last known stored version on the
+# Session object itself; pydantic keeps underscore names off the model fields
+_VERSION_ATTR = "_instabids_version"
+
+
+def _get_version(session: Session) -> Optional[int]:
+    """
+    Get the stored version a session object was loaded at.
+    
+    Args:
+        session: The session
+        
+    Returns:
+        The version, or None if the session did not come from this backend
+    """
+    return getattr(session, _VERSION_ATTR, None)
+
+
+def _set_version(session: Session, version: int) -> None:
+    """
+    Record the stored version a session object is now at.
+    
+    Args:
+        session: The session
+        version: The session's version in the database
+    """
+    object.__setattr__(session, _VERSION_ATTR, version)
+
+
+def _decode_state(value: Any) -> Dict[str, Any]:
+    """
+    Decode a stored session state.
+    
+    Rows written before states were stored as native JSONB hold a JSON string.
+    
+    Args:
+        value: The ``state`` column value
+        
+    Returns:
+        The state dictionary
+    """
+    if not value:
+        return {}
+    if isinstance(value, str):
+        return json.loads(value)
+    return value
+
+
+def _event_to_row(session_id: str, event: Any, codec: EventCodec) -> Dict[str, Any]:
+    """
+    Convert an event to an agent_events row.
+    
+    Args:
+        session_id: Session the event belongs to
+        event: The event
+        codec: Codec for the event's content and actions
+        
+    Returns:
+        The database row
+    """
+    return {
+        "session_id": session_id,
+        "invocation_id": getattr(event, "invocation_id", None),
+        "author": getattr(event, "author", None),
+        # NOT NULL in agent_events; NULL would break the (timestamp, id) cursor
+        "timestamp": event_timestamp(event),
+        "event_blob": to_bytea(codec.encode({
+            "content": getattr(event, "content", None),
+            "actions": getattr(event, "actions", None)
+        }))
+    }
+
+
+def _row_to_event(event_data: Dict[str, Any], codec: EventCodec) -> Dict[str, Any]:
+    """
+    Convert an agent_events row to an event.
+    
+    In a real implementation, you would create proper Event objects;
+    this returns a simple dictionary.
+    
+    Args:
+        event_data: The database row
+        codec: Codec the row's event_blob was written with
+        
+    Returns:
+        The decoded event
+    """
+    if event_data.get("event_blob"):
+        event_json = codec.decode(from_bytea(event_data["event_blob"]))
+    else:
+        # Rows written before event_blob hold JSON in event_data
+        event_json = event_data.get("event_data") or {}
+        if isinstance(event_json, str):
+            event_json = json.loads(event_json)
+    
+    return {
+        "invocation_id": event_data["invocation_id"],
+        "author": event_data["author"],
+        "timestamp": event_data["timestamp"],
+        "content": event_json.get("content"),
+        "actions": event_json.get("actions")
+    }
+
+
+def _idle_cutoff(idle_seconds: float) -> str:
+    """
+    Get the updated_at timestamp before which a session has been idle too long.
+    
+    Args:
+        idle_seconds: Idle TTL
+        
+    Returns:
+        The cutoff as an ISO 8601 UTC timestamp
+    """
+    return (datetime.now(timezone.utc) - timedelta(seconds=idle_seconds)).isoformat()
+
+
+def _approx_size(value: Any) -> int:
+    """
+    Approximate the memory footprint of a session value by its pickled size.
+    
+    Args:
+        value: State dictionary or event
+        
+    Returns:
+        Approximate size in bytes
+    """
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return sys.getsizeof(value)
+
 class InMemorySessionService:
     """
     Implements a simple in-memory session service for development purposes.
+    
+    By default everything stays in memory for the lifetime of the process.
+    With any of the memory caps set, the least recently used sessions are
+    spilled to a local SessionSpillStore once the session count or the
+    approximate byte total is exceeded, and the oldest events of a session
+    are spilled once it holds more than ``max_events_per_session`` events.
+    Spilled data is loaded back transparently by get_session() and
+    list_events().
+    
+    Session state is stored as a plain dict that append_event() updates in
+    place, so an event costs O(delta); sessions handed to callers get their
+    own copy of it.
+    
+    This class is not thread-safe; use ShardedInMemorySessionService from
+    threaded servers.
     """
     
-    def __init__(self):
-        """Initialize the in-memory session service."""
-        self.sessions: Dict[str, Dict[str, Any]] = {}
+    def __init__(
+        self,
+        max_sessions: Optional[int] = None,
+        max_events_per_session: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        spill_path: Optional[str] = None
+    ):
+        """
+        Initialize the in-memory session service.
+        
+        Args:
+            max_sessions: Maximum number of sessions kept in memory
+            max_events_per_session: Maximum number of events kept in memory per session
+            max_bytes: Approximate maximum size of the sessions kept in memory
+            spill_path: SQLite file for spilled data; a temporary file if None
+        """
+        # Ordered by recency of use: the first entry is the eviction candidate
+        self.sessions: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        # (app_name, user_id) -> session IDs, kept in creation order (dict as ordered set)
+        self._user_index: Dict[Tuple[str, str], Dict[str, None]] = {}
+        # (last_update_time, session_id) min-heap over in-memory sessions, so
+        # expired sessions are found oldest first; entries left behind by later
+        # activity, spilling or deletion are skipped and periodically rebuilt
+        self._activity_heap: List[Tuple[float, str]] = []
+        
+        self.max_sessions = max_sessions
+        self.max_events_per_session = max_events_per_session
+        self.max_bytes = max_bytes
+        self._total_bytes = 0
+        self._spill_store: Optional[SessionSpillStore] = None
+        if max_sessions or max_events_per_session or max_bytes:
+            self._spill_store = SessionSpillStore(spill_path)
+        
         logger.info("Initialized InMemorySessionService")
     
     def create_session(
-        self, app_name: str, user_id: str, state: Optional[Dict[str, Any]] = None
+        self,
+        app_name: str,
+        user_id: str,
+        state: Optional[Dict[str, Any]] = None,
+        session_id: Optional[str] = None
     ) -> Session:
         """
         Create a new session.
@@ -32,23 +255,41 @@ class InMemorySessionService:
             app_name: Name of the application
             user_id: User identifier
             state: Initial state for the session
+            session_id: Session identifier to use; generated if None
             
         Returns:
             The created session
         """
-        session = Session(
+        stored_state = dict(state or {})
+        # The state is already a fresh dict, so skip pydantic's validation copy
+        session = Session.model_construct(
+            id=session_id or str(uuid.uuid4()),
             app_name=app_name,
             user_id=user_id,
-            state=state or {}
+            state=dict(stored_state)
         )
         
         # Store session in memory
-        self.sessions[session.id] = {
+        session_data = {
             "app_name": app_name,
             "user_id": user_id,
-            "state": session.state.copy(),
-            "events": []
+            "state": stored_state,
+            "events": [],
+            "last_update_time": time.time(),
+            "first_seq": 0,
+            "spilled_events": 0,
+            # Base for the first compaction; superseded by the snapshot afterwards
+            "initial_state": dict(stored_state),
+            "snapshot": None,
+            "approx_bytes": 0
         }
+        if self.max_bytes:
+            session_data["approx_bytes"] = _approx_size(session_data["state"])
+            self._total_bytes += session_data["approx_bytes"]
+        self.sessions[session.id] = session_data
+        self._user_index.setdefault((app_name, user_id), {})[session.id] = None
+        self._track_activity(session.id, session_data)
+        self._enforce_limits(keep=session.id)
         
         logger.info(f"Created session: {session.id} for user: {user_id}")
         return session
@@ -65,12 +306,11 @@ class InMemorySessionService:
         Returns:
             The session if found, None otherwise
         """
-        if session_id not in self.sessions:
+        session_data = self._load(session_id)
+        if session_data is None:
             logger.warning(f"Session not found: {session_id}")
             return None
         
-        session_data = self.sessions[session_id]
-        
         # Verify app_name and user_id
         if session_data["app_name"] != app_name or session_data["user_id"] != user_id:
             logger.warning(
@@ -79,32 +319,39 @@ class InMemorySessionService:
             )
             return None
         
-        # Create session from stored data
-        session = Session(
+        # Create session from stored data, with its own copy of the state
+        session = Session.model_construct(
             id=session_id,
             app_name=app_name,
             user_id=user_id,
-            state=session_data["state"].copy()
+            state=dict(session_data["state"])
         )
         
         return session
     
-    def list_sessions(self, app_name: str, user_id: str) -> List[str]:
+    def list_sessions(
+        self, app_name: str, user_id: str, order_by_last_activity: bool = False
+    ) -> List[str]:
         """
         List all sessions for a user.
         
+        Uses the (app_name, user_id) index, so the cost is proportional to the
+        number of sessions the user has rather than the number stored.
+        Spilled sessions are listed without being loaded back.
+        
         Args:
             app_name: Name of the application
             user_id: User identifier
+            order_by_last_activity: Return the most recently active sessions first
+                instead of creation order
             
         Returns:
             List of session IDs
         """
-        session_ids = []
+        session_ids = list(self._user_index.get((app_name, user_id), ()))
         
-        for session_id, session_data in self.sessions.items():
-            if session_data["app_name"] == app_name and session_data["user_id"] == user_id:
-                session_ids.append(session_id)
+        if order_by_last_activity:
+            session_ids.sort(key=self._last_update_time, reverse=True)
         
         return session_ids
     
@@ -120,14 +367,16 @@ class InMemorySessionService:
         Returns:
             True if the session was deleted, False otherwise
         """
-        if session_id not in self.sessions:
+        session_data = self.sessions.get(session_id)
+        spilled = self._spill_store is not None and self._spill_store.has_session(session_id)
+        
+        if session_data is None and not spilled:
             logger.warning(f"Cannot delete session {session_id}: not found")
             return False
         
-        session_data = self.sessions[session_id]
-        
         # Verify app_name and user_id
-        if session_data["app_name"] != app_name or session_data["user_id"] != user_id:
+        user_sessions = self._user_index.get((app_name, user_id))
+        if not user_sessions or session_id not in user_sessions:
             logger.warning(
                 f"Cannot delete session {session_id}: does not match "
                 f"app_name={app_name} and user_id={user_id}"
@@ -135,11 +384,72 @@ class InMemorySessionService:
             return False
         
         # Delete session
-        del self.sessions[session_id]
+        self._remove_session(session_id)
         logger.info(f"Deleted session: {session_id}")
         
         return True
     
+    def find_expired_sessions(self, idle_seconds: float, limit: int = 500) -> List[str]:
+        """
+        Find sessions with no appended events for longer than an idle TTL.
+        
+        Args:
+            idle_seconds: Idle time after which a session has expired
+            limit: Maximum number of session IDs to return
+            
+        Returns:
+            IDs of expired sessions, in-memory ones first
+        """
+        cutoff = time.time() - idle_seconds
+        expired = []
+        found = {}
+        heap = self._activity_heap
+        # Pop from the oldest activity onwards, so the cost follows the batch
+        # size rather than the number of sessions held
+        while heap and heap[0][0] < cutoff and len(expired) < limit:
+            entry = heapq.heappop(heap)
+            update_time, session_id = entry
+            session_data = self.sessions.get(session_id)
+            if session_data is None or session_data["last_update_time"] != update_time:
+                continue
+            if session_id not in found:
+                found[session_id] = entry
+                expired.append(session_id)
+        # Still live until deleted; delete_sessions may skip revived ones
+        for entry in found.values():
+            heapq.heappush(heap, entry)
+        
+        if self._spill_store is not None and len(expired) < limit:
+            expired.extend(self._spill_store.find_idle_sessions(cutoff, limit - len(expired)))
+        return expired
+    
+    def delete_sessions(
+        self, session_ids: List[str], idle_seconds: Optional[float] = None
+    ) -> List[str]:
+        """
+        Delete several sessions and their events.
+        
+        Args:
+            session_ids: Sessions to delete
+            idle_seconds: If given, skip sessions that had activity within this
+                many seconds (guards against deleting a session revived since
+                it was found expired)
+                
+        Returns:
+            IDs of the sessions that were deleted
+        """
+        cutoff = time.time() - idle_seconds if idle_seconds is not None else None
+        deleted = []
+        for session_id in session_ids:
+            if cutoff is not None and self._last_update_time(session_id) >= cutoff:
+                continue
+            if self._remove_session(session_id) is not None:
+                deleted.append(session_id)
+        
+        if deleted:
+            logger.info(f"Deleted {len(deleted)} sessions")
+        return deleted
+    
     def append_event(self, session: Session, event: Any) -> None:
         """
         Append an event to a session.
@@ -148,20 +458,34 @@ class InMemorySessionService:
             session: The session to append the event to
             event: The event to append
         """
-        if session.id not in self.sessions:
+        session_data = self._load(session.id)
+        if session_data is None:
             logger.warning(f"Cannot append event to session {session.id}: not found")
             return
         
         # Append event
-        self.sessions[session.id]["events"].append(event)
+        session_data["events"].append(event)
+        session_data["last_update_time"] = time.time()
+        self._track_activity(session.id, session_data)
         
         # Update session state if event has state_delta
         if hasattr(event, "actions") and hasattr(event.actions, "state_delta"):
-            for key, value in event.actions.state_delta.items():
-                # Update state in memory
-                self.sessions[session.id]["state"][key] = value
-                # Update state in session object
-                session.state[key] = value
+            state_delta = event.actions.state_delta
+            # Update state in memory
+            session_data["state"].update(state_delta)
+            # Update state in session object
+            session.state.update(state_delta)
+        
+        if self.max_bytes:
+            event_bytes = _approx_size(event)
+            session_data["approx_bytes"] += event_bytes
+            self._total_bytes += event_bytes
+        
+        max_events = self.max_events_per_session
+        if max_events and len(session_data["events"]) > max_events:
+            self._spill_events(session.id, session_data)
+        
+        self._enforce_limits(keep=session.id)
         
         logger.debug(f"Appended event to session: {session.id}")
     
@@ -177,12 +501,11 @@ class InMemorySessionService:
         Returns:
             List of events
         """
-        if session_id not in self.sessions:
+        session_data = self._load(session_id)
+        if session_data is None:
             logger.warning(f"Cannot list events for session {session_id}: not found")
             return []
         
-        session_data = self.sessions[session_id]
-        
         # Verify app_name and user_id
         if session_data["app_name"] != app_name or session_data["user_id"] != user_id:
             logger.warning(
@@ -191,16 +514,516 @@ class InMemorySessionService:
             )
             return []
         
+        if session_data["spilled_events"]:
+            first_seq = session_data["first_seq"]
+            spilled = self._spill_store.load_events(
+                session_id, first_seq, first_seq + session_data["spilled_events"]
+            )
+            return spilled + session_data["events"]
+        
         return session_data["events"]
+    
+    def list_events_page(
+        self,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        cursor: Optional[EventCursor] = None,
+        limit: int = 100,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        newest_first: bool = False
+    ) -> EventPage:
+        """
+        List one page of a session's events.
+        
+        Only the requested page is read, so the last N events of a long
+        session cost N regardless of its length (use newest_first=True).
+        
+        Args:
+            app_name: Name of the application
+            user_id: User identifier
+            session_id: Session identifier
+            cursor: Continue after this cursor (from a previous page's next_cursor)
+            limit: Maximum number of events to return
+            since: Only events with timestamp >= since
+            until: Only events with timestamp < until
+            newest_first: Page backwards from the newest event
+            
+        Returns:
+            The page of events and the cursor for the next page (None when exhausted)
+        """
+        events = []
+        next_cursor = None
+        for seq, event in self._scan_events(
+            app_name, user_id, session_id, cursor, since, until, newest_first
+        ):
+            events.append(event)
+            if len(events) >= limit:
+                next_cursor = EventCursor(event_timestamp(event), seq)
+                break
+        return EventPage(events, next_cursor)
+    
+    def iter_events(
+        self,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        cursor: Optional[EventCursor] = None,
+        limit: Optional[int] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        newest_first: bool = False
+    ) -> Iterator[Any]:
+        """
+        Iterate over a session's events, reading them as they are consumed.
+        
+        Args:
+            app_name: Name of the application
+            user_id: User identifier
+            session_id: Session identifier
+            cursor: Start after this cursor
+            limit: Stop after this many events; unbounded if None
+            since: Only events with timestamp >= since
+            until: Only events with timestamp < until
+            newest_first: Iterate backwards from the newest event
+            
+        Yields:
+            Events in the requested order
+        """
+        count = 0
+        for _, event in self._scan_events(
+            app_name, user_id, session_id, cursor, since, until, newest_first
+        ):
+            if limit is not None and count >= limit:
+                return
+            count += 1
+            yield event
+    
+    def _scan_events(
+        self,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        cursor: Optional[EventCursor],
+        since: Optional[float],
+        until: Optional[float],
+        newest_first: bool,
+        chunk_size: int = 256
+    ) -> Iterator[Tuple[int, Any]]:
+        """
+        Walk a session's event log from a cursor, honouring timestamp bounds.
+        
+        Events are assumed to be appended in timestamp order, so the walk stops
+        at the first event past the bound in the direction of travel. Spilled
+        events are read from disk a chunk at a time.
+        
+        Args:
+            app_name: Name of the application
+            user_id: User identifier
+            session_id: Session identifier
+            cursor: Start after this cursor
+            since: Only events with timestamp >= since
+            until: Only events with timestamp < until
+            newest_first: Walk backwards
+            chunk_size: Number of spilled events read from disk at a time
+            
+        Yields:
+            (sequence number, event) pairs
+        """
+        session_data = self._load(session_id)
+        if session_data is None:
+            logger.warning(f"Cannot list events for session {session_id}: not found")
+            return
+        
+        # Verify app_name and user_id
+        if session_data["app_name"] != app_name or session_data["user_id"] != user_id:
+            logger.warning(
+                f"Cannot list events for session {session_id}: does not match "
+                f"app_name={app_name} and user_id={user_id}"
+            )
+            return
+        
+        # Sequence numbers are absolute: compaction removes events from the front
+        # without renumbering, so cursors stay valid
+        first = session_data["first_seq"]
+        spilled = first + session_data["spilled_events"]
+        total = spilled + len(session_data["events"])
+        step = -1 if newest_first else 1
+        if cursor is None:
+            seq = total - 1 if newest_first else first
+        elif newest_first:
+            # Below first once the cursor is the oldest event: nothing is left
+            seq = cursor.id - 1
+        else:
+            # Events before first may have been compacted away since the cursor
+            seq = max(cursor.id + 1, first)
+        
+        while first <= seq < total:
+            # Read a contiguous run of events, from disk or from memory
+            if newest_first:
+                start = max(seq - chunk_size + 1, first if seq < spilled else spilled)
+                chunk = self._event_range(session_id, session_data, start, seq + 1)[::-1]
+            else:
+                stop = min(seq + chunk_size, spilled if seq < spilled else total)
+                chunk = self._event_range(session_id, session_data, seq, stop)
+            
+            for event in chunk:
+                timestamp = event_timestamp(event)
+                if newest_first:
+                    if since is not None and timestamp < since:
+                        return
+                    in_range = until is None or timestamp < until
+                else:
+                    if until is not None and timestamp >= until:
+                        return
+                    in_range = since is None or timestamp >= since
+                if in_range:
+                    yield seq, event
+                seq += step
+    
+    def _event_range(
+        self, session_id: str, session_data: Dict[str, Any], start: int, stop: int
+    ) -> List[Any]:
+        """
+        Get events by sequence number from disk (spilled) or memory.
+        
+        Args:
+            session_id: Session identifier
+            session_data: The session's in-memory record
+            start: First sequence number
+            stop: Sequence number to stop before; start and stop must both lie
+                in the spilled part or both in the in-memory part
+                
+        Returns:
+            List of events
+        """
+        spilled = session_data["first_seq"] + session_data["spilled_events"]
+        if start < spilled:
+            return self._spill_store.load_events(session_id, start, stop)
+        return session_data["events"][start - spilled:stop - spilled]
+    
+    def compact_session(
+        self, app_name: str, user_id: str, session_id: str, keep_last: int = 50
+    ) -> Optional[SessionSnapshot]:
+        """
+        Fold all but the newest events of a session into its snapshot.
+        
+        The state deltas of the folded events are applied on top of the
+        previous snapshot, and the folded events are removed from memory and
+        from the spill store. Only events past the previous snapshot's
+        watermark are folded, so events left behind by an interrupted
+        compaction are removed without being counted twice. Cursors and
+        sequence numbers of the remaining events are unchanged.
+        
+        Args:
+            app_name: Name of the application
+            user_id: User identifier
+            session_id: Session identifier
+            keep_last: Number of newest events to keep in the live log
+            
+        Returns:
+            The session's snapshot (unchanged if there was nothing to fold),
+            or None if the session does not exist or has never been compacted
+        """
+        session_data = self._load(session_id)
+        if session_data is None or (
+            session_data["app_name"] != app_name or session_data["user_id"] != user_id
+        ):
+            logger.warning(f"Cannot compact session {session_id}: not found or does not match")
+            return None
+        
+        first = session_data["first_seq"]
+        spilled_count = session_data["spilled_events"]
+        spilled_end = first + spilled_count
+        # Sequence number of the first event kept in the live log
+        stop = spilled_end + len(session_data["events"]) - keep_last
+        previous = session_data["snapshot"]
+        # Events up to the previous watermark are already in the snapshot
+        start = max(first, previous.watermark.id + 1) if previous else first
+        if stop <= first:
+            return previous
+        
+        # Collect the events to fold: spilled ones first, then in-memory ones
+        folded = []
+        if start < min(stop, spilled_end):
+            folded.extend(self._spill_store.load_events(session_id, start, min(stop, spilled_end)))
+        if stop > spilled_end:
+            memory_start = max(start, spilled_end) - spilled_end
+            folded.extend(session_data["events"][memory_start:stop - spilled_end])
+        
+        snapshot = previous
+        if folded:
+            base_state = previous.state if previous else session_data["initial_state"]
+            snapshot = SessionSnapshot(
+                state=fold_state_deltas(base_state, folded),
+                watermark=EventCursor(event_timestamp(folded[-1]), stop - 1),
+                event_count=(previous.event_count if previous else 0) + len(folded),
+                created_at=time.time()
+            )
+        
+        # Truncate everything up to the watermark
+        stop = max(stop, start)
+        from_disk = min(stop - first, spilled_count)
+        from_memory = stop - first - from_disk
+        if from_disk:
+            self._spill_store.delete_events_before(session_id, first + from_disk)
+        if self.max_bytes and from_memory:
+            dropped = session_data["events"][:from_memory]
+            dropped_bytes = sum(_approx_size(event) for event in dropped)
+            session_data["approx_bytes"] -= dropped_bytes
+            self._total_bytes -= dropped_bytes
+        del session_data["events"][:from_memory]
+        session_data["spilled_events"] -= from_disk
+        session_data["first_seq"] = stop
+        session_data["snapshot"] = snapshot
+        session_data["initial_state"] = None
+        
+        logger.info(f"Compacted {len(folded)} events of session: {session_id}")
+        return snapshot
+    
+    def get_snapshot(
+        self, app_name: str, user_id: str, session_id: str
+    ) -> Optional[SessionSnapshot]:
+        """
+        Get the latest snapshot of a session.
+        
+        Args:
+            app_name: Name of the application
+            user_id: User identifier
+            session_id: Session identifier
+            
+        Returns:
+            The snapshot, or None if the session has never been compacted
+        """
+        session_data = self._load(session_id)
+        if session_data is None or (
+            session_data["app_name"] != app_name or session_data["user_id"] != user_id
+        ):
+            return None
+        return session_data["snapshot"]
+    
+    def get_history(
+        self, app_name: str, user_id: str, session_id: str, max_events: int = 50
+    ) -> Tuple[Optional[SessionSnapshot], List[Any]]:
+        """
+        Get a session's snapshot and the newest events after it.
+        
+        Reads at most max_events events, however long the session is.
+        
+        Args:
+            app_name: Name of the application
+            user_id: User identifier
+            session_id: Session identifier
+            max_events: Maximum number of tail events to return
+            
+        Returns:
+            Tuple of (snapshot or None, tail events in append order)
+        """
+        snapshot = self.get_snapshot(app_name, user_id, session_id)
+        tail = list(self.iter_events(
+            app_name, user_id, session_id, limit=max_events, newest_first=True
+        ))
+        tail.reverse()
+        return snapshot, tail
+    
+    def memory_stats(self) -> Dict[str, Any]:
+        """
+        Get memory usage counters.
+        
+        Returns:
+            Dictionary with in-memory and spilled session counts and the
+            approximate in-memory byte total (tracked only when max_bytes is set)
+        """
+        return {
+            "sessions_in_memory": len(self.sessions),
+            "sessions_spilled": self._spill_store.session_count() if self._spill_store else 0,
+            "approx_bytes": self._total_bytes,
+        }
+    
+    def close(self) -> None:
+        """Close the spill store, removing its file if it is a temporary one."""
+        if self._spill_store is not None:
+            self._spill_store.close()
+    
+    def _load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a session's in-memory record, loading it back from disk if spilled.
+        
+        Args:
+            session_id: Session identifier
+            
+        Returns:
+            The session record, or None if the session does not exist
+        """
+        session_data = self.sessions.get(session_id)
+        if session_data is not None:
+            self.sessions.move_to_end(session_id)
+            return session_data
+        
+        if self._spill_store is None:
+            return None
+        
+        session_data = self._spill_store.pop_session(session_id)
+        if session_data is None:
+            return None
+        
+        self.sessions[session_id] = session_data
+        self._total_bytes += session_data["approx_bytes"]
+        self._track_activity(session_id, session_data)
+        self._enforce_limits(keep=session_id)
+        logger.debug(f"Loaded spilled session: {session_id}")
+        return session_data
+    
+    def _enforce_limits(self, keep: str) -> None:
+        """
+        Spill least recently used sessions until the memory caps are met.
+        
+        Args:
+            keep: Session that must stay in memory (the one being used)
+        """
+        if self._spill_store is None:
+            return
+        
+        # Sessions that could not be spilled this call; stop once every other
+        # session has failed rather than looping over them again
+        failures = 0
+        while len(self.sessions) - failures > 1 and (
+            (self.max_sessions and len(self.sessions) > self.max_sessions)
+            or (self.max_bytes and self._total_bytes > self.max_bytes)
+        ):
+            session_id = next(iter(self.sessions))
+            if session_id == keep:
+                self.sessions.move_to_end(session_id)
+                session_id = next(iter(self.sessions))
+            
+            # Spill before removing, so a session that cannot be stored is not lost
+            session_data = self.sessions[session_id]
+            try:
+                self._spill_store.put_session(session_id, session_data)
+            except Exception as e:
+                logger.error(f"Error spilling session {session_id}, keeping it in memory: {e}")
+                self.sessions.move_to_end(session_id)
+                failures += 1
+                continue
+            
+            del self.sessions[session_id]
+            self._total_bytes -= session_data["approx_bytes"]
+            logger.debug(f"Spilled session to disk: {session_id}")
+    
+    def _track_activity(self, session_id: str, session_data: Dict[str, Any]) -> None:
+        """
+        Record a session's last activity time for find_expired_sessions().
+        
+        Args:
+            session_id: Session identifier
+            session_data: The session's in-memory record
+        """
+        heap = self._activity_heap
+        heapq.heappush(heap, (session_data["last_update_time"], session_id))
+        
+        # Every append leaves an outdated entry behind; rebuild from the live
+        # sessions once they outnumber them, which keeps pushes amortized O(log n)
+        if len(heap) > 2 * len(self.sessions) + 64:
+            heap[:] = [(data["last_update_time"], sid) for sid, data in self.sessions.items()]
+            heapq.heapify(heap)
+    
+    def _spill_events(self, session_id: str, session_data: Dict[str, Any]) -> None:
+        """
+        Move a session's oldest events to disk, keeping the newest in memory.
+        
+        Args:
+            session_id: Session identifier
+            session_data: The session's in-memory record
+        """
+        events = session_data["events"]
+        overflow = len(events) - self.max_events_per_session
+        spilled = events[:overflow]
+        
+        self._spill_store.append_events(
+            session_id, session_data["first_seq"] + session_data["spilled_events"], spilled
+        )
+        session_data["spilled_events"] += overflow
+        del events[:overflow]
+        
+        if self.max_bytes:
+            spilled_bytes = sum(_approx_size(event) for event in spilled)
+            session_data["approx_bytes"] -= spilled_bytes
+            self._total_bytes -= spilled_bytes
+    
+    def _remove_session(self, session_id: str) -> Optional[Tuple[str, str]]:
+        """
+        Remove a session from memory, the spill store and the user index.
+        
+        Args:
+            session_id: Session identifier
+            
+        Returns:
+            The removed session's (app_name, user_id), or None if it does not exist
+        """
+        session_data = self.sessions.pop(session_id, None)
+        if session_data is not None:
+            self._total_bytes -= session_data["approx_bytes"]
+        elif self._spill_store is not None:
+            session_data = self._spill_store.pop_session(session_id)
+        if session_data is None:
+            return None
+        
+        if self._spill_store is not None:
+            self._spill_store.delete(session_id)
+        
+        owner = (session_data["app_name"], session_data["user_id"])
+        user_sessions = self._user_index.get(owner)
+        if user_sessions is not None:
+            user_sessions.pop(session_id, None)
+            if not user_sessions:
+                del self._user_index[owner]
+        return owner
+    
+    def _last_update_time(self, session_id: str) -> float:
+        """
+        Get a session's last activity time without loading it back from disk.
+        
+        Args:
+            session_id: Session identifier
+            
+        Returns:
+            The session's last_update_time
+        """
+        session_data = self.sessions.get(session_id)
+        if session_data is not None:
+            return session_data["last_update_time"]
+        if self._spill_store is not None:
+            return self._spill_store.last_update_time(session_id)
+        return 0.0
 
 
 class SupabaseMemoryService:
     """
     Implements a Supabase-backed session service for production use.
+    
+    With ``buffered=True`` appended events are queued per session and written
+    in bulk by an EventBuffer instead of one insert per event. Reads of a
+    session flush its queued events first, so callers always see their own
+    writes.
     """
     
-    def __init__(self):
-        """Initialize the Supabase session service."""
+    def __init__(
+        self,
+        buffered: bool = False,
+        max_batch_size: int = 50,
+        max_delay_seconds: float = 0.2,
+        codec: Optional[EventCodec] = None
+    ):
+        """
+        Initialize the Supabase session service.
+        
+        Args:
+            buffered: Queue appended events and write them in bulk
+            max_batch_size: Number of queued events that triggers a flush (buffered mode)
+            max_delay_seconds: Maximum time an event may stay queued (buffered mode)
+            codec: Codec for stored event payloads; BinaryEventCodec if None
+        """
         # Get Supabase credentials from environment
         url = os.environ.get("SUPABASE_URL")
         key = os.environ.get("SUPABASE_SERVICE_ROLE_KEY")
@@ -208,12 +1031,22 @@ class SupabaseMemoryService:
         if not url or not key:
             raise ValueError("SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY must be set")
         
-        # Initialize Supabase client
-        self.supabase = create_client(url, key)
+        # Share the process-wide Supabase client and its connection pool
+        self.supabase = get_supabase_client(url, key)
         logger.info("Initialized SupabaseMemoryService")
         
         # Ensure tables exist
         self._ensure_tables_exist()
+        
+        self.codec = codec or BinaryEventCodec()
+        
+        self._event_buffer: Optional[EventBuffer] = None
+        if buffered:
+            self._event_buffer = EventBuffer(
+                self._write_events,
+                max_batch_size=max_batch_size,
+                max_delay_seconds=max_delay_seconds
+            )
     
     def _ensure_tables_exist(self) -> None:
         """Ensure that required tables exist in the database."""
@@ -223,7 +1056,8 @@ class SupabaseMemoryService:
         # Check if the sessions table exists
         try:
             # Just query the table to see if it exists
-            self.supabase.table("instabids.agent_sessions").select("id").limit(1).execute()
+            query = self.supabase.table("instabids.agent_sessions").select("id").limit(1)
+            execute(query, "instabids.agent_sessions", "select")
         except Exception as e:
             logger.warning(f"Sessions table does not exist or is not accessible: {e}")
             # In a real implementation, you would create the table
@@ -250,16 +1084,21 @@ class SupabaseMemoryService:
         )
         
         # Store session in Supabase
-        self.supabase.table("instabids.agent_sessions").insert({
+        query = self.supabase.table("instabids.agent_sessions").insert({
             "id": session.id,
             "app_name": app_name,
             "user_id": user_id,
-            "state": json.dumps(session.state)
-        }).execute()
+            "state": session.state,
+            "initial_state": session.state
+        })
+        with db_tags(session_id=session.id):
+            execute(query, "instabids.agent_sessions", "insert")
+        _set_version(session, 0)
         
         logger.info(f"Created session: {session.id} for user: {user_id}")
         return session
     
+    @db_session
     def get_session(self, app_name: str, user_id: str, session_id: str) -> Optional[Session]:
         """
         Get an existing session.
@@ -272,7 +1111,10 @@ class SupabaseMemoryService:
         Returns:
             The session if found, None otherwise
         """
-        result = self.supabase.table("instabids.agent_sessions").select("*").eq("id", session_id).execute()
+        self._flush_buffered(session_id)
+        
+        query = self.supabase.table("instabids.agent_sessions").select("*").eq("id", session_id)
+        result = execute(query, "instabids.agent_sessions", "select")
         
         if not result.data or len(result.data) == 0:
             logger.warning(f"Session not found: {session_id}")
@@ -288,8 +1130,7 @@ class SupabaseMemoryService:
             )
             return None
         
-        # Parse state from JSON
-        state = json.loads(session_data["state"]) if session_data["state"] else {}
+        state = _decode_state(session_data["state"])
         
         # Create session from stored data
         session = Session(
@@ -298,6 +1139,7 @@ class SupabaseMemoryService:
             user_id=user_id,
             state=state
         )
+        _set_version(session, session_data.get("version", 0))
         
         return session
     
@@ -312,11 +1154,11 @@ class SupabaseMemoryService:
         Returns:
             List of session IDs
         """
-        result = self.supabase.table("instabids.agent_sessions") \
+        query = self.supabase.table("instabids.agent_sessions") \
             .select("id") \
             .eq("app_name", app_name) \
-            .eq("user_id", user_id) \
-            .execute()
+            .eq("user_id", user_id)
+        result = execute(query, "instabids.agent_sessions", "select")
         
         if not result.data:
             return []
@@ -324,6 +1166,7 @@ class SupabaseMemoryService:
         session_ids = [item["id"] for item in result.data]
         return session_ids
     
+    @db_session
     def delete_session(self, app_name: str, user_id: str, session_id: str) -> bool:
         """
         Delete a session.
@@ -337,12 +1180,12 @@ class SupabaseMemoryService:
             True if the session was deleted, False otherwise
         """
         # First, check if the session exists and belongs to the user/app
-        result = self.supabase.table("instabids.agent_sessions") \
+        query = self.supabase.table("instabids.agent_sessions") \
             .select("id") \
             .eq("id", session_id) \
             .eq("app_name", app_name) \
-            .eq("user_id", user_id) \
-            .execute()
+            .eq("user_id", user_id)
+        result = execute(query, "instabids.agent_sessions", "select")
         
         if not result.data or len(result.data) == 0:
             logger.warning(
@@ -351,62 +1194,270 @@ class SupabaseMemoryService:
             )
             return False
         
+        # Queued events of a deleted session never need to be written
+        if self._event_buffer is not None:
+            self._event_buffer.discard(session_id)
+        
         # Delete session
-        self.supabase.table("instabids.agent_sessions").delete().eq("id", session_id).execute()
+        query = self.supabase.table("instabids.agent_sessions").delete().eq("id", session_id)
+        execute(query, "instabids.agent_sessions", "delete")
         
         # Delete related events
-        self.supabase.table("instabids.agent_events").delete().eq("session_id", session_id).execute()
+        query = self.supabase.table("instabids.agent_events").delete().eq("session_id", session_id)
+        execute(query, "instabids.agent_events", "delete")
         
         logger.info(f"Deleted session: {session_id}")
         return True
     
+    def find_expired_sessions(self, idle_seconds: float, limit: int = 500) -> List[str]:
+        """
+        Find sessions with no activity for longer than an idle TTL.
+        
+        A session's updated_at is bumped by state merges and, through a
+        trigger, by every event insert. Queued events are flushed first so
+        they count as activity.
+        
+        Args:
+            idle_seconds: Idle time after which a session has expired
+            limit: Maximum number of session IDs to return
+            
+        Returns:
+            IDs of expired sessions, least recently active first
+        """
+        self.flush()
+        
+        query = self.supabase.table("instabids.agent_sessions") \
+            .select("id") \
+            .lt("updated_at", _idle_cutoff(idle_seconds)) \
+            .order("updated_at") \
+            .limit(limit)
+        result = execute(query, "instabids.agent_sessions", "select")
+        
+        return [row["id"] for row in result.data or []]
+    
+    def delete_sessions(
+        self, session_ids: List[str], idle_seconds: Optional[float] = None
+    ) -> List[str]:
+        """
+        Delete several sessions and their events in one round trip.
+        
+        Events and snapshots are removed by their ON DELETE CASCADE foreign
+        keys; archived events are kept.
+        
+        Args:
+            session_ids: Sessions to delete
+            idle_seconds: If given, skip sessions that had activity within this
+                many seconds (guards against deleting a session revived since
+                it was found expired)
+                
+        Returns:
+            IDs of the sessions that were deleted
+        """
+        if not session_ids:
+            return []
+        
+        query = self.supabase.table("instabids.agent_sessions") \
+            .delete() \
+            .in_("id", list(session_ids))
+        if idle_seconds is not None:
+            query = query.lt("updated_at", _idle_cutoff(idle_seconds))
+        result = execute(query, "instabids.agent_sessions", "delete")
+        
+        deleted = [row["id"] for row in result.data or []]
+        for session_id in deleted:
+            if self._event_buffer is not None:
+                self._event_buffer.discard(session_id)
+        
+        if deleted:
+            logger.info(f"Deleted {len(deleted)} sessions")
+        return deleted
+    
+    @db_session
     def append_event(self, session: Session, event: Any) -> None:
         """
         Append an event to a session.
         
+        In buffered mode the event is queued and written by the next flush;
+        the session object's state is updated immediately either way.
+        
+        State deltas are merged server-side in one call. Unbuffered appends are
+        guarded by the version the session object was loaded at (read from the
+        database if the object did not come from this backend); buffered
+        flushes merge unconditionally since there is no caller left to retry.
+        
         Args:
             session: The session to append the event to
             event: The event to append
+            
+        Raises:
+            SessionConflictError: If another writer changed the session's state
+                since it was loaded (unbuffered mode only)
         """
-        # Store event in Supabase
-        event_data = {
-            "session_id": session.id,
-            "invocation_id": getattr(event, "invocation_id", None),
-            "author": getattr(event, "author", None),
-            "timestamp": getattr(event, "timestamp", None),
-            "event_data": json.dumps({
-                "content": getattr(event, "content", None),
-                "actions": getattr(event, "actions", None)
-            })
-        }
-        
-        self.supabase.table("instabids.agent_events").insert(event_data).execute()
+        event_data = _event_to_row(session.id, event, self.codec)
         
-        # Update session state if event has state_delta
+        state_delta = None
         if hasattr(event, "actions") and hasattr(event.actions, "state_delta"):
-            # Get current state
-            result = self.supabase.table("instabids.agent_sessions") \
-                .select("state") \
-                .eq("id", session.id) \
-                .execute()
-            
-            if result.data and len(result.data) > 0:
-                current_state = json.loads(result.data[0]["state"]) if result.data[0]["state"] else {}
-                
-                # Update state with delta
-                for key, value in event.actions.state_delta.items():
-                    current_state[key] = value
-                    # Update state in session object as well
-                    session.state[key] = value
-                
-                # Save updated state
-                self.supabase.table("instabids.agent_sessions") \
-                    .update({"state": json.dumps(current_state)}) \
-                    .eq("id", session.id) \
-                    .execute()
+            state_delta = event.actions.state_delta
+        
+        if self._event_buffer is not None:
+            self._event_buffer.enqueue(session.id, event_data, state_delta)
+        else:
+            expected_version = _get_version(session)
+            if expected_version is None and state_delta:
+                # Not loaded through this backend (e.g. served from a cache)
+                expected_version = self._load_version(session.id)
+            versions = self._write_events(
+                [event_data],
+                {session.id: state_delta} if state_delta else {},
+                expected_versions={session.id: expected_version}
+            )
+            if session.id in versions:
+                _set_version(session, versions[session.id])
+        
+        # Update state in session object as well
+        if state_delta:
+            for key, value in state_delta.items():
+                session.state[key] = value
         
         logger.debug(f"Appended event to session: {session.id}")
     
+    def flush(self, session_id: Optional[str] = None) -> int:
+        """
+        Write queued events to the database (buffered mode only).
+        
+        Args:
+            session_id: Only flush this session's events; flush everything if None
+            
+        Returns:
+            Number of events written
+        """
+        if self._event_buffer is None:
+            return 0
+        return self._event_buffer.flush(session_id)
+    
+    def end_session(self, session_id: str) -> None:
+        """
+        Mark the end of a session's activity, writing any queued events.
+        
+        Args:
+            session_id: Session identifier
+        """
+        self.flush(session_id)
+    
+    def close(self) -> None:
+        """Flush all queued events and stop the background flusher."""
+        if self._event_buffer is not None:
+            self._event_buffer.close()
+    
+    def buffer_stats(self) -> Optional[Dict[str, Any]]:
+        """
+        Get queue depth and flush latency counters for buffered mode.
+        
+        Returns:
+            Dictionary of buffer counters, or None if buffering is disabled
+        """
+        if self._event_buffer is None:
+            return None
+        return self._event_buffer.stats()
+    
+    def _flush_buffered(self, session_id: str) -> None:
+        """
+        Write a session's queued events before reading it back.
+        
+        Args:
+            session_id: Session identifier
+        """
+        if self._event_buffer is not None:
+            self._event_buffer.flush(session_id)
+    
+    def _write_events(
+        self,
+        rows: List[Dict[str, Any]],
+        state_deltas: Dict[str, Dict[str, Any]],
+        expected_versions: Optional[Dict[str, Optional[int]]] = None
+    ) -> Dict[str, int]:
+        """
+        Persist event rows with one bulk insert and apply their state deltas.
+        
+        State deltas are applied before the insert: re-applying a delta is
+        harmless, so a batch that fails part-way can simply be retried, and a
+        version conflict leaves no orphaned event behind.
+        
+        Args:
+            rows: Event rows in append order
+            state_deltas: Merged state delta per session ID
+            expected_versions: Version guard per session ID; unguarded if omitted
+            
+        Returns:
+            New version of each session whose state was merged
+            
+        Raises:
+            SessionConflictError: If a guarded session's version has moved on
+        """
+        expected_versions = expected_versions or {}
+        versions = {}
+        for session_id, state_delta in state_deltas.items():
+            version = self._merge_state(session_id, state_delta, expected_versions.get(session_id))
+            if version is not None:
+                versions[session_id] = version
+        
+        if rows:
+            query = self.supabase.table("instabids.agent_events").insert(rows)
+            execute(query, "instabids.agent_events", "insert")
+        return versions
+    
+    @db_session
+    def _merge_state(
+        self, session_id: str, state_delta: Dict[str, Any], expected_version: Optional[int]
+    ) -> Optional[int]:
+        """
+        Merge a state delta into a stored session with a single RPC.
+        
+        Args:
+            session_id: Session identifier
+            state_delta: Keys to merge into the session state
+            expected_version: Only merge if the session is at this version
+            
+        Returns:
+            The session's new version, if the RPC reported one
+            
+        Raises:
+            SessionConflictError: If the session is no longer at expected_version
+        """
+        try:
+            query = self.supabase.rpc("merge_agent_session_state", {
+                "p_session_id": session_id,
+                "p_state_delta": state_delta,
+                "p_expected_version": expected_version
+            })
+            result = execute(query, "merge_agent_session_state", "rpc")
+        except Exception as e:
+            if getattr(e, "code", None) == _VERSION_CONFLICT_SQLSTATE:
+                raise SessionConflictError(session_id, expected_version) from e
+            raise
+        
+        return result.data if isinstance(result.data, int) else None
+    
+    @db_session
+    def _load_version(self, session_id: str) -> Optional[int]:
+        """
+        Read a session's current version from the database.
+        
+        Args:
+            session_id: Session identifier
+            
+        Returns:
+            The stored version, or None if the session does not exist
+        """
+        query = self.supabase.table("instabids.agent_sessions") \
+            .select("version") \
+            .eq("id", session_id)
+        result = execute(query, "instabids.agent_sessions", "select")
+        if not result.data:
+            return None
+        return result.data[0].get("version", 0)
+    
+    @db_session
     def list_events(self, app_name: str, user_id: str, session_id: str) -> List[Any]:
         """
         List all events for a session.
@@ -419,13 +1470,15 @@ class SupabaseMemoryService:
         Returns:
             List of events
         """
+        self._flush_buffered(session_id)
+        
         # First, check if the session exists and belongs to the user/app
-        session_result = self.supabase.table("instabids.agent_sessions") \
+        query = self.supabase.table("instabids.agent_sessions") \
             .select("id") \
             .eq("id", session_id) \
             .eq("app_name", app_name) \
-            .eq("user_id", user_id) \
-            .execute()
+            .eq("user_id", user_id)
+        session_result = execute(query, "instabids.agent_sessions", "select")
         
         if not session_result.data or len(session_result.data) == 0:
             logger.warning(
@@ -435,33 +1488,364 @@ class SupabaseMemoryService:
             return []
         
         # Get events
-        events_result = self.supabase.table("instabids.agent_events") \
+        query = self.supabase.table("instabids.agent_events") \
             .select("*") \
             .eq("session_id", session_id) \
-            .order("timestamp", {"ascending": True}) \
-            .execute()
+            .order("timestamp") \
+            .order("id")
+        events_result = execute(query, "instabids.agent_events", "select")
         
         if not events_result.data:
             return []
         
-        # Convert DB rows to event objects
-        # In a real implementation, you would convert to proper Event objects
-        # This is a simplified example
-        events = []
-        for event_data in events_result.data:
-            # Parse event_data JSON
-            event_json = json.loads(event_data["event_data"])
-            
-            # Create a simple dict for demonstration
-            # In a real implementation, you would create Event objects
-            event = {
-                "invocation_id": event_data["invocation_id"],
-                "author": event_data["author"],
-                "timestamp": event_data["timestamp"],
-                "content": event_json.get("content"),
-                "actions": event_json.get("actions")
-            }
+        return [_row_to_event(event_data, self.codec) for event_data in events_result.data]
             
-            events.append(event)
+    @db_session
+    def list_events_page(
+        self,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        cursor: Optional[EventCursor] = None,
+        limit: int = 100,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        newest_first: bool = False
+    ) -> EventPage:
+        """
+        List one page of a session's events.
+            
+        Uses keyset pagination on (timestamp, id), so each page is a single
+        index range scan; the last N events of a long session cost N
+        (use newest_first=True).
+        
+        Args:
+            app_name: Name of the application
+            user_id: User identifier
+            session_id: Session identifier
+            cursor: Continue after this cursor (from a previous page's next_cursor)
+            limit: Maximum number of events to return
+            since: Only events with timestamp >= since
+            until: Only events with timestamp < until
+            newest_first: Page backwards from the newest event
+            
+        Returns:
+            The page of events and the cursor for the next page (None when exhausted)
+        """
+        if not self._verify_session_owner(app_name, user_id, session_id):
+            return EventPage([], None)
+        
+        rows = self._fetch_event_rows(session_id, cursor, limit, since, until, newest_first)
+        next_cursor = None
+        if len(rows) >= limit:
+            next_cursor = EventCursor(rows[-1]["timestamp"], rows[-1]["id"])
+        return EventPage([_row_to_event(row, self.codec) for row in rows], next_cursor)
+    
+    def iter_events(
+        self,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        cursor: Optional[EventCursor] = None,
+        limit: Optional[int] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        newest_first: bool = False,
+        page_size: int = 100
+    ) -> Iterator[Any]:
+        """
+        Iterate over a session's events, fetching pages on demand.
+        
+        Rows are fetched page_size at a time and decoded one by one as they
+        are consumed, so stopping early never pays for unread events.
+        
+        Args:
+            app_name: Name of the application
+            user_id: User identifier
+            session_id: Session identifier
+            cursor: Start after this cursor
+            limit: Stop after this many events; unbounded if None
+            since: Only events with timestamp >= since
+            until: Only events with timestamp < until
+            newest_first: Iterate backwards from the newest event
+            page_size: Number of rows fetched per round trip
+            
+        Yields:
+            Decoded events in the requested order
+        """
+        if not self._verify_session_owner(app_name, user_id, session_id):
+            return
+        
+        remaining = limit
+        while remaining is None or remaining > 0:
+            fetch = page_size if remaining is None else min(page_size, remaining)
+            rows = self._fetch_event_rows(session_id, cursor, fetch, since, until, newest_first)
+            for row in rows:
+                yield _row_to_event(row, self.codec)
+            if remaining is not None:
+                remaining -= len(rows)
+            if len(rows) < fetch:
+                return
+            cursor = EventCursor(rows[-1]["timestamp"], rows[-1]["id"])
+    
+    @db_session
+    def compact_session(
+        self,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        keep_last: int = 50,
+        archive: bool = True,
+        page_size: int = 500
+    ) -> Optional[SessionSnapshot]:
+        """
+        Fold all but the newest events of a session into its snapshot.
+        
+        The state deltas of events up to the watermark are applied on top of
+        the previous snapshot and stored in agent_session_snapshots; the folded
+        events are then moved to agent_events_archive (or deleted) server-side
+        in one call. Only events past the previous snapshot's watermark are
+        folded, so if the move fails after the snapshot is written, the next
+        compaction removes the leftover events without folding or counting
+        them again.
+        
+        Args:
+            app_name: Name of the application
+            user_id: User identifier
+            session_id: Session identifier
+            keep_last: Number of newest events to keep in agent_events
+            archive: Move folded events to the archive table instead of deleting them
+            page_size: Number of rows read per round trip while folding
+            
+        Returns:
+            The session's snapshot (unchanged if there was nothing to fold),
+            or None if the session does not exist or has never been compacted
+        """
+        if not self._verify_session_owner(app_name, user_id, session_id):
+            return None
+        
+        previous = self._fetch_snapshot(session_id)
+        
+        # The newest event beyond keep_last is the new watermark
+        newest = self._fetch_event_rows(session_id, None, keep_last + 1, None, None, True)
+        if len(newest) <= keep_last:
+            return previous
+        watermark = EventCursor(newest[-1]["timestamp"], newest[-1]["id"])
+        
+        if previous is not None and tuple(watermark) <= tuple(previous.watermark):
+            # Only already folded events are due; finish moving them out
+            self._compact_events(session_id, previous.watermark, archive)
+            return previous
+        
+        if previous is not None:
+            base_state = previous.state
+        else:
+            query = self.supabase.table("instabids.agent_sessions") \
+                .select("initial_state") \
+                .eq("id", session_id)
+            result = execute(query, "instabids.agent_sessions", "select")
+            base_state = _decode_state(result.data[0].get("initial_state")) if result.data else {}
+        
+        # Fold from the previous watermark; rows up to it may still be in
+        # agent_events if an earlier compaction failed to move them
+        state = dict(base_state)
+        folded_count = 0
+        cursor = previous.watermark if previous is not None else None
+        while True:
+            rows = self._fetch_event_rows(session_id, cursor, page_size, None, None, False)
+            rows = [row for row in rows if (row["timestamp"], row["id"]) <= tuple(watermark)]
+            state = fold_state_deltas(state, (_row_to_event(row, self.codec) for row in rows))
+            folded_count += len(rows)
+            if len(rows) < page_size:
+                break
+            cursor = EventCursor(rows[-1]["timestamp"], rows[-1]["id"])
+        
+        snapshot = SessionSnapshot(
+            state=state,
+            watermark=watermark,
+            event_count=(previous.event_count if previous else 0) + folded_count,
+            created_at=time.time()
+        )
+        query = self.supabase.table("instabids.agent_session_snapshots").upsert({
+            "session_id": session_id,
+            "state": snapshot.state,
+            "watermark_timestamp": watermark.timestamp,
+            "watermark_id": watermark.id,
+            "event_count": snapshot.event_count
+        })
+        execute(query, "instabids.agent_session_snapshots", "upsert")
+        
+        self._compact_events(session_id, watermark, archive)
+        
+        logger.info(f"Compacted {folded_count} events of session: {session_id}")
+        return snapshot
+    
+    def _compact_events(self, session_id: str, watermark: EventCursor, archive: bool) -> None:
+        """
+        Move (or delete) a session's events up to a watermark out of agent_events.
+        
+        Args:
+            session_id: Session identifier
+            watermark: Last event to remove
+            archive: Move the events to the archive table instead of deleting them
+        """
+        query = self.supabase.rpc("compact_agent_session_events", {
+            "p_session_id": session_id,
+            "p_watermark_timestamp": watermark.timestamp,
+            "p_watermark_id": watermark.id,
+            "p_archive": archive
+        })
+        execute(query, "compact_agent_session_events", "rpc")
+    
+    @db_session
+    def get_snapshot(
+        self, app_name: str, user_id: str, session_id: str
+    ) -> Optional[SessionSnapshot]:
+        """
+        Get the latest snapshot of a session.
+        
+        Args:
+            app_name: Name of the application
+            user_id: User identifier
+            session_id: Session identifier
+            
+        Returns:
+            The snapshot, or None if the session does not exist or has never been compacted
+        """
+        if not self._verify_session_owner(app_name, user_id, session_id):
+            return None
+        return self._fetch_snapshot(session_id)
+    
+    @db_session
+    def get_history(
+        self, app_name: str, user_id: str, session_id: str, max_events: int = 50
+    ) -> Tuple[Optional[SessionSnapshot], List[Any]]:
+        """
+        Get a session's snapshot and the newest events after it.
+        
+        Costs three round trips and at most max_events decoded rows, however
+        long the session is.
+        
+        Args:
+            app_name: Name of the application
+            user_id: User identifier
+            session_id: Session identifier
+            max_events: Maximum number of tail events to return
+            
+        Returns:
+            Tuple of (snapshot or None, tail events in append order)
+        """
+        if not self._verify_session_owner(app_name, user_id, session_id):
+            return None, []
+        
+        snapshot = self._fetch_snapshot(session_id)
+        rows = self._fetch_event_rows(session_id, None, max_events, None, None, True)
+        if snapshot is not None:
+            # Rows left behind by an interrupted compaction are already folded
+            watermark = tuple(snapshot.watermark)
+            rows = [row for row in rows if (row["timestamp"], row["id"]) > watermark]
+        return snapshot, [_row_to_event(row, self.codec) for row in reversed(rows)]
+    
+    @db_session
+    def _fetch_snapshot(self, session_id: str) -> Optional[SessionSnapshot]:
+        """
+        Read a session's snapshot row.
+        
+        Args:
+            session_id: Session identifier
+            
+        Returns:
+            The snapshot, or None if the session has never been compacted
+        """
+        query = self.supabase.table("instabids.agent_session_snapshots") \
+            .select("*") \
+            .eq("session_id", session_id)
+        result = execute(query, "instabids.agent_session_snapshots", "select")
+        
+        if not result.data:
+            return None
+        
+        row = result.data[0]
+        return SessionSnapshot(
+            state=_decode_state(row["state"]),
+            watermark=EventCursor(row["watermark_timestamp"], row["watermark_id"]),
+            event_count=row["event_count"],
+            created_at=row.get("created_at")
+        )
+    
+    @db_session
+    def _verify_session_owner(self, app_name: str, user_id: str, session_id: str) -> bool:
+        """
+        Check that a session exists and belongs to the user/app.
+        
+        Args:
+            app_name: Name of the application
+            user_id: User identifier
+            session_id: Session identifier
+            
+        Returns:
+            True if the session exists and matches
+        """
+        self._flush_buffered(session_id)
+        
+        query = self.supabase.table("instabids.agent_sessions") \
+            .select("id") \
+            .eq("id", session_id) \
+            .eq("app_name", app_name) \
+            .eq("user_id", user_id)
+        session_result = execute(query, "instabids.agent_sessions", "select")
+        
+        if not session_result.data:
+            logger.warning(
+                f"Cannot list events for session {session_id}: not found or does not match "
+                f"app_name={app_name} and user_id={user_id}"
+            )
+            return False
+        return True
+    
+    @db_session
+    def _fetch_event_rows(
+        self,
+        session_id: str,
+        cursor: Optional[EventCursor],
+        limit: int,
+        since: Optional[float],
+        until: Optional[float],
+        newest_first: bool
+    ) -> List[Dict[str, Any]]:
+        """
+        Fetch one keyset page of raw agent_events rows.
+        
+        Args:
+            session_id: Session identifier
+            cursor: Fetch rows after (or before, if newest_first) this cursor
+            limit: Maximum number of rows
+            since: Only rows with timestamp >= since
+            until: Only rows with timestamp < until
+            newest_first: Fetch in descending (timestamp, id) order
+            
+        Returns:
+            List of undecoded rows
+        """
+        query = self.supabase.table("instabids.agent_events") \
+            .select("*") \
+            .eq("session_id", session_id)
+        
+        if since is not None:
+            query = query.gte("timestamp", since)
+        if until is not None:
+            query = query.lt("timestamp", until)
+        if cursor is not None:
+            op = "lt" if newest_first else "gt"
+            query = query.or_(
+                f"timestamp.{op}.{cursor.timestamp},"
+                f"and(timestamp.eq.{cursor.timestamp},id.{op}.{cursor.id})"
+            )
+        
+        query = query \
+            .order("timestamp", desc=newest_first) \
+            .order("id", desc=newest_first) \
+            .limit(limit)
+        result = execute(query, "instabids.agent_events", "select")
         
-        return events
\ No newline at end of file
+        return result.data or []
\ No newline at end of file
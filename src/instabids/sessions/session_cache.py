@@ -0,0 +1,304 @@
+"""
+Read-through session cache for ADK session services.
+
+CachedSessionService wraps InMemorySessionService or SupabaseMemoryService
+and keeps recently used sessions in a bounded in-process LRU cache with a
+per-entry TTL, so the runner's per-turn get_session() calls for hot sessions
+do not go to the backing store. Writes made through the wrapper keep the
+cache consistent: append_event() applies state deltas to the cached entry and
+delete_session() and delete_sessions() invalidate it.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from google.adk.session import Session
+
+from ..utils.logging import get_default_logger
+
+logger = get_default_logger()
+
+
+class _CacheEntry:
+    """Cached copy of a session's identity and state."""
+    
+    __slots__ = ("app_name", "user_id", "state", "expires_at")
+    
+    def __init__(self, app_name: str, user_id: str, state: Dict[str, Any], expires_at: float):
+        """
+        Initialize a cache entry.
+        
+        Args:
+            app_name: Name of the application
+            user_id: User identifier
+            state: Private copy of the session state
+            expires_at: Monotonic time after which the entry is stale
+        """
+        self.app_name = app_name
+        self.user_id = user_id
+        self.state = state
+        self.expires_at = expires_at
+
+
+class CachedSessionService:
+    """
+    Bounded LRU/TTL read-through cache in front of a session service.
+    
+    Only writes that go through this wrapper are reflected in the cache;
+    writes made by other processes become visible once the entry's TTL
+    expires. Any attribute not defined here (e.g. ``flush`` or
+    ``buffer_stats``) is forwarded to the wrapped service.
+    """
+    
+    def __init__(self, service: Any, max_entries: int = 1024, ttl_seconds: float = 30.0):
+        """
+        Initialize the cache.
+        
+        Args:
+            service: The session service to wrap
+            max_entries: Maximum number of cached sessions
+            ttl_seconds: How long a cached session may be served
+            
+        Raises:
+            ValueError: If max_entries or ttl_seconds is not positive
+        """
+        if max_entries <= 0 or ttl_seconds <= 0:
+            raise ValueError("max_entries and ttl_seconds must be positive")
+        
+        self.service = service
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        
+        self._entries: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        
+        logger.info(
+            f"Initialized CachedSessionService (max_entries={max_entries}, "
+            f"ttl_seconds={ttl_seconds}) over {type(service).__name__}"
+        )
+    
+    def __getattr__(self, name: str) -> Any:
+        """
+        Forward unknown attributes to the wrapped service.
+        
+        Args:
+            name: Attribute name
+            
+        Returns:
+            The wrapped service's attribute
+        """
+        if name == "service":
+            raise AttributeError(name)
+        return getattr(self.service, name)
+    
+    def create_session(
+        self, app_name: str, user_id: str, state: Optional[Dict[str, Any]] = None
+    ) -> Session:
+        """
+        Create a new session and cache it.
+        
+        Args:
+            app_name: Name of the application
+            user_id: User identifier
+            state: Initial state for the session
+            
+        Returns:
+            The created session
+        """
+        session = self.service.create_session(app_name, user_id, state)
+        self._store(session)
+        return session
+    
+    def get_session(self, app_name: str, user_id: str, session_id: str) -> Optional[Session]:
+        """
+        Get a session, serving it from the cache when possible.
+        
+        Args:
+            app_name: Name of the application
+            user_id: User identifier
+            session_id: Session identifier
+            
+        Returns:
+            The session if found, None otherwise
+        """
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is not None and entry.expires_at <= time.monotonic():
+                del self._entries[session_id]
+                self._expirations += 1
+                entry = None
+            
+            if entry is not None:
+                self._hits += 1
+                self._entries.move_to_end(session_id)
+                if entry.app_name != app_name or entry.user_id != user_id:
+                    logger.warning(
+                        f"Session {session_id} does not match app_name={app_name} "
+                        f"and user_id={user_id}"
+                    )
+                    return None
+                return Session(
+                    id=session_id,
+                    app_name=entry.app_name,
+                    user_id=entry.user_id,
+                    state=dict(entry.state)
+                )
+            
+            self._misses += 1
+        
+        session = self.service.get_session(app_name, user_id, session_id)
+        if session is not None:
+            self._store(session)
+        return session
+    
+    def list_sessions(self, app_name: str, user_id: str) -> List[str]:
+        """
+        List all sessions for a user (not cached).
+        
+        Args:
+            app_name: Name of the application
+            user_id: User identifier
+            
+        Returns:
+            List of session IDs
+        """
+        return self.service.list_sessions(app_name, user_id)
+    
+    def delete_session(self, app_name: str, user_id: str, session_id: str) -> bool:
+        """
+        Delete a session and drop it from the cache.
+        
+        Args:
+            app_name: Name of the application
+            user_id: User identifier
+            session_id: Session identifier
+            
+        Returns:
+            True if the session was deleted, False otherwise
+        """
+        self.invalidate(session_id)
+        return self.service.delete_session(app_name, user_id, session_id)
+    
+    def delete_sessions(
+        self, session_ids: List[str], idle_seconds: Optional[float] = None
+    ) -> List[str]:
+        """
+        Delete several sessions and drop the deleted ones from the cache.
+        
+        Sessions the wrapped service skips as revived stay cached.
+        
+        Args:
+            session_ids: Sessions to delete
+            idle_seconds: If given, skip sessions that had activity within this
+                many seconds
+                
+        Returns:
+            IDs of the sessions that were deleted
+        """
+        deleted = self.service.delete_sessions(session_ids, idle_seconds=idle_seconds)
+        with self._lock:
+            for session_id in deleted:
+                self._entries.pop(session_id, None)
+        return deleted
+    
+    def append_event(self, session: Session, event: Any) -> None:
+        """
+        Append an event and apply its state delta to the cached entry.
+        
+        If the wrapped service rejects the append (for example with a
+        SessionConflictError), the cached entry is dropped so the next read
+        reloads the session.
+        
+        Args:
+            session: The session to append the event to
+            event: The event to append
+        """
+        try:
+            self.service.append_event(session, event)
+        except Exception:
+            self.invalidate(session.id)
+            raise
+        
+        state_delta = None
+        if hasattr(event, "actions") and hasattr(event.actions, "state_delta"):
+            state_delta = event.actions.state_delta
+        if not state_delta:
+            return
+        
+        with self._lock:
+            entry = self._entries.get(session.id)
+            if entry is not None:
+                entry.state.update(state_delta)
+    
+    def list_events(self, app_name: str, user_id: str, session_id: str) -> List[Any]:
+        """
+        List all events for a session (not cached).
+        
+        Args:
+            app_name: Name of the application
+            user_id: User identifier
+            session_id: Session identifier
+            
+        Returns:
+            List of events
+        """
+        return self.service.list_events(app_name, user_id, session_id)
+    
+    def invalidate(self, session_id: str) -> None:
+        """
+        Drop a session from the cache.
+        
+        Args:
+            session_id: Session identifier
+        """
+        with self._lock:
+            self._entries.pop(session_id, None)
+    
+    def clear(self) -> None:
+        """Drop every cached session."""
+        with self._lock:
+            self._entries.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache hit, miss and eviction counters.
+        
+        Returns:
+            Dictionary of cache counters
+        """
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+            }
+    
+    def _store(self, session: Session) -> None:
+        """
+        Cache a private copy of a session, evicting the least recently used entry.
+        
+        Args:
+            session: The session to cache
+        """
+        entry = _CacheEntry(
+            session.app_name,
+            session.user_id,
+            dict(session.state),
+            time.monotonic() + self.ttl_seconds
+        )
+        with self._lock:
+            self._entries[session.id] = entry
+            self._entries.move_to_end(session.id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
\ No newline at end of file
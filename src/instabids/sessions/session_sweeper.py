@@ -0,0 +1,178 @@
+"""
+Background expiry of idle agent sessions.
+
+Homeowners often abandon a conversation halfway, and their sessions and
+events would otherwise stay in storage forever. SessionSweeper periodically
+asks a session service for sessions idle longer than a TTL and deletes them
+in bounded batches on its own daemon thread, so cleanup never runs on the
+request path. Any service with ``find_expired_sessions`` and
+``delete_sessions`` can be swept: SupabaseMemoryService and
+ShardedInMemorySessionService. Sweep a CachedSessionService rather than the
+service it wraps, so deleted sessions are dropped from the cache too. The
+plain InMemorySessionService is not thread-safe and must be swept by calling
+``sweep_once`` from the thread that owns it.
+"""
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from ..utils.logging import get_default_logger
+
+logger = get_default_logger()
+
+
+class SessionSweeper:
+    """
+    Deletes sessions that have been idle longer than a TTL.
+    
+    Each sweep deletes at most ``max_batches_per_sweep`` batches of
+    ``batch_size`` sessions and pauses ``pause_seconds`` between batches,
+    which bounds both the load it puts on the store and how long it holds
+    any shard lock.
+    """
+    
+    def __init__(
+        self,
+        service: Any,
+        idle_seconds: float = 24 * 60 * 60,
+        interval_seconds: float = 300.0,
+        batch_size: int = 200,
+        max_batches_per_sweep: int = 50,
+        pause_seconds: float = 0.05
+    ):
+        """
+        Initialize the sweeper.
+        
+        Args:
+            service: Session service to sweep
+            idle_seconds: Idle time after which a session is deleted
+            interval_seconds: Time between sweeps
+            batch_size: Number of sessions deleted per batch
+            max_batches_per_sweep: Maximum number of batches per sweep
+            pause_seconds: Pause between batches
+            
+        Raises:
+            ValueError: If idle_seconds, interval_seconds or batch_size is not positive
+        """
+        if idle_seconds <= 0 or interval_seconds <= 0 or batch_size <= 0:
+            raise ValueError("idle_seconds, interval_seconds and batch_size must be positive")
+        
+        self.service = service
+        self.idle_seconds = idle_seconds
+        self.interval_seconds = interval_seconds
+        self.batch_size = batch_size
+        self.max_batches_per_sweep = max_batches_per_sweep
+        self.pause_seconds = pause_seconds
+        
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stats_lock = threading.Lock()
+        
+        self._sweeps = 0
+        self._batches = 0
+        self._sessions_deleted = 0
+        self._errors = 0
+        self._last_error: Optional[str] = None
+        self._last_sweep_at: Optional[float] = None
+        self._last_sweep_seconds = 0.0
+        self._last_sweep_deleted = 0
+    
+    def start(self) -> None:
+        """Start sweeping on a background daemon thread."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="instabids-session-sweeper", daemon=True
+        )
+        self._thread.start()
+        logger.info(
+            f"Started session sweeper (idle TTL {self.idle_seconds}s, "
+            f"every {self.interval_seconds}s)"
+        )
+    
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        Stop the background thread, letting the current batch finish.
+        
+        Args:
+            timeout: Maximum time to wait for the thread to exit
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+    
+    def sweep_once(self) -> int:
+        """
+        Run one sweep.
+        
+        Returns:
+            Number of sessions deleted
+        """
+        started = time.time()
+        deleted_total = 0
+        batches = 0
+        
+        while batches < self.max_batches_per_sweep and not self._stop.is_set():
+            expired = self.service.find_expired_sessions(self.idle_seconds, limit=self.batch_size)
+            if not expired:
+                break
+            
+            deleted = self.service.delete_sessions(expired, idle_seconds=self.idle_seconds)
+            batches += 1
+            deleted_total += len(deleted)
+            with self._stats_lock:
+                self._batches += 1
+                self._sessions_deleted += len(deleted)
+            
+            # Nothing deletable (all revived) or the backlog is cleared
+            if not deleted or len(expired) < self.batch_size:
+                break
+            if self.pause_seconds:
+                self._stop.wait(self.pause_seconds)
+        
+        with self._stats_lock:
+            self._sweeps += 1
+            self._last_sweep_at = started
+            self._last_sweep_seconds = time.time() - started
+            self._last_sweep_deleted = deleted_total
+        
+        if deleted_total:
+            logger.info(f"Session sweep deleted {deleted_total} sessions in {batches} batches")
+        return deleted_total
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get sweeper progress counters.
+        
+        Returns:
+            Dictionary with sweep, batch, deletion and error counts and details
+            of the last sweep
+        """
+        with self._stats_lock:
+            return {
+                "running": self._thread is not None and self._thread.is_alive(),
+                "sweeps": self._sweeps,
+                "batches": self._batches,
+                "sessions_deleted": self._sessions_deleted,
+                "errors": self._errors,
+                "last_error": self._last_error,
+                "last_sweep_at": self._last_sweep_at,
+                "last_sweep_seconds": self._last_sweep_seconds,
+                "last_sweep_deleted": self._last_sweep_deleted,
+            }
+    
+    def _run(self) -> None:
+        """Sweep every interval_seconds until stopped."""
+        while not self._stop.is_set():
+            try:
+                self.sweep_once()
+            except Exception as e:
+                # Keep sweeping on later intervals; the failed batch is retried then
+                logger.error(f"Session sweep failed: {e}")
+                with self._stats_lock:
+                    self._errors += 1
+                    self._last_error = str(e)
+            self._stop.wait(self.interval_seconds)
\ No newline at end of file
@@ -0,0 +1,501 @@
+"""
+Thread-safe sharded in-memory session service.
+
+InMemorySessionService mutates plain dicts and lists without locking, and a
+single lock around it would serialize every worker thread of a threaded
+server. ShardedInMemorySessionService partitions sessions by a hash of their
+ID across N independent InMemorySessionService shards, each guarded by its
+own lock, so operations on sessions in different shards run concurrently and
+every operation on one session (including append_event and its state
+update) is atomic.
+"""
+import logging
+import threading
+import time
+import uuid
+from types import SimpleNamespace
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from google.adk.session import Session
+
+from .compaction import SessionSnapshot
+from .event_pagination import EventCursor, EventPage
+from .memory_service import InMemorySessionService
+from ..utils.logging import get_default_logger
+
+logger = get_default_logger()
+
+
+class ShardedInMemorySessionService:
+    """
+    In-memory session service safe for concurrent use from many threads.
+    
+    Has the same interface as InMemorySessionService. Memory caps apply per
+    shard: each shard gets an equal part of max_sessions and max_bytes.
+    """
+    
+    def __init__(
+        self,
+        num_shards: int = 16,
+        max_sessions: Optional[int] = None,
+        max_events_per_session: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        spill_path: Optional[str] = None
+    ):
+        """
+        Initialize the sharded session service.
+        
+        Args:
+            num_shards: Number of independently locked shards
+            max_sessions: Maximum number of sessions kept in memory over all shards
+            max_events_per_session: Maximum number of events kept in memory per session
+            max_bytes: Approximate maximum size of the sessions kept in memory over all shards
+            spill_path: SQLite file prefix for spilled data (one file per shard,
+                suffixed with the shard number); temporary files if None
+                
+        Raises:
+            ValueError: If num_shards is less than 1
+        """
+        if num_shards < 1:
+            raise ValueError("num_shards must be at least 1")
+        
+        self._shards = [
+            InMemorySessionService(
+                max_sessions=-(-max_sessions // num_shards) if max_sessions else None,
+                max_events_per_session=max_events_per_session,
+                max_bytes=-(-max_bytes // num_shards) if max_bytes else None,
+                spill_path=f"{spill_path}.{index}" if spill_path else None
+            )
+            for index in range(num_shards)
+        ]
+        self._locks = [threading.Lock() for _ in range(num_shards)]
+        
+        # (app_name, user_id) -> session IDs in creation order, over all shards
+        self._user_index: Dict[Tuple[str, str], Dict[str, None]] = {}
+        self._index_lock = threading.Lock()
+        
+        logger.info(f"Initialized ShardedInMemorySessionService with {num_shards} shards")
+    
+    def _shard(self, session_id: str) -> Tuple[InMemorySessionService, threading.Lock]:
+        """
+        Get the shard holding a session and its lock.
+        
+        Args:
+            session_id: Session identifier
+            
+        Returns:
+            Tuple of (shard, lock)
+        """
+        index = self._shard_index(session_id)
+        return self._shards[index], self._locks[index]
+    
+    def _shard_index(self, session_id: str) -> int:
+        """
+        Get the number of the shard holding a session.
+        
+        Args:
+            session_id: Session identifier
+            
+        Returns:
+            The shard number
+        """
+        return hash(session_id) % len(self._shards)
+    
+    def create_session(
+        self, app_name: str, user_id: str, state: Optional[Dict[str, Any]] = None
+    ) -> Session:
+        """
+        Create a new session.
+        
+        Args:
+            app_name: Name of the application
+            user_id: User identifier
+            state: Initial state for the session
+            
+        Returns:
+            The created session
+        """
+        # The ID picks the shard, so it is generated before the session
+        session_id = str(uuid.uuid4())
+        shard, lock = self._shard(session_id)
+        with lock:
+            session = shard.create_session(app_name, user_id, state, session_id=session_id)
+        with self._index_lock:
+            self._user_index.setdefault((app_name, user_id), {})[session_id] = None
+        return session
+    
+    def get_session(self, app_name: str, user_id: str, session_id: str) -> Optional[Session]:
+        """
+        Get an existing session.
+        
+        Args:
+            app_name: Name of the application
+            user_id: User identifier
+            session_id: Session identifier
+            
+        Returns:
+            The session if found, None otherwise
+        """
+        shard, lock = self._shard(session_id)
+        with lock:
+            return shard.get_session(app_name, user_id, session_id)
+    
+    def list_sessions(
+        self, app_name: str, user_id: str, order_by_last_activity: bool = False
+    ) -> List[str]:
+        """
+        List all sessions for a user.
+        
+        Args:
+            app_name: Name of the application
+            user_id: User identifier
+            order_by_last_activity: Return the most recently active sessions first
+                instead of creation order
+                
+        Returns:
+            List of session IDs
+        """
+        with self._index_lock:
+            session_ids = list(self._user_index.get((app_name, user_id), ()))
+        
+        if order_by_last_activity:
+            last_update_times = {}
+            for session_id in session_ids:
+                shard, lock = self._shard(session_id)
+                with lock:
+                    last_update_times[session_id] = shard._last_update_time(session_id)
+            session_ids.sort(key=last_update_times.__getitem__, reverse=True)
+        
+        return session_ids
+    
+    def delete_session(self, app_name: str, user_id: str, session_id: str) -> bool:
+        """
+        Delete a session.
+        
+        Args:
+            app_name: Name of the application
+            user_id: User identifier
+            session_id: Session identifier
+            
+        Returns:
+            True if the session was deleted, False otherwise
+        """
+        shard, lock = self._shard(session_id)
+        with lock:
+            deleted = shard.delete_session(app_name, user_id, session_id)
+        
+        if deleted:
+            with self._index_lock:
+                user_sessions = self._user_index.get((app_name, user_id))
+                if user_sessions is not None:
+                    user_sessions.pop(session_id, None)
+                    if not user_sessions:
+                        del self._user_index[(app_name, user_id)]
+        return deleted
+    
+    def find_expired_sessions(self, idle_seconds: float, limit: int = 500) -> List[str]:
+        """
+        Find sessions with no appended events for longer than an idle TTL.
+        
+        Shards are scanned one at a time, each under its own lock.
+        
+        Args:
+            idle_seconds: Idle time after which a session has expired
+            limit: Maximum number of session IDs to return
+            
+        Returns:
+            IDs of expired sessions
+        """
+        expired: List[str] = []
+        for shard, lock in zip(self._shards, self._locks):
+            if len(expired) >= limit:
+                break
+            with lock:
+                expired.extend(shard.find_expired_sessions(idle_seconds, limit - len(expired)))
+        return expired
+    
+    def delete_sessions(
+        self, session_ids: List[str], idle_seconds: Optional[float] = None
+    ) -> List[str]:
+        """
+        Delete several sessions and their events.
+        
+        Each shard's lock is taken once for all of its sessions in the batch.
+        
+        Args:
+            session_ids: Sessions to delete
+            idle_seconds: If given, skip sessions that had activity within this
+                many seconds (guards against deleting a session revived since
+                it was found expired)
+                
+        Returns:
+            IDs of the sessions that were deleted
+        """
+        by_shard: Dict[int, List[str]] = {}
+        for session_id in session_ids:
+            by_shard.setdefault(self._shard_index(session_id), []).append(session_id)
+        
+        cutoff = time.time() - idle_seconds if idle_seconds is not None else None
+        removed = []
+        for index, shard_session_ids in by_shard.items():
+            shard = self._shards[index]
+            with self._locks[index]:
+                for session_id in shard_session_ids:
+                    if cutoff is not None and shard._last_update_time(session_id) >= cutoff:
+                        continue
+                    owner = shard._remove_session(session_id)
+                    if owner is not None:
+                        removed.append((session_id, owner))
+        
+        with self._index_lock:
+            for session_id, owner in removed:
+                user_sessions = self._user_index.get(owner)
+                if user_sessions is not None:
+                    user_sessions.pop(session_id, None)
+                    if not user_sessions:
+                        del self._user_index[owner]
+        
+        if removed:
+            logger.info(f"Deleted {len(removed)} sessions")
+        return [session_id for session_id, _ in removed]
+    
+    def append_event(self, session: Session, event: Any) -> None:
+        """
+        Append an event to a session.
+        
+        The event is appended and its state delta applied under the shard's
+        lock, so concurrent appends to one session never interleave.
+        
+        Args:
+            session: The session to append the event to
+            event: The event to append
+        """
+        shard, lock = self._shard(session.id)
+        with lock:
+            shard.append_event(session, event)
+    
+    def list_events(self, app_name: str, user_id: str, session_id: str) -> List[Any]:
+        """
+        List all events for a session.
+        
+        Args:
+            app_name: Name of the application
+            user_id: User identifier
+            session_id: Session identifier
+            
+        Returns:
+            List of events (a copy, safe to use while other threads append)
+        """
+        shard, lock = self._shard(session_id)
+        with lock:
+            return list(shard.list_events(app_name, user_id, session_id))
+    
+    def list_events_page(
+        self,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        cursor: Optional[EventCursor] = None,
+        limit: int = 100,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        newest_first: bool = False
+    ) -> EventPage:
+        """
+        List one page of a session's events.
+        
+        Args:
+            app_name: Name of the application
+            user_id: User identifier
+            session_id: Session identifier
+            cursor: Continue after this cursor (from a previous page's next_cursor)
+            limit: Maximum number of events to return
+            since: Only events with timestamp >= since
+            until: Only events with timestamp < until
+            newest_first: Page backwards from the newest event
+            
+        Returns:
+            The page of events and the cursor for the next page (None when exhausted)
+        """
+        shard, lock = self._shard(session_id)
+        with lock:
+            return shard.list_events_page(
+                app_name, user_id, session_id, cursor, limit, since, until, newest_first
+            )
+    
+    def iter_events(
+        self,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        cursor: Optional[EventCursor] = None,
+        limit: Optional[int] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        newest_first: bool = False,
+        page_size: int = 100
+    ) -> Iterator[Any]:
+        """
+        Iterate over a session's events, reading them as they are consumed.
+        
+        Events are read a page at a time so the shard's lock is never held
+        while the caller processes them.
+        
+        Args:
+            app_name: Name of the application
+            user_id: User identifier
+            session_id: Session identifier
+            cursor: Start after this cursor
+            limit: Stop after this many events; unbounded if None
+            since: Only events with timestamp >= since
+            until: Only events with timestamp < until
+            newest_first: Iterate backwards from the newest event
+            page_size: Number of events read per lock acquisition
+            
+        Yields:
+            Events in the requested order
+        """
+        remaining = limit
+        while remaining is None or remaining > 0:
+            page_limit = page_size if remaining is None else min(page_size, remaining)
+            page = self.list_events_page(
+                app_name, user_id, session_id, cursor, page_limit, since, until, newest_first
+            )
+            yield from page.events
+            if remaining is not None:
+                remaining -= len(page.events)
+            if page.next_cursor is None:
+                return
+            cursor = page.next_cursor
+    
+    def compact_session(
+        self, app_name: str, user_id: str, session_id: str, keep_last: int = 50
+    ) -> Optional[SessionSnapshot]:
+        """
+        Fold all but the newest events of a session into its snapshot.
+        
+        Args:
+            app_name: Name of the application
+            user_id: User identifier
+            session_id: Session identifier
+            keep_last: Number of newest events to keep in the live log
+            
+        Returns:
+            The session's snapshot, or None if the session does not exist or
+            has never been compacted
+        """
+        shard, lock = self._shard(session_id)
+        with lock:
+            return shard.compact_session(app_name, user_id, session_id, keep_last)
+    
+    def get_snapshot(
+        self, app_name: str, user_id: str, session_id: str
+    ) -> Optional[SessionSnapshot]:
+        """
+        Get the latest snapshot of a session.
+        
+        Args:
+            app_name: Name of the application
+            user_id: User identifier
+            session_id: Session identifier
+            
+        Returns:
+            The snapshot, or None if the session has never been compacted
+        """
+        shard, lock = self._shard(session_id)
+        with lock:
+            return shard.get_snapshot(app_name, user_id, session_id)
+    
+    def get_history(
+        self, app_name: str, user_id: str, session_id: str, max_events: int = 50
+    ) -> Tuple[Optional[SessionSnapshot], List[Any]]:
+        """
+        Get a session's snapshot and the newest events after it, consistently.
+        
+        Args:
+            app_name: Name of the application
+            user_id: User identifier
+            session_id: Session identifier
+            max_events: Maximum number of tail events to return
+            
+        Returns:
+            Tuple of (snapshot or None, tail events in append order)
+        """
+        shard, lock = self._shard(session_id)
+        with lock:
+            return shard.get_history(app_name, user_id, session_id, max_events)
+    
+    def close(self) -> None:
+        """Close every shard's spill store, removing temporary files."""
+        for shard, lock in zip(self._shards, self._locks):
+            with lock:
+                shard.close()
+    
+    def memory_stats(self) -> Dict[str, Any]:
+        """
+        Get memory usage counters summed over all shards.
+        
+        Returns:
+            Dictionary with in-memory and spilled session counts and the
+            approximate in-memory byte total (tracked only when max_bytes is set)
+        """
+        totals = {"sessions_in_memory": 0, "sessions_spilled": 0, "approx_bytes": 0}
+        for shard, lock in zip(self._shards, self._locks):
+            with lock:
+                stats = shard.memory_stats()
+            for key in totals:
+                totals[key] += stats[key]
+        totals["shards"] = len(self._shards)
+        return totals
+
+
+def _benchmark(operations: int = 20000, sessions_per_thread: int = 16) -> None:
+    """
+    Print the get/append throughput of 1 shard vs 16 shards at several thread
+    counts, with everything in memory and with events spilled to disk.
+    """
+    logger.setLevel(logging.WARNING)
+    
+    def run(service: ShardedInMemorySessionService, threads: int) -> float:
+        per_thread = operations // threads
+        barrier = threading.Barrier(threads + 1)
+        
+        def work(index: int) -> None:
+            user_id = f"user-{index}"
+            sessions = [
+                service.create_session("benchmark", user_id, {"step": 0})
+                for _ in range(sessions_per_thread)
+            ]
+            barrier.wait()
+            for number in range(per_thread):
+                session = sessions[number % sessions_per_thread]
+                service.get_session("benchmark", user_id, session.id)
+                service.append_event(session, SimpleNamespace(
+                    timestamp=time.time(),
+                    actions=SimpleNamespace(state_delta={"step": number})
+                ))
+        
+        workers = [threading.Thread(target=work, args=(index,)) for index in range(threads)]
+        for worker in workers:
+            worker.start()
+        barrier.wait()
+        start = time.perf_counter()
+        for worker in workers:
+            worker.join()
+        return per_thread * threads / (time.perf_counter() - start)
+    
+    for label, max_events in (("in memory", None), ("spilling events", 4)):
+        print(label)
+        for threads in (1, 4, 8, 16):
+            results = []
+            for num_shards in (1, 16):
+                service = ShardedInMemorySessionService(
+                    num_shards=num_shards, max_events_per_session=max_events
+                )
+                results.append(f"{num_shards:>2} shards {run(service, threads):>9,.0f} turns/s")
+                service.close()
+            print(f"  {threads:>2} threads: " + "  ".join(results))
+
+
+if __name__ == "__main__":
+    _benchmark()
\ No newline at end of file
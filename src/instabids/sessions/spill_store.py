@@ -0,0 +1,238 @@
+"""
+On-disk spill store for the in-memory session service.
+
+When InMemorySessionService is created with memory caps, cold sessions and
+the oldest events of long sessions are moved here and loaded back
+transparently when they are needed again. The store is a local SQLite file
+private to the process; entries are pickled, so it must never be pointed at
+a file shared with untrusted writers.
+"""
+import os
+import pickle
+import sqlite3
+import tempfile
+import threading
+from typing import Any, Dict, List, Optional
+
+from ..utils.logging import get_default_logger
+
+logger = get_default_logger()
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS spilled_sessions (
+    session_id TEXT PRIMARY KEY,
+    last_update_time REAL NOT NULL,
+    data BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS spilled_events (
+    session_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (session_id, seq)
+);
+CREATE INDEX IF NOT EXISTS spilled_sessions_last_update_idx
+    ON spilled_sessions (last_update_time);
+"""
+
+
+class SessionSpillStore:
+    """
+    SQLite-backed store for evicted sessions and overflow events.
+    
+    Sessions are stored whole (state and in-memory events); overflow events
+    are stored per session under an increasing sequence number so they can
+    be read back in append order.
+    """
+    
+    def __init__(self, path: Optional[str] = None):
+        """
+        Open (or create) the spill store.
+        
+        Args:
+            path: SQLite file to use; a temporary file removed on close() if None
+        """
+        self._owns_file = path is None
+        if path is None:
+            fd, path = tempfile.mkstemp(prefix="instabids-sessions-", suffix=".sqlite")
+            os.close(fd)
+        self.path = path
+        
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=OFF")
+        self._conn.executescript(_SCHEMA)
+        logger.info(f"Initialized SessionSpillStore at {path}")
+    
+    def put_session(self, session_id: str, session_data: Dict[str, Any]) -> None:
+        """
+        Store an evicted session.
+        
+        Args:
+            session_id: Session identifier
+            session_data: The session's in-memory record
+        """
+        blob = pickle.dumps(session_data, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO spilled_sessions (session_id, last_update_time, data) "
+                "VALUES (?, ?, ?)",
+                (session_id, session_data.get("last_update_time", 0.0), blob)
+            )
+    
+    def pop_session(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Remove and return an evicted session.
+        
+        Args:
+            session_id: Session identifier
+            
+        Returns:
+            The session's in-memory record, or None if it was not spilled
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM spilled_sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("DELETE FROM spilled_sessions WHERE session_id = ?", (session_id,))
+        return pickle.loads(row[0])
+    
+    def has_session(self, session_id: str) -> bool:
+        """
+        Check whether a session is currently spilled.
+        
+        Args:
+            session_id: Session identifier
+            
+        Returns:
+            True if the session is stored here
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM spilled_sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        return row is not None
+    
+    def last_update_time(self, session_id: str) -> float:
+        """
+        Get the last activity time of a spilled session.
+        
+        Args:
+            session_id: Session identifier
+            
+        Returns:
+            The session's last_update_time, or 0.0 if it is not stored here
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT last_update_time FROM spilled_sessions WHERE session_id = ?",
+                (session_id,)
+            ).fetchone()
+        return row[0] if row else 0.0
+    
+    def find_idle_sessions(self, cutoff: float, limit: int) -> List[str]:
+        """
+        Find spilled sessions with no activity since a point in time.
+        
+        Args:
+            cutoff: Epoch seconds; sessions last updated before this are returned
+            limit: Maximum number of session IDs to return
+            
+        Returns:
+            Session IDs, least recently updated first
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT session_id FROM spilled_sessions WHERE last_update_time < ? "
+                "ORDER BY last_update_time LIMIT ?",
+                (cutoff, limit)
+            ).fetchall()
+        return [row[0] for row in rows]
+    
+    def append_events(self, session_id: str, first_seq: int, events: List[Any]) -> None:
+        """
+        Store overflow events of a session.
+        
+        Args:
+            session_id: Session identifier
+            first_seq: Sequence number of the first event
+            events: Events in append order
+        """
+        rows = [
+            (session_id, first_seq + offset, pickle.dumps(event, protocol=pickle.HIGHEST_PROTOCOL))
+            for offset, event in enumerate(events)
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO spilled_events (session_id, seq, data) VALUES (?, ?, ?)",
+                rows
+            )
+    
+    def load_events(
+        self, session_id: str, start_seq: int = 0, end_seq: Optional[int] = None
+    ) -> List[Any]:
+        """
+        Read overflow events of a session in append order.
+        
+        Args:
+            session_id: Session identifier
+            start_seq: First sequence number to read
+            end_seq: Stop before this sequence number; read to the end if None
+            
+        Returns:
+            List of events
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT data FROM spilled_events WHERE session_id = ? AND seq >= ? AND seq < ? "
+                "ORDER BY seq",
+                (session_id, start_seq, end_seq if end_seq is not None else 2 ** 62)
+            ).fetchall()
+        return [pickle.loads(row[0]) for row in rows]
+    
+    def delete_events_before(self, session_id: str, seq: int) -> None:
+        """
+        Remove a session's overflow events with sequence numbers below seq.
+        
+        Args:
+            session_id: Session identifier
+            seq: First sequence number to keep
+        """
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM spilled_events WHERE session_id = ? AND seq < ?", (session_id, seq)
+            )
+    
+    def delete(self, session_id: str) -> None:
+        """
+        Remove everything stored for a session.
+        
+        Args:
+            session_id: Session identifier
+        """
+        with self._lock:
+            self._conn.execute("DELETE FROM spilled_sessions WHERE session_id = ?", (session_id,))
+            self._conn.execute("DELETE FROM spilled_events WHERE session_id = ?", (session_id,))
+    
+    def session_count(self) -> int:
+        """
+        Count spilled sessions.
+        
+        Returns:
+            Number of sessions stored here
+        """
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM spilled_sessions").fetchone()[0]
+    
+    def close(self) -> None:
+        """Close the store, removing its file if it was a temporary one."""
+        with self._lock:
+            self._conn.close()
+        if self._owns_file:
+            for suffix in ("", "-wal", "-shm"):
+                try:
+                    os.remove(self.path + suffix)
+                except OSError:
+                    pass
\ No newline at end of file
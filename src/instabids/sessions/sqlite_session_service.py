@@ -0,0 +1,566 @@
+"""
+Embedded SQLite session service for single-node deployments.
+
+SqliteSessionService has the same interface as the other session services
+and keeps sessions and events in a local SQLite database in WAL mode, so
+they survive restarts without a round trip to Supabase. It also serves as a
+realistic local stand-in for SupabaseMemoryService in benchmarks.
+
+Each thread gets its own connection; SQL statements are module constants so
+sqlite3's per-connection statement cache reuses the prepared statements.
+State deltas are merged in the database with json_set, so concurrent writers
+(threads or processes sharing the file) never lose each other's keys.
+"""
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+from google.adk.session import Session
+
+from .event_codec import BinaryEventCodec, EventCodec
+from .event_pagination import EventCursor, EventPage, event_timestamp
+from .memory_service import _decode_state, _row_to_event
+from ..utils.logging import get_default_logger
+
+logger = get_default_logger()
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS agent_sessions (
+    id TEXT PRIMARY KEY,
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT '{}',
+    version INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS agent_sessions_app_user_idx
+    ON agent_sessions (app_name, user_id);
+CREATE INDEX IF NOT EXISTS agent_sessions_updated_at_idx
+    ON agent_sessions (updated_at);
+CREATE TABLE IF NOT EXISTS agent_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL REFERENCES agent_sessions (id) ON DELETE CASCADE,
+    invocation_id TEXT,
+    author TEXT,
+    timestamp REAL NOT NULL DEFAULT 0,
+    event_blob BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS agent_events_session_timestamp_idx
+    ON agent_events (session_id, timestamp, id);
+"""
+
+# Databases created before agent_events.timestamp was NOT NULL may hold NULL
+# timestamps, which break the (timestamp, id) cursor; store them as 0 once
+_SCHEMA_VERSION = 1
+_UPGRADE_SCHEMA = f"""
+BEGIN IMMEDIATE;
+UPDATE agent_events SET timestamp = 0 WHERE timestamp IS NULL;
+PRAGMA user_version = {_SCHEMA_VERSION};
+COMMIT;
+"""
+
+_INSERT_SESSION = (
+    "INSERT INTO agent_sessions (id, app_name, user_id, state, created_at, updated_at) "
+    "VALUES (?, ?, ?, ?, ?, ?)"
+)
+_SELECT_SESSION = "SELECT app_name, user_id, state FROM agent_sessions WHERE id = ?"
+_SELECT_OWNED = "SELECT 1 FROM agent_sessions WHERE id = ? AND app_name = ? AND user_id = ?"
+_SESSION_EXISTS = "SELECT 1 FROM agent_sessions WHERE id = ?"
+_LIST_SESSIONS = (
+    "SELECT id FROM agent_sessions WHERE app_name = ? AND user_id = ? ORDER BY created_at"
+)
+_DELETE_SESSION = "DELETE FROM agent_sessions WHERE id = ?"
+_INSERT_EVENT = (
+    "INSERT INTO agent_events (session_id, invocation_id, author, timestamp, event_blob) "
+    "VALUES (?, ?, ?, ?, ?)"
+)
+_TOUCH_SESSION = "UPDATE agent_sessions SET updated_at = ? WHERE id = ?"
+_FIND_EXPIRED = "SELECT id FROM agent_sessions WHERE updated_at < ? ORDER BY updated_at LIMIT ?"
+_SELECT_EVENTS = (
+    "SELECT id, invocation_id, author, timestamp, event_blob FROM agent_events "
+    "WHERE session_id = ? ORDER BY timestamp, id"
+)
+
+
+class SqliteSessionService:
+    """
+    Implements a durable session service on a local SQLite database.
+    
+    Safe to use from many threads. Several processes may share the database
+    file on one host; SQLite serializes their writes.
+    """
+    
+    def __init__(
+        self,
+        path: str = "instabids_sessions.sqlite",
+        codec: Optional[EventCodec] = None,
+        busy_timeout_seconds: float = 5.0
+    ):
+        """
+        Open (or create) the session database.
+        
+        Args:
+            path: SQLite database file
+            codec: Codec for stored event payloads; BinaryEventCodec if None
+            busy_timeout_seconds: How long a write waits for another writer's lock
+        """
+        self.path = path
+        self.codec = codec or BinaryEventCodec()
+        self.busy_timeout_seconds = busy_timeout_seconds
+        
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        
+        conn = self._conn()
+        conn.executescript(_SCHEMA)
+        if conn.execute("PRAGMA user_version").fetchone()[0] < _SCHEMA_VERSION:
+            conn.executescript(_UPGRADE_SCHEMA)
+        logger.info(f"Initialized SqliteSessionService at {path}")
+    
+    def _conn(self) -> sqlite3.Connection:
+        """
+        Get the calling thread's connection, opening it on first use.
+        
+        Returns:
+            The connection
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self.path,
+                timeout=self.busy_timeout_seconds,
+                isolation_level=None,
+                check_same_thread=False
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+    
+    def create_session(
+        self, app_name: str, user_id: str, state: Optional[Dict[str, Any]] = None
+    ) -> Session:
+        """
+        Create a new session.
+        
+        Args:
+            app_name: Name of the application
+            user_id: User identifier
+            state: Initial state for the session
+            
+        Returns:
+            The created session
+        """
+        session = Session(
+            app_name=app_name,
+            user_id=user_id,
+            state=state or {}
+        )
+        
+        now = time.time()
+        self._conn().execute(
+            _INSERT_SESSION,
+            (session.id, app_name, user_id, json.dumps(session.state), now, now)
+        )
+        
+        logger.info(f"Created session: {session.id} for user: {user_id}")
+        return session
+    
+    def get_session(self, app_name: str, user_id: str, session_id: str) -> Optional[Session]:
+        """
+        Get an existing session.
+        
+        Args:
+            app_name: Name of the application
+            user_id: User identifier
+            session_id: Session identifier
+            
+        Returns:
+            The session if found, None otherwise
+        """
+        row = self._conn().execute(_SELECT_SESSION, (session_id,)).fetchone()
+        if row is None:
+            logger.warning(f"Session not found: {session_id}")
+            return None
+        
+        # Verify app_name and user_id
+        if row[0] != app_name or row[1] != user_id:
+            logger.warning(
+                f"Session {session_id} does not match app_name={app_name} "
+                f"and user_id={user_id}"
+            )
+            return None
+        
+        return Session(
+            id=session_id,
+            app_name=app_name,
+            user_id=user_id,
+            state=_decode_state(row[2])
+        )
+    
+    def list_sessions(self, app_name: str, user_id: str) -> List[str]:
+        """
+        List all sessions for a user.
+        
+        Args:
+            app_name: Name of the application
+            user_id: User identifier
+            
+        Returns:
+            List of session IDs, in creation order
+        """
+        rows = self._conn().execute(_LIST_SESSIONS, (app_name, user_id)).fetchall()
+        return [row[0] for row in rows]
+    
+    def delete_session(self, app_name: str, user_id: str, session_id: str) -> bool:
+        """
+        Delete a session and its events.
+        
+        Args:
+            app_name: Name of the application
+            user_id: User identifier
+            session_id: Session identifier
+            
+        Returns:
+            True if the session was deleted, False otherwise
+        """
+        conn = self._conn()
+        if conn.execute(_SELECT_OWNED, (session_id, app_name, user_id)).fetchone() is None:
+            logger.warning(
+                f"Cannot delete session {session_id}: not found or does not match "
+                f"app_name={app_name} and user_id={user_id}"
+            )
+            return False
+        
+        # Events are removed by the ON DELETE CASCADE foreign key
+        conn.execute(_DELETE_SESSION, (session_id,))
+        
+        logger.info(f"Deleted session: {session_id}")
+        return True
+    
+    def append_event(self, session: Session, event: Any) -> None:
+        """
+        Append an event to a session.
+        
+        The event insert and the state merge are one transaction. Appending to
+        a session that does not exist (e.g. one deleted since it was loaded)
+        logs a warning and stores nothing.
+        
+        Args:
+            session: The session to append the event to
+            event: The event to append
+        """
+        state_delta = None
+        if hasattr(event, "actions") and hasattr(event.actions, "state_delta"):
+            state_delta = event.actions.state_delta
+        
+        blob = self.codec.encode({
+            "content": getattr(event, "content", None),
+            "actions": getattr(event, "actions", None)
+        })
+        
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if conn.execute(_SESSION_EXISTS, (session.id,)).fetchone() is None:
+                conn.execute("ROLLBACK")
+                logger.warning(f"Cannot append event to session {session.id}: not found")
+                return
+            conn.execute(_INSERT_EVENT, (
+                session.id,
+                getattr(event, "invocation_id", None),
+                getattr(event, "author", None),
+                event_timestamp(event),
+                blob
+            ))
+            if state_delta:
+                self._merge_state(conn, session.id, state_delta)
+            else:
+                conn.execute(_TOUCH_SESSION, (time.time(), session.id))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        
+        if state_delta:
+            for key, value in state_delta.items():
+                session.state[key] = value
+        
+        logger.debug(f"Appended event to session: {session.id}")
+    
+    def _merge_state(
+        self, conn: sqlite3.Connection, session_id: str, state_delta: Dict[str, Any]
+    ) -> None:
+        """
+        Merge a state delta into a stored session with a single UPDATE.
+        
+        Must be called inside a transaction.
+        
+        Args:
+            conn: The calling thread's connection
+            session_id: Session identifier
+            state_delta: Keys to merge into the session state
+        """
+        if any('"' in key for key in state_delta):
+            # JSON paths cannot quote these keys; merge them in Python under
+            # the transaction's write lock instead
+            row = conn.execute(_SELECT_SESSION, (session_id,)).fetchone()
+            state = _decode_state(row[2]) if row else {}
+            state.update(state_delta)
+            conn.execute(
+                "UPDATE agent_sessions SET state = ?, version = version + 1, updated_at = ? "
+                "WHERE id = ?",
+                (json.dumps(state), time.time(), session_id)
+            )
+            return
+        
+        # One (path, value) argument pair per key; the statement is cached per key count
+        placeholders = ", ".join(["?, json(?)"] * len(state_delta))
+        params: List[Any] = []
+        for key, value in state_delta.items():
+            params.append(f'$."{key}"')
+            params.append(json.dumps(value))
+        conn.execute(
+            f"UPDATE agent_sessions SET state = json_set(state, {placeholders}), "
+            f"version = version + 1, updated_at = ? WHERE id = ?",
+            (*params, time.time(), session_id)
+        )
+    
+    def list_events(self, app_name: str, user_id: str, session_id: str) -> List[Any]:
+        """
+        List all events for a session.
+        
+        Args:
+            app_name: Name of the application
+            user_id: User identifier
+            session_id: Session identifier
+            
+        Returns:
+            List of events
+        """
+        conn = self._conn()
+        if conn.execute(_SELECT_OWNED, (session_id, app_name, user_id)).fetchone() is None:
+            logger.warning(
+                f"Cannot list events for session {session_id}: not found or does not match "
+                f"app_name={app_name} and user_id={user_id}"
+            )
+            return []
+        
+        rows = conn.execute(_SELECT_EVENTS, (session_id,)).fetchall()
+        return [self._decode_row(row) for row in rows]
+    
+    def list_events_page(
+        self,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        cursor: Optional[EventCursor] = None,
+        limit: int = 100,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        newest_first: bool = False
+    ) -> EventPage:
+        """
+        List one page of a session's events.
+        
+        Args:
+            app_name: Name of the application
+            user_id: User identifier
+            session_id: Session identifier
+            cursor: Continue after this cursor (from a previous page's next_cursor)
+            limit: Maximum number of events to return
+            since: Only events with timestamp >= since
+            until: Only events with timestamp < until
+            newest_first: Page backwards from the newest event
+            
+        Returns:
+            The page of events and the cursor for the next page (None when exhausted)
+        """
+        conn = self._conn()
+        if conn.execute(_SELECT_OWNED, (session_id, app_name, user_id)).fetchone() is None:
+            return EventPage([], None)
+        
+        rows = self._fetch_event_rows(session_id, cursor, limit, since, until, newest_first)
+        next_cursor = None
+        if len(rows) >= limit:
+            next_cursor = EventCursor(rows[-1][3], rows[-1][0])
+        return EventPage([self._decode_row(row) for row in rows], next_cursor)
+    
+    def iter_events(
+        self,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        cursor: Optional[EventCursor] = None,
+        limit: Optional[int] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        newest_first: bool = False,
+        page_size: int = 100
+    ) -> Iterator[Any]:
+        """
+        Iterate over a session's events, reading pages on demand.
+        
+        Args:
+            app_name: Name of the application
+            user_id: User identifier
+            session_id: Session identifier
+            cursor: Start after this cursor
+            limit: Stop after this many events; unbounded if None
+            since: Only events with timestamp >= since
+            until: Only events with timestamp < until
+            newest_first: Iterate backwards from the newest event
+            page_size: Number of rows read per query
+            
+        Yields:
+            Decoded events in the requested order
+        """
+        conn = self._conn()
+        if conn.execute(_SELECT_OWNED, (session_id, app_name, user_id)).fetchone() is None:
+            return
+        
+        remaining = limit
+        while remaining is None or remaining > 0:
+            fetch = page_size if remaining is None else min(page_size, remaining)
+            rows = self._fetch_event_rows(session_id, cursor, fetch, since, until, newest_first)
+            for row in rows:
+                yield self._decode_row(row)
+            if remaining is not None:
+                remaining -= len(rows)
+            if len(rows) < fetch:
+                return
+            cursor = EventCursor(rows[-1][3], rows[-1][0])
+    
+    def find_expired_sessions(self, idle_seconds: float, limit: int = 500) -> List[str]:
+        """
+        Find sessions with no activity for longer than an idle TTL.
+        
+        Args:
+            idle_seconds: Idle time after which a session has expired
+            limit: Maximum number of session IDs to return
+            
+        Returns:
+            IDs of expired sessions, least recently active first
+        """
+        rows = self._conn().execute(_FIND_EXPIRED, (time.time() - idle_seconds, limit)).fetchall()
+        return [row[0] for row in rows]
+    
+    def delete_sessions(
+        self, session_ids: List[str], idle_seconds: Optional[float] = None
+    ) -> List[str]:
+        """
+        Delete several sessions and their events in one statement.
+        
+        Args:
+            session_ids: Sessions to delete
+            idle_seconds: If given, skip sessions that had activity within this
+                many seconds (guards against deleting a session revived since
+                it was found expired)
+                
+        Returns:
+            IDs of the sessions that were deleted
+        """
+        if not session_ids:
+            return []
+        
+        condition = "id IN (" + ", ".join("?" * len(session_ids)) + ")"
+        params: List[Any] = list(session_ids)
+        if idle_seconds is not None:
+            condition += " AND updated_at < ?"
+            params.append(time.time() - idle_seconds)
+        
+        # Events are removed by the ON DELETE CASCADE foreign key
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(
+                f"SELECT id FROM agent_sessions WHERE {condition}", params
+            ).fetchall()
+            conn.execute(f"DELETE FROM agent_sessions WHERE {condition}", params)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        
+        deleted = [row[0] for row in rows]
+        if deleted:
+            logger.info(f"Deleted {len(deleted)} sessions")
+        return deleted
+    
+    def close(self) -> None:
+        """Close every thread's connection."""
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+    
+    def _fetch_event_rows(
+        self,
+        session_id: str,
+        cursor: Optional[EventCursor],
+        limit: int,
+        since: Optional[float],
+        until: Optional[float],
+        newest_first: bool
+    ) -> List[tuple]:
+        """
+        Fetch one keyset page of raw agent_events rows.
+        
+        Args:
+            session_id: Session identifier
+            cursor: Fetch rows after (or before, if newest_first) this cursor
+            limit: Maximum number of rows
+            since: Only rows with timestamp >= since
+            until: Only rows with timestamp < until
+            newest_first: Fetch in descending (timestamp, id) order
+            
+        Returns:
+            List of (id, invocation_id, author, timestamp, event_blob) rows
+        """
+        sql = (
+            "SELECT id, invocation_id, author, timestamp, event_blob FROM agent_events "
+            "WHERE session_id = ?"
+        )
+        params: List[Any] = [session_id]
+        
+        if since is not None:
+            sql += " AND timestamp >= ?"
+            params.append(since)
+        if until is not None:
+            sql += " AND timestamp < ?"
+            params.append(until)
+        if cursor is not None:
+            op = "<" if newest_first else ">"
+            sql += f" AND (timestamp, id) {op} (?, ?)"
+            params.extend([cursor.timestamp, cursor.id])
+        
+        direction = "DESC" if newest_first else "ASC"
+        sql += f" ORDER BY timestamp {direction}, id {direction} LIMIT ?"
+        params.append(limit)
+        
+        return self._conn().execute(sql, params).fetchall()
+    
+    def _decode_row(self, row: tuple) -> Dict[str, Any]:
+        """
+        Decode an agent_events row into an event.
+        
+        Args:
+            row: (id, invocation_id, author, timestamp, event_blob) row
+            
+        Returns:
+            The decoded event
+        """
+        return _row_to_event({
+            "invocation_id": row[1],
+            "author": row[2],
+            "timestamp": row[3],
+            "event_blob": row[4]
+        }, self.codec)
\ No newline at end of file
@@ -2,12 +2,16 @@
 Shared tools for agents.
 """
 
-from .database_tools import save_bid_card, get_bid_card, find_contractors
+from .database_tools import (
+    save_bid_card, save_bid_cards, get_bid_card, get_bid_cards, find_contractors
+)
 from .vision_tools import analyze_image
 
 __all__ = [
     'save_bid_card',
+    'save_bid_cards',
     'get_bid_card',
+    'get_bid_cards',
     'find_contractors',
     'analyze_image'
 ]
\ No newline at end of file
@@ -0,0 +1,316 @@
+"""
+Asyncio database tools for agents.
+
+Async counterparts of the tools in database_tools, with the same names,
+arguments and results, for agents running inside an asyncio server. While
+one call waits on the database the event loop keeps serving other
+conversations, so tool calls from different sessions overlap.
+
+Database calls use the shared async Supabase client. If the installed
+supabase package has no async client, the sync tools run on the default
+thread pool instead. Register the tools on an agent with use_async_tools.
+"""
+import asyncio
+from typing import Any, Dict, Iterable, List, Optional
+
+from ..utils.db_metrics import db_tool, execute_async
+from ..utils.supabase_client import get_async_supabase_client
+from . import database_tools
+from .contractor_index import get_contractor_index
+from .database_tools import _build_bid_card_row, _check_radius, _decode_bid_card_row
+
+async def _invalidate_bid_cards(bid_card_ids: Iterable[str]) -> None:
+    """
+    Drop bid cards from the cache without blocking the event loop.
+    
+    Args:
+        bid_card_ids: IDs of the changed bid cards
+    """
+    cache = database_tools.get_bid_card_cache()
+    if cache is not None:
+        await cache.adelete_many(bid_card_ids)
+
+@db_tool
+async def save_bid_card(
+    homeowner_id: str,
+    bid_card_data: Dict[str, Any]
+) -> Dict[str, Any]:
+    """
+    Saves a bid card to the database.
+    
+    Args:
+        homeowner_id: ID of the homeowner creating the bid card
+        bid_card_data: The complete bid card data to save
+        
+    Returns:
+        Dict[str, Any]: Response with status and result:
+            - status: "success" or "error"
+            - bid_card_id: ID of the saved bid card (if success)
+            - error: Error message (if error)
+    """
+    try:
+        supabase = await get_async_supabase_client()
+        if supabase is None:
+            return await asyncio.to_thread(
+                database_tools.save_bid_card, homeowner_id, bid_card_data
+            )
+        
+        insert_data, error = _build_bid_card_row(homeowner_id, bid_card_data)
+        if error:
+            return {
+                "status": "error",
+                "error": error,
+                "bid_card_id": None
+            }
+        bid_card_id = insert_data["id"]
+        
+        query = supabase.table("instabids.bid_cards").insert(insert_data)
+        await execute_async(query, "instabids.bid_cards", "insert")
+        await _invalidate_bid_cards([bid_card_id])
+        
+        return {
+            "status": "success",
+            "bid_card_id": bid_card_id,
+            "message": "Bid card saved successfully"
+        }
+    
+    except Exception as e:
+        return {
+            "status": "error",
+            "error": f"Error saving bid card: {str(e)}",
+            "bid_card_id": None
+        }
+
+@db_tool
+async def get_bid_card(bid_card_id: str) -> Dict[str, Any]:
+    """
+    Retrieves a bid card, from the bid card cache when possible.
+    
+    Args:
+        bid_card_id: The ID of the bid card to retrieve
+        
+    Returns:
+        Dict[str, Any]: Response with status and result:
+            - status: "success" or "error"
+            - bid_card: The complete bid card data (if success)
+            - error: Error message (if error)
+    """
+    cache = database_tools.get_bid_card_cache()
+    if cache is not None:
+        bid_card = (await cache.aget_many([bid_card_id])).get(bid_card_id)
+        if bid_card is not None:
+            return {
+                "status": "success",
+                "bid_card": bid_card
+            }
+    
+    try:
+        supabase = await get_async_supabase_client()
+        if supabase is None:
+            return await asyncio.to_thread(database_tools.get_bid_card, bid_card_id)
+        
+        query = supabase.table("instabids.bid_cards") \
+            .select("*") \
+            .eq("id", bid_card_id)
+        result = await execute_async(query, "instabids.bid_cards", "select")
+        
+        if not result.data:
+            return {
+                "status": "error",
+                "error": f"Bid card not found: {bid_card_id}",
+                "bid_card": None
+            }
+        
+        bid_card = _decode_bid_card_row(result.data[0])
+        if cache is not None:
+            await cache.aset_many({bid_card_id: bid_card})
+        
+        return {
+            "status": "success",
+            "bid_card": bid_card
+        }
+    
+    except Exception as e:
+        return {
+            "status": "error",
+            "error": f"Error retrieving bid card: {str(e)}",
+            "bid_card": None
+        }
+
+@db_tool
+async def get_bid_cards(
+    bid_card_ids: Iterable[str],
+    fields: Optional[List[str]] = None,
+    chunk_size: int = 200
+) -> Dict[str, Any]:
+    """
+    Retrieves many bid cards with as few queries as possible.
+    
+    Args:
+        bid_card_ids: IDs of the bid cards to retrieve
+        fields: Columns to return (the ID is always included); all if None
+        chunk_size: Maximum number of IDs per query
+        
+    Returns:
+        Dict[str, Any]: Response with status and result:
+            - status: "success" or "error"
+            - bid_cards: The bid cards found, in the order of bid_card_ids
+            - missing: IDs with no bid card
+            - error: Error message (if error)
+    """
+    bid_card_ids = list(bid_card_ids)
+    columns = None
+    if fields is not None:
+        columns = ["id"] + [field for field in fields if field != "id"]
+    
+    found: Dict[str, Dict[str, Any]] = {}
+    to_fetch = []
+    cache = database_tools.get_bid_card_cache()
+    cached = await cache.aget_many(dict.fromkeys(bid_card_ids)) if cache is not None else {}
+    for bid_card_id in dict.fromkeys(bid_card_ids):
+        bid_card = cached.get(bid_card_id)
+        if bid_card is None:
+            to_fetch.append(bid_card_id)
+        elif columns is None:
+            found[bid_card_id] = bid_card
+        else:
+            found[bid_card_id] = {
+                column: bid_card[column] for column in columns if column in bid_card
+            }
+    
+    try:
+        if to_fetch:
+            supabase = await get_async_supabase_client()
+            if supabase is None:
+                return await asyncio.to_thread(
+                    database_tools.get_bid_cards, bid_card_ids, fields, chunk_size
+                )
+            select = ",".join(columns) if columns is not None else "*"
+            
+            # Chunks are fetched concurrently
+            results = await asyncio.gather(*(
+                execute_async(
+                    supabase.table("instabids.bid_cards")
+                    .select(select)
+                    .in_("id", to_fetch[start:start + chunk_size]),
+                    "instabids.bid_cards", "select"
+                )
+                for start in range(0, len(to_fetch), chunk_size)
+            ))
+            
+            fetched = {}
+            for result in results:
+                for row in result.data or []:
+                    bid_card = _decode_bid_card_row(row)
+                    fetched[bid_card["id"]] = bid_card
+            found.update(fetched)
+            # Only complete cards are cached
+            if cache is not None and columns is None:
+                await cache.aset_many(fetched)
+    
+    except Exception as e:
+        return {
+            "status": "error",
+            "error": f"Error retrieving bid cards: {str(e)}",
+            "bid_cards": [],
+            "missing": []
+        }
+    
+    bid_cards = []
+    missing = []
+    for bid_card_id in bid_card_ids:
+        if bid_card_id in found:
+            bid_cards.append(found[bid_card_id])
+        elif bid_card_id not in missing:
+            missing.append(bid_card_id)
+    
+    return {
+        "status": "success",
+        "bid_cards": bid_cards,
+        "missing": missing
+    }
+
+@db_tool
+async def find_contractors(
+    project_type: str,
+    location: Dict[str, str],
+    specialties: Optional[List[str]] = None,
+    limit: int = 5,
+    radius_miles: Optional[float] = None,
+    weights: Optional[Dict[str, float]] = None
+) -> Dict[str, Any]:
+    """
+    Finds contractors based on project type, location, and specialties.
+    
+    Contractors offering every word of the project type in the given city
+    and state are matched, or with radius_miles, contractors serving within
+    that distance of the location's ZIP code. Matches are ranked by rating,
+    verified status, distance, how many of the specialties they offer and how
+    often they answer invitations, and the best are returned with their
+    score.
+    
+    Args:
+        project_type: Type of project (e.g., "bathroom remodel")
+        location: Location details including city, state, and zip
+        specialties: Optional list of preferred specialties
+        limit: Maximum number of contractors to return
+        radius_miles: Optional search radius around location["zip"], in miles
+            (at most 500)
+        weights: Optional ranking weights by feature ("rating", "verified",
+            "distance", "specialty", "response_rate")
+            
+    Returns:
+        Dict[str, Any]: Response with status and result:
+            - status: "success" or "error"
+            - contractors: List of matching contractors (if success)
+            - error: Error message (if error)
+    """
+    try:
+        radius_miles = _check_radius(radius_miles)
+        index = get_contractor_index()
+        if index.needs_refresh():
+            # Refreshing queries the database; searching is in-memory
+            await asyncio.to_thread(index.refresh_if_stale)
+        
+        contractors = index.search(
+            project_type, location, specialties=specialties, limit=limit,
+            radius_miles=radius_miles, weights=weights
+        )
+        
+        return {
+            "status": "success",
+            "contractors": contractors,
+            "count": len(contractors)
+        }
+    
+    except Exception as e:
+        return {
+            "status": "error",
+            "error": f"Error finding contractors: {str(e)}",
+            "contractors": []
+        }
+
+# Sync tool -> async counterpart, by function name
+ASYNC_TOOLS = {
+    tool.__name__: tool
+    for tool in (save_bid_card, get_bid_card, get_bid_cards, find_contractors)
+}
+
+def use_async_tools(agent: Any) -> Any:
+    """
+    Replace an agent's sync database tools with their async counterparts.
+    
+    Tools without an async counterpart are kept as they are.
+    
+    Args:
+        agent: The ADK agent, e.g. root_agent
+        
+    Returns:
+        The same agent
+    """
+    agent.tools = [
+        ASYNC_TOOLS.get(tool.__name__, tool)
+        if getattr(tool, "__module__", None) == database_tools.__name__ else tool
+        for tool in agent.tools
+    ]
+    return agent
\ No newline at end of file
@@ -0,0 +1,129 @@
+"""
+Declarative column spec and row codec for instabids.bid_cards.
+
+BID_CARD_COLUMNS lists every column the tools write, whether it is JSONB,
+required, or filled from a default. RowCodec compiles a spec once into the
+lookups its encode and decode use, so converting a row is a few dictionary
+operations with no per-call spec handling.
+
+JSONB columns are sent as native JSON. Rows written before that held those
+columns as JSON strings; decode still unwraps such strings until the
+20250710_bid_card_native_jsonb migration has converted them.
+"""
+import json
+import uuid
+from typing import Any, Callable, Dict, Iterable, NamedTuple, Optional
+
+# First characters of the JSON strings older rows hold in JSONB columns
+_ENCODED_JSON_STARTS = frozenset('{["')
+
+class Column(NamedTuple):
+    """A column of a table row."""
+    
+    name: str
+    # "json" for JSONB columns, "plain" for everything else
+    kind: str = "plain"
+    required: bool = False
+    # Builds the value from the input data when it has none
+    default: Optional[Callable[[Dict[str, Any]], Any]] = None
+
+BID_CARD_COLUMNS = (
+    Column("id", default=lambda data: str(uuid.uuid4())),
+    Column("project_type", required=True),
+    Column("project_scope", required=True),
+    Column("timeline", "json", required=True),
+    Column("location", "json", required=True),
+    Column("project_name", default=lambda data: f"{data['project_type']} Project"),
+    Column("status", default=lambda data: "draft"),
+    Column("budget_range", "json"),
+    Column("materials_preferences", "json"),
+    Column("accessibility_needs", "json"),
+    Column("scheduling_constraints", "json"),
+    Column("image_analysis_results", "json"),
+    Column("photo_urls"),
+    Column("special_requirements")
+)
+
+class RowCodec:
+    """
+    Encoder and decoder of table rows, compiled from a column spec.
+    """
+    
+    def __init__(self, columns: Iterable[Column]):
+        """
+        Compile a column spec.
+        
+        Args:
+            columns: The table's columns
+            
+        Raises:
+            ValueError: If a column has an unknown kind or is listed twice
+        """
+        columns = tuple(columns)
+        seen = set()
+        for column in columns:
+            if column.name in seen:
+                raise ValueError(f"Duplicate column in spec: {column.name}")
+            seen.add(column.name)
+            if column.kind not in ("json", "plain"):
+                raise ValueError(f"Unknown kind for column {column.name}: {column.kind}")
+        
+        self.columns = columns
+        self._required = tuple(column.name for column in columns if column.required)
+        self._defaults = tuple(
+            (column.name, column.default) for column in columns if column.default is not None
+        )
+        self._optional = tuple(
+            column.name for column in columns if column.default is None
+        )
+        self._json = tuple(column.name for column in columns if column.kind == "json")
+    
+    def encode(self, data: Dict[str, Any], **values: Any) -> Dict[str, Any]:
+        """
+        Build a row from input data.
+        
+        Keys of data that are not columns are dropped, and JSON columns keep
+        their dicts and lists so they are stored as native JSONB.
+        
+        Args:
+            data: The input data
+            **values: Columns set by the caller rather than taken from data
+                (e.g. homeowner_id)
+                
+        Returns:
+            Dict[str, Any]: The row
+            
+        Raises:
+            ValueError: If data is missing a required column
+        """
+        for name in self._required:
+            if name not in data:
+                raise ValueError(f"Missing required field: {name}")
+        
+        row = {name: data[name] for name in self._optional if name in data}
+        for name, default in self._defaults:
+            row[name] = data[name] if name in data else default(data)
+        row.update(values)
+        return row
+    
+    def decode(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Convert legacy JSON strings in a row's JSON columns back to objects.
+        
+        Args:
+            row: The row, with all or some of its columns
+            
+        Returns:
+            Dict[str, Any]: The row, decoded in place
+        """
+        for name in self._json:
+            value = row.get(name)
+            if isinstance(value, str) and value[:1] in _ENCODED_JSON_STARTS:
+                try:
+                    row[name] = json.loads(value)
+                except ValueError:
+                    # Keep as string if not valid JSON
+                    pass
+        return row
+
+BID_CARD_CODEC = RowCodec(BID_CARD_COLUMNS)
\ No newline at end of file
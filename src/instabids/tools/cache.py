@@ -0,0 +1,307 @@
+"""
+Caches for data read by the tools.
+
+A cache is a CacheBackend. LocalCacheBackend keeps entries in the current
+process; RedisCacheBackend keeps them in Redis (or any client with the same
+get/set/delete interface) so every worker shares one cache.
+
+The async tools use the ``a``-prefixed methods, which run the calls of
+backends that do network I/O on a worker thread so the event loop is never
+blocked.
+"""
+import asyncio
+import copy
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from ..utils.logging import get_default_logger
+
+logger = get_default_logger()
+
+class CacheBackend:
+    """
+    Base class for cache backends.
+    
+    Values are stored by value: changing a value after set, or changing the
+    value returned by get, does not change the cached entry. Subclasses
+    implement get, set, delete and clear, and set ``blocking`` if those
+    calls do network I/O.
+    """
+    
+    # Whether calls may block on I/O; the async methods then run them on a thread
+    blocking = False
+    
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Get a cached value.
+        
+        Args:
+            key: The cache key
+            
+        Returns:
+            The value, or None if it is missing or expired
+        """
+        raise NotImplementedError
+    
+    def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        """
+        Cache a value.
+        
+        Args:
+            key: The cache key
+            value: The value to cache (JSON-serializable)
+            ttl_seconds: Seconds until the entry expires; the backend's
+                default if None
+        """
+        raise NotImplementedError
+    
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """
+        Get several cached values.
+        
+        Args:
+            keys: The cache keys
+            
+        Returns:
+            Dict[str, Any]: The values found, by key
+        """
+        found = {}
+        for key in keys:
+            value = self.get(key)
+            if value is not None:
+                found[key] = value
+        return found
+    
+    def set_many(self, values: Dict[str, Any], ttl_seconds: Optional[float] = None) -> None:
+        """
+        Cache several values.
+        
+        Args:
+            values: The values to cache, by key
+            ttl_seconds: Seconds until the entries expire; the backend's
+                default if None
+        """
+        for key, value in values.items():
+            self.set(key, value, ttl_seconds)
+    
+    def delete(self, key: str) -> None:
+        """
+        Remove a cached value, if present.
+        
+        Args:
+            key: The cache key
+        """
+        raise NotImplementedError
+    
+    def delete_many(self, keys: Iterable[str]) -> None:
+        """
+        Remove several cached values.
+        
+        Args:
+            keys: The cache keys
+        """
+        for key in keys:
+            self.delete(key)
+    
+    def clear(self) -> None:
+        """Remove every cached value."""
+        raise NotImplementedError
+    
+    async def aget_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """
+        Get several cached values without blocking the event loop.
+        
+        Args:
+            keys: The cache keys
+            
+        Returns:
+            Dict[str, Any]: The values found, by key
+        """
+        if self.blocking:
+            return await asyncio.to_thread(self.get_many, list(keys))
+        return self.get_many(keys)
+    
+    async def aset_many(self, values: Dict[str, Any], ttl_seconds: Optional[float] = None) -> None:
+        """
+        Cache several values without blocking the event loop.
+        
+        Args:
+            values: The values to cache, by key
+            ttl_seconds: Seconds until the entries expire; the backend's
+                default if None
+        """
+        if self.blocking:
+            await asyncio.to_thread(self.set_many, values, ttl_seconds)
+        else:
+            self.set_many(values, ttl_seconds)
+    
+    async def adelete_many(self, keys: Iterable[str]) -> None:
+        """
+        Remove several cached values without blocking the event loop.
+        
+        Args:
+            keys: The cache keys
+        """
+        if self.blocking:
+            await asyncio.to_thread(self.delete_many, list(keys))
+        else:
+            self.delete_many(keys)
+
+class LocalCacheBackend(CacheBackend):
+    """
+    In-process LRU cache with a time to live per entry.
+    
+    Holds at most max_entries values; the least recently used entry is
+    evicted first. Safe to use from many threads.
+    """
+    
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl_seconds: float = 300.0,
+        copy_values: bool = True
+    ):
+        """
+        Initialize the cache.
+        
+        Args:
+            max_entries: Maximum number of cached values
+            ttl_seconds: Default seconds until an entry expires
+            copy_values: Copy values on set and get. Only disable this for
+                values that nobody modifies, such as tuples of rows that are
+                copied before being handed out.
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.copy_values = copy_values
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+    
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self._misses += 1
+                return None
+            
+            self._entries.move_to_end(key)
+            self._hits += 1
+        return copy.deepcopy(value) if self.copy_values else value
+    
+    def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        if ttl <= 0 or self.max_entries <= 0:
+            return
+        
+        if self.copy_values:
+            value = copy.deepcopy(value)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+    
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+    
+    def delete_many(self, keys: Iterable[str]) -> None:
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+    
+    def stats(self) -> Dict[str, int]:
+        """
+        Get cache statistics.
+        
+        Returns:
+            Dict[str, int]: Entry count, hits, misses and evictions
+        """
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions
+            }
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Cache shared by all workers, stored in Redis.
+    
+    Takes an existing client (e.g. ``redis.Redis``) so Redis stays an
+    optional dependency. Values are stored as JSON under ``prefix``. Redis
+    errors are logged and treated as cache misses, so an unavailable cache
+    never fails a tool call.
+    """
+    
+    blocking = True
+    
+    def __init__(self, client: Any, prefix: str = "instabids:", ttl_seconds: float = 300.0):
+        """
+        Initialize the cache.
+        
+        Args:
+            client: Redis client
+            prefix: Prefix of every key written by this cache
+            ttl_seconds: Default seconds until an entry expires
+        """
+        self.client = client
+        self.prefix = prefix
+        self.ttl_seconds = ttl_seconds
+    
+    def get(self, key: str) -> Optional[Any]:
+        try:
+            data = self.client.get(self.prefix + key)
+        except Exception as e:
+            logger.warning(f"Cache read failed for {key}: {e}")
+            return None
+        return json.loads(data) if data is not None else None
+    
+    def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        if ttl <= 0:
+            return
+        
+        try:
+            self.client.set(self.prefix + key, json.dumps(value), px=int(ttl * 1000))
+        except Exception as e:
+            logger.warning(f"Cache write failed for {key}: {e}")
+    
+    def delete(self, key: str) -> None:
+        self.delete_many([key])
+    
+    def delete_many(self, keys: Iterable[str]) -> None:
+        names = [self.prefix + key for key in keys]
+        if not names:
+            return
+        
+        try:
+            self.client.delete(*names)
+        except Exception as e:
+            logger.warning(f"Cache invalidation failed for {len(names)} keys: {e}")
+    
+    def clear(self) -> None:
+        try:
+            names = list(self.client.scan_iter(match=self.prefix + "*"))
+            if names:
+                self.client.delete(*names)
+        except Exception as e:
+            logger.warning(f"Cache clear failed: {e}")
\ No newline at end of file
@@ -0,0 +1,671 @@
+"""
+In-memory index of contractors for find_contractors.
+
+ContractorIndex loads instabids.contractors once and keeps an inverted index
+from normalized service tokens to contractor IDs, plus city and state
+indexes built from each contractor's service areas. A search intersects the
+ID sets of every query token and location, so it costs microseconds instead
+of a sequential scan with LIKE filters. Contractors are also placed on a
+GeoGrid at their service area and business ZIP centroids for radius
+searches around a ZIP code. Matches are ranked by a ContractorRanker. The
+index picks up changed rows incrementally through contractors.updated_at
+and is rebuilt from scratch periodically so deleted contractors drop out.
+
+Search results are cached by normalized query (lowercase tokens, sorted
+specialties, two-letter state codes) until they expire or any indexed
+contractor changes.
+"""
+import json
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from ..utils.logging import get_default_logger
+from ..utils.db_metrics import execute
+from ..utils.supabase_client import get_supabase_client
+from .cache import LocalCacheBackend
+from .contractor_ranker import ContractorColumns, ContractorRanker, smoothed_response_rate
+from .geo import GeoGrid, Point, get_zip_centroids, normalize_zip
+
+logger = get_default_logger()
+
+_CONTRACTORS_TABLE = "instabids.contractors"
+
+# Invitations older than this do not count toward response rates
+RESPONSE_RATE_WINDOW_DAYS = 90
+
+# Longest wait before retrying a failed refresh
+_MAX_RETRY_BACKOFF_SECONDS = 300.0
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_FRACTION_RE = re.compile(r"\.(\d+)")
+
+# Service area fields holding ZIP codes
+_ZIP_FIELDS = ("zip", "zip_code", "zips", "zip_codes")
+
+def tokenize(text: str) -> Set[str]:
+    """
+    Split text into normalized search tokens.
+    
+    Tokens are lowercase alphanumeric words with a plural "s" removed, so
+    "Bathroom Remodels" and "bathroom remodel" have the same tokens.
+    
+    Args:
+        text: The text to split
+        
+    Returns:
+        Set[str]: The tokens
+    """
+    tokens = set()
+    for token in _TOKEN_RE.findall(text.lower()):
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.add(token)
+    return tokens
+
+def normalize_place(name: str) -> str:
+    """
+    Normalize a city or state name for exact matching.
+    
+    Args:
+        name: The city or state name
+        
+    Returns:
+        str: The name in lowercase with single spaces
+    """
+    return " ".join(name.lower().split())
+
+def normalize_state(name: str) -> str:
+    """
+    Normalize a U.S. state name or code to its lowercase two-letter code.
+    
+    Args:
+        name: The state name (e.g. "Texas") or code (e.g. "TX")
+        
+    Returns:
+        str: The lowercase state code, or the normalized name if it is not a
+            known state
+    """
+    name = normalize_place(name)
+    return _STATE_CODES.get(name, name)
+
+# Lowercase U.S. state, district and territory names -> lowercase codes
+_STATE_CODES = {
+    "alabama": "al", "alaska": "ak", "arizona": "az", "arkansas": "ar", "california": "ca",
+    "colorado": "co", "connecticut": "ct", "delaware": "de", "district of columbia": "dc",
+    "washington dc": "dc", "washington d.c.": "dc", "florida": "fl", "georgia": "ga",
+    "hawaii": "hi", "idaho": "id", "illinois": "il", "indiana": "in", "iowa": "ia",
+    "kansas": "ks", "kentucky": "ky", "louisiana": "la", "maine": "me", "maryland": "md",
+    "massachusetts": "ma", "michigan": "mi", "minnesota": "mn", "mississippi": "ms",
+    "missouri": "mo", "montana": "mt", "nebraska": "ne", "nevada": "nv",
+    "new hampshire": "nh", "new jersey": "nj", "new mexico": "nm", "new york": "ny",
+    "north carolina": "nc", "north dakota": "nd", "ohio": "oh", "oklahoma": "ok",
+    "oregon": "or", "pennsylvania": "pa", "rhode island": "ri", "south carolina": "sc",
+    "south dakota": "sd", "tennessee": "tn", "texas": "tx", "utah": "ut", "vermont": "vt",
+    "virginia": "va", "washington": "wa", "west virginia": "wv", "wisconsin": "wi",
+    "wyoming": "wy", "american samoa": "as", "guam": "gu", "northern mariana islands": "mp",
+    "puerto rico": "pr", "u.s. virgin islands": "vi", "us virgin islands": "vi",
+    "virgin islands": "vi"
+}
+
+class ContractorIndex:
+    """
+    Inverted index of contractors by service token, city and state.
+    
+    Safe to share between threads. Searches refresh the index first when it
+    is older than refresh_interval_seconds; only one thread refreshes at a
+    time, and the others keep searching the current data meanwhile. If a
+    refresh fails once the index is loaded, searches keep using the loaded
+    data and the refresh is retried with exponential backoff.
+    """
+    
+    def __init__(
+        self,
+        client: Any = None,
+        refresh_interval_seconds: float = 60.0,
+        full_reload_seconds: float = 3600.0,
+        overlap_seconds: float = 5.0,
+        page_size: int = 1000,
+        zip_centroids: Optional[Dict[str, Point]] = None,
+        ranker: Optional[ContractorRanker] = None,
+        response_rate_interval_seconds: float = 900.0,
+        result_cache_size: int = 1024,
+        result_cache_ttl_seconds: float = 60.0,
+        retry_backoff_seconds: float = 5.0
+    ):
+        """
+        Initialize the index. Nothing is loaded until the first search or
+        refresh.
+        
+        Args:
+            client: Supabase client; the shared client if None
+            refresh_interval_seconds: Maximum age of the index before a search
+                fetches changed contractors
+            full_reload_seconds: Maximum age of the last full reload; deleted
+                contractors are only dropped by a full reload
+            overlap_seconds: How far before the newest seen updated_at each
+                incremental refresh starts, to catch rows committed late by
+                long transactions
+            page_size: Rows fetched per request
+            zip_centroids: (latitude, longitude) by ZIP code; loaded from
+                ZIP_CENTROIDS_PATH if None
+            ranker: Ranker ordering matches; default weights if None
+            response_rate_interval_seconds: Maximum age of the contractors'
+                invitation response rates
+            result_cache_size: Maximum number of cached search results; 0
+                disables the cache
+            result_cache_ttl_seconds: Seconds a cached search result is served
+            retry_backoff_seconds: Wait before retrying a failed refresh,
+                doubled after each consecutive failure
+        """
+        self._client = client
+        self.refresh_interval_seconds = refresh_interval_seconds
+        self.full_reload_seconds = full_reload_seconds
+        self.overlap_seconds = overlap_seconds
+        self.page_size = page_size
+        self._zip_centroids = zip_centroids
+        self.ranker = ranker or ContractorRanker()
+        self.response_rate_interval_seconds = response_rate_interval_seconds
+        self.retry_backoff_seconds = retry_backoff_seconds
+        
+        self._contractors: Dict[str, Dict[str, Any]] = {}
+        self._tokens: Dict[str, Set[str]] = {}
+        self._cities: Dict[str, Set[str]] = {}
+        self._states: Dict[str, Set[str]] = {}
+        self._columns = ContractorColumns()
+        self._grid = GeoGrid()
+        # Index keys of each contractor, to unlink it when it changes
+        self._keys: Dict[str, Tuple[Set[str], Set[str], Set[str]]] = {}
+        
+        self._watermark: Optional[datetime] = None
+        self._loaded_at: Optional[float] = None
+        self._refreshed_at: Optional[float] = None
+        self._response_rates_at: Optional[float] = None
+        # Consecutive failed refreshes, and when the next one may be tried
+        self._refresh_failures = 0
+        self._retry_at = 0.0
+        
+        # Search results by normalized query, as tuples of rows
+        self._results = LocalCacheBackend(
+            max_entries=result_cache_size,
+            ttl_seconds=result_cache_ttl_seconds,
+            copy_values=False
+        )
+        self._invalidations = 0
+        
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+    
+    def __len__(self) -> int:
+        return len(self._contractors)
+    
+    def search(
+        self,
+        project_type: str,
+        location: Dict[str, str],
+        specialties: Optional[List[str]] = None,
+        limit: int = 5,
+        radius_miles: Optional[float] = None,
+        weights: Optional[Dict[str, float]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Find the best contractors for a project type in a location.
+        
+        A contractor matches if its services contain every token of the
+        project type and one of its service areas has the given city and
+        state (when given). With radius_miles and a location zip with a
+        known centroid, the location matches contractors within radius_miles
+        of that ZIP code instead, and each row has a distance_miles entry.
+        
+        Matches are ranked by the ranker on rating, verified status,
+        distance, the fraction of the specialties they offer and their
+        invitation response rate; each row has its score.
+        
+        Args:
+            project_type: Type of project (e.g., "bathroom remodel")
+            location: Location details including city, state, and zip
+            specialties: Optional list of preferred specialties
+            limit: Maximum number of contractors to return
+            radius_miles: Search radius around location["zip"]
+            weights: Ranking weights overriding the ranker's for this search
+            
+        Returns:
+            List[Dict[str, Any]]: The best matching contractor rows, best first
+        """
+        self.refresh_if_stale()
+        ranker = ContractorRanker(dict(self.ranker.weights, **weights)) if weights else self.ranker
+        
+        tokens = tokenize(project_type)
+        specialty_tokens = [tokenize(specialty) for specialty in specialties or []]
+        specialty_tokens = [tokens for tokens in specialty_tokens if tokens]
+        
+        zip_code = normalize_zip(location.get("zip") or "") if radius_miles is not None else ""
+        key = json.dumps([
+            sorted(tokens),
+            sorted({" ".join(sorted(tokens)) for tokens in specialty_tokens}),
+            normalize_place(location.get("city") or ""),
+            normalize_state(location.get("state") or ""),
+            zip_code,
+            radius_miles,
+            limit,
+            sorted(ranker.weights.items())
+        ])
+        cached = self._results.get(key)
+        if cached is not None:
+            return [dict(row) for row in cached]
+        
+        center = None
+        if zip_code:
+            center = self._centroids().get(zip_code)
+            if center is None:
+                logger.debug(f"No centroid for ZIP {location['zip']}; matching on city and state")
+        
+        with self._lock:
+            candidates = [self._tokens.get(token, set()) for token in tokens]
+            distances = None
+            if center is not None:
+                nearest = self._grid.nearest(center[0], center[1], radius_miles, among=candidates)
+                ids = [contractor_id for contractor_id, _ in nearest]
+                distances = np.fromiter(
+                    (distance for _, distance in nearest), dtype=float, count=len(nearest)
+                )
+            else:
+                if location.get("city"):
+                    candidates.append(self._cities.get(normalize_place(location["city"]), set()))
+                if location.get("state"):
+                    candidates.append(self._states.get(normalize_state(location["state"]), set()))
+            
+                if candidates:
+                    # Intersect starting from the smallest set
+                    candidates.sort(key=len)
+                    ids = list(candidates[0].intersection(*candidates[1:]))
+                else:
+                    ids = list(self._contractors)
+            
+            if not ids:
+                self._results.set(key, ())
+                return []
+        
+            overlap = None
+            if specialty_tokens:
+                overlap = np.zeros(len(ids))
+                for tokens in specialty_tokens:
+                    offered = set.intersection(
+                        *(self._tokens.get(token, set()) for token in tokens)
+                    )
+                    overlap += np.fromiter(
+                        (contractor_id in offered for contractor_id in ids),
+                        dtype=bool, count=len(ids)
+                    )
+                overlap /= len(specialty_tokens)
+            
+            columns = self._columns
+            slots = columns.slots(ids)
+            scores = ranker.score(
+                columns.rating[slots],
+                columns.verified[slots],
+                columns.response_rate[slots],
+                distance_miles=distances,
+                radius_miles=radius_miles,
+                specialty_overlap=overlap
+            )
+            
+            matches = []
+            for i in ranker.top_k(scores, limit):
+                row = dict(self._contractors[ids[i]], score=round(float(scores[i]), 4))
+                if distances is not None:
+                    row["distance_miles"] = round(float(distances[i]), 2)
+                matches.append(row)
+        
+            # Cached under the lock so an invalidation cannot slip in between
+            self._results.set(key, tuple(matches))
+        
+        return [dict(row) for row in matches]
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """
+        Get search result cache statistics, for tuning its size and TTL.
+        
+        Returns:
+            Dict[str, Any]: Cached entries, hits, misses, hit_rate, evictions
+                and invalidations (cache clears caused by contractor changes)
+        """
+        stats: Dict[str, Any] = dict(self._results.stats())
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        stats["invalidations"] = self._invalidations
+        return stats
+    
+    def _invalidate_results(self) -> None:
+        """Drop every cached search result. Called with the lock held."""
+        self._results.clear()
+        self._invalidations += 1
+    
+    def needs_refresh(self) -> bool:
+        """
+        Check whether the next search will refresh the index first.
+        
+        Returns:
+            bool: True if the index is not loaded, or older than
+                refresh_interval_seconds and not backing off after a failure
+        """
+        refreshed_at = self._refreshed_at
+        if refreshed_at is None:
+            return True
+        now = time.monotonic()
+        return now - refreshed_at >= self.refresh_interval_seconds and now >= self._retry_at
+    
+    def refresh_if_stale(self) -> None:
+        """Refresh the index if it is older than refresh_interval_seconds."""
+        if not self.needs_refresh():
+            return
+        
+        now = time.monotonic()
+        
+        if self._loaded_at is None:
+            # Nothing to search yet, so wait for the initial load
+            with self._refresh_lock:
+                if self._loaded_at is None:
+                    self._reload()
+            return
+        
+        if not self._refresh_lock.acquire(blocking=False):
+            return
+        try:
+            self._refresh(now)
+            self._refresh_failures = 0
+        except Exception as e:
+            # Keep serving the loaded index rather than failing every search
+            self._refresh_failures += 1
+            backoff = min(
+                self.retry_backoff_seconds * 2 ** (self._refresh_failures - 1),
+                _MAX_RETRY_BACKOFF_SECONDS
+            )
+            self._retry_at = time.monotonic() + backoff
+            logger.warning(
+                f"Failed to refresh the contractor index, retrying in {backoff:.0f}s: {e}"
+            )
+        finally:
+            self._refresh_lock.release()
+    
+    def refresh(self, full: bool = False) -> None:
+        """
+        Fetch contractors changed since the last refresh.
+        
+        Args:
+            full: Rebuild the index from the whole table instead
+        """
+        with self._refresh_lock:
+            if full or self._loaded_at is None:
+                self._reload()
+            else:
+                self._refresh(time.monotonic())
+    
+    def _refresh(self, now: float) -> None:
+        """Run an incremental refresh, or a full reload when one is due."""
+        if now - self._loaded_at >= self.full_reload_seconds:
+            self._reload()
+            return
+        
+        self._apply_changes()
+        if now - self._response_rates_at >= self.response_rate_interval_seconds:
+            response_rates = self._fetch_response_rates()
+            with self._lock:
+                if response_rates is not None:
+                    self._columns.set_response_rates(response_rates)
+                    self._invalidate_results()
+                self._response_rates_at = time.monotonic()
+    
+    def _fetch_response_rates(self) -> Optional[Dict[str, float]]:
+        """
+        Fetch each contractor's smoothed invitation response rate.
+        
+        Returns:
+            Optional[Dict[str, float]]: Response rate by contractor ID, or
+                None if they could not be fetched
+        """
+        client = self._client or get_supabase_client()
+        since = datetime.now(timezone.utc) - timedelta(days=RESPONSE_RATE_WINDOW_DAYS)
+        try:
+            query = client.rpc("contractor_response_rates", {
+                "p_since": since.isoformat()
+            })
+            result = execute(query, "contractor_response_rates", "rpc")
+        except Exception as e:
+            logger.warning(f"Failed to load contractor response rates: {e}")
+            return None
+        
+        return {
+            str(row["contractor_id"]): smoothed_response_rate(row["invited"], row["responded"])
+            for row in result.data or []
+        }
+    
+    def _reload(self) -> None:
+        """Rebuild the index from every contractor, paging by ID."""
+        client = self._client or get_supabase_client()
+        
+        contractors: Dict[str, Dict[str, Any]] = {}
+        last_id = None
+        while True:
+            query = client.table(_CONTRACTORS_TABLE).select("*").order("id").limit(self.page_size)
+            if last_id is not None:
+                query = query.gt("id", last_id)
+            rows = execute(query, _CONTRACTORS_TABLE, "select").data or []
+            for row in rows:
+                contractors[str(row["id"])] = row
+            if len(rows) < self.page_size:
+                break
+            last_id = rows[-1]["id"]
+        
+        fresh = ContractorIndex(self._client, zip_centroids=self._zip_centroids)
+        for row in contractors.values():
+            fresh._add(row)
+        response_rates = self._fetch_response_rates()
+        if response_rates is None:
+            response_rates = self._columns.response_rates()
+        fresh._columns.set_response_rates(response_rates)
+        timestamps = [_parse_timestamp(row.get("updated_at")) for row in contractors.values()]
+        watermark = max((ts for ts in timestamps if ts is not None), default=None)
+        
+        with self._lock:
+            self._contractors = fresh._contractors
+            self._tokens = fresh._tokens
+            self._cities = fresh._cities
+            self._states = fresh._states
+            self._columns = fresh._columns
+            self._invalidate_results()
+            self._grid = fresh._grid
+            self._keys = fresh._keys
+            self._watermark = watermark
+            self._loaded_at = self._refreshed_at = self._response_rates_at = time.monotonic()
+        
+        logger.info(f"Loaded {len(contractors)} contractors into the contractor index")
+    
+    def _apply_changes(self) -> None:
+        """Fetch and index contractors updated since the watermark."""
+        client = self._client or get_supabase_client()
+        
+        if self._watermark is None:
+            since = None
+        else:
+            since = self._watermark - timedelta(seconds=self.overlap_seconds)
+        
+        changed = 0
+        # (updated_at, id) of the last row fetched; keyset paging on both
+        # columns gets past a page of rows sharing one updated_at
+        last = None
+        while True:
+            query = client.table(_CONTRACTORS_TABLE) \
+                .select("*") \
+                .order("updated_at") \
+                .order("id") \
+                .limit(self.page_size)
+            if last is not None:
+                query = query.or_(
+                    f"updated_at.gt.{last[0]},"
+                    f"and(updated_at.eq.{last[0]},id.gt.{last[1]})"
+                )
+            elif since is not None:
+                query = query.gte("updated_at", since.isoformat())
+            rows = execute(query, _CONTRACTORS_TABLE, "select").data or []
+            
+            with self._lock:
+                # The overlap window fetches some unchanged rows again
+                updated = [row for row in rows if self._contractors.get(str(row["id"])) != row]
+                for row in updated:
+                    self._add(row)
+                if updated:
+                    self._invalidate_results()
+                newest = _parse_timestamp(rows[-1].get("updated_at")) if rows else None
+                if newest is not None and (self._watermark is None or newest > self._watermark):
+                    self._watermark = newest
+            changed += len(updated)
+            
+            if len(rows) < self.page_size:
+                break
+            if rows[-1].get("updated_at") is None:
+                # Rows without updated_at sort last and cannot be paged past
+                self._reload()
+                return
+            last = (rows[-1]["updated_at"], rows[-1]["id"])
+        
+        self._refreshed_at = time.monotonic()
+        if changed:
+            logger.debug(f"Refreshed {changed} contractors in the contractor index")
+    
+    def _add(self, row: Dict[str, Any]) -> None:
+        """Index a contractor row, replacing its previous version."""
+        contractor_id = str(row["id"])
+        self._remove(contractor_id)
+        
+        tokens = tokenize(" ".join(_strings(row.get("services"))))
+        cities = set()
+        states = set()
+        zips = set(_strings(row.get("business_zip")))
+        points = []
+        for area in _service_areas(row.get("service_areas")):
+            cities.update(normalize_place(city) for city in _strings(area.get("city")))
+            states.update(normalize_state(state) for state in _strings(area.get("state")))
+            for field in _ZIP_FIELDS:
+                zips.update(_strings(area.get(field)))
+            point = _area_point(area)
+            if point is not None:
+                points.append(point)
+        
+        centroids = self._centroids() if zips else {}
+        for zip_code in zips:
+            point = centroids.get(normalize_zip(zip_code))
+            if point is not None:
+                points.append(point)
+        self._grid.add(contractor_id, points)
+        
+        for key, index in ((tokens, self._tokens), (cities, self._cities), (states, self._states)):
+            for value in key:
+                index.setdefault(value, set()).add(contractor_id)
+        
+        self._contractors[contractor_id] = row
+        self._columns.set(contractor_id, _rating(row.get("rating")), bool(row.get("verified")))
+        self._keys[contractor_id] = (tokens, cities, states)
+    
+    def _remove(self, contractor_id: str) -> None:
+        """Unlink a contractor from every index."""
+        keys = self._keys.pop(contractor_id, None)
+        if keys is None:
+            return
+        
+        for key, index in zip(keys, (self._tokens, self._cities, self._states)):
+            for value in key:
+                ids = index.get(value)
+                if ids is not None:
+                    ids.discard(contractor_id)
+                    if not ids:
+                        del index[value]
+        self._contractors.pop(contractor_id, None)
+        self._columns.remove(contractor_id)
+        self._grid.remove(contractor_id)
+    
+    def _centroids(self) -> Dict[str, Point]:
+        """Get the ZIP centroids used to place contractors."""
+        if self._zip_centroids is None:
+            return get_zip_centroids()
+        return self._zip_centroids
+
+def _strings(value: Any) -> Iterable[str]:
+    """Yield every string in a JSON value, including object keys."""
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for key, item in value.items():
+            yield key
+            yield from _strings(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from _strings(item)
+
+def _rating(value: Any) -> Optional[float]:
+    """Get a contractor's rating as a number, or None if unrated."""
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+def _area_point(area: Dict[str, Any]) -> Optional[Point]:
+    """Get the explicit coordinates of a service area, if it has them."""
+    lat = area.get("lat", area.get("latitude"))
+    lon = area.get("lng", area.get("lon", area.get("longitude")))
+    try:
+        return (float(lat), float(lon)) if lat is not None and lon is not None else None
+    except (TypeError, ValueError):
+        return None
+
+def _service_areas(value: Any) -> List[Dict[str, Any]]:
+    """Get the service areas of a contractor as a list of objects."""
+    if isinstance(value, dict):
+        return [value]
+    if isinstance(value, list):
+        return [area for area in value if isinstance(area, dict)]
+    return []
+
+def _parse_timestamp(value: Any) -> Optional[datetime]:
+    """
+    Parse a timestamp returned by PostgREST.
+    
+    Args:
+        value: ISO 8601 timestamp, e.g. "2025-06-01T12:00:00.12345+00:00"
+        
+    Returns:
+        Optional[datetime]: The timestamp, or None if missing or invalid
+    """
+    if not value:
+        return None
+    
+    text = str(value).replace("Z", "+00:00")
+    # fromisoformat needs exactly 6 fractional digits before Python 3.11
+    text = _FRACTION_RE.sub(lambda m: "." + (m.group(1) + "000000")[:6], text, count=1)
+    try:
+        parsed = datetime.fromisoformat(text)
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+_default_index: Optional[ContractorIndex] = None
+_default_index_lock = threading.Lock()
+
+def get_contractor_index() -> ContractorIndex:
+    """
+    Get the process-wide contractor index used by find_contractors.
+    
+    Returns:
+        ContractorIndex: The shared index
+    """
+    global _default_index
+    
+    if _default_index is None:
+        with _default_index_lock:
+            if _default_index is None:
+                _default_index = ContractorIndex()
+    return _default_index
\ No newline at end of file
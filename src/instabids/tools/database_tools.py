@@ -2,27 +2,97 @@
 Database interaction tools for agents.
 """
 import os
-import json
-import uuid
-from typing import Dict, Any, Optional, List
-from supabase import create_client, Client
+from typing import Dict, Any, Iterable, Optional, List, Tuple, Union
+from supabase import Client
+
+from ..utils.db_metrics import db_tool, execute
+from ..utils.supabase_client import get_supabase_client
+from .bid_card_codec import BID_CARD_CODEC
+from .cache import CacheBackend, LocalCacheBackend
+from .contractor_index import get_contractor_index
+
+# SQLSTATE classes (and PostgREST's own PGRST codes) of errors caused by a
+# request's data; the statement was rolled back as a whole
+_DATA_ERROR_PREFIXES = ("22", "23", "42", "PGRST")
+_DUPLICATE_KEY_SQLSTATE = "23505"
+
+# Largest contractor search radius; the radius comes from the model's tool
+# call, and the grid search cost grows with it
+_MAX_RADIUS_MILES = 500.0
 
 # Initialize Supabase client
 def _get_supabase_client() -> Client:
     """
     Get the Supabase client.
     
+    The client is shared process-wide, so its connections are reused
+    across tool calls.
+    
     Returns:
         Client: The Supabase client.
     """
-    url = os.environ.get("SUPABASE_URL")
-    key = os.environ.get("SUPABASE_SERVICE_ROLE_KEY")
+    return get_supabase_client()
+
+# Decoded bid cards by ID; see set_bid_card_cache
+_bid_card_cache: Optional[CacheBackend] = LocalCacheBackend(
+    max_entries=int(os.environ.get("BID_CARD_CACHE_SIZE", 1024)),
+    ttl_seconds=float(os.environ.get("BID_CARD_CACHE_TTL_SECONDS", 300))
+)
+
+def set_bid_card_cache(backend: Optional[CacheBackend]) -> None:
+    """
+    Set the cache used by get_bid_card.
+    
+    Use a shared backend (e.g. RedisCacheBackend) so every worker sees the
+    same entries and invalidations, or None to disable caching.
+    
+    Args:
+        backend: The cache backend, or None
+    """
+    global _bid_card_cache
+    _bid_card_cache = backend
+
+def get_bid_card_cache() -> Optional[CacheBackend]:
+    """
+    Get the cache used by get_bid_card.
+    
+    Returns:
+        Optional[CacheBackend]: The cache backend, or None if disabled
+    """
+    return _bid_card_cache
+
+def invalidate_bid_cards(bid_card_ids: Iterable[str]) -> None:
+    """
+    Drop bid cards from the cache so the next read goes to the database.
     
-    if not url or not key:
-        raise ValueError("SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY must be set")
+    Args:
+        bid_card_ids: IDs of the changed bid cards
+    """
+    cache = _bid_card_cache
+    if cache is not None:
+        cache.delete_many(bid_card_ids)
+
+def _build_bid_card_row(
+    homeowner_id: str,
+    bid_card_data: Dict[str, Any]
+) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """
+    Validates bid card data and builds its bid_cards row.
     
-    return create_client(url, key)
+    Args:
+        homeowner_id: ID of the homeowner creating the bid card
+        bid_card_data: The complete bid card data
+        
+    Returns:
+        Tuple[Optional[Dict[str, Any]], Optional[str]]: The row and None, or
+            None and an error message if the data is invalid
+    """
+    try:
+        return BID_CARD_CODEC.encode(bid_card_data, homeowner_id=homeowner_id), None
+    except ValueError as e:
+        return None, str(e)
 
+@db_tool
 def save_bid_card(
     homeowner_id: str,
     bid_card_data: Dict[str, Any]
@@ -44,54 +114,18 @@ def save_bid_card(
         # Get Supabase client
         supabase = _get_supabase_client()
         
-        # Validate required fields
-        required_fields = ["project_type", "project_scope", "timeline", "location"]
-        for field in required_fields:
-            if field not in bid_card_data:
-                return {
-                    "status": "error",
-                    "error": f"Missing required field: {field}",
-                    "bid_card_id": None
-                }
-        
-        # Prepare bid card data for insertion
-        bid_card_id = bid_card_data.get("id", str(uuid.uuid4()))
-        
-        insert_data = {
-            "id": bid_card_id,
-            "homeowner_id": homeowner_id,
-            "project_name": bid_card_data.get("project_name", f"{bid_card_data['project_type']} Project"),
-            "project_type": bid_card_data["project_type"],
-            "project_scope": bid_card_data["project_scope"],
-            "location": json.dumps(bid_card_data["location"]),
-            "timeline": json.dumps(bid_card_data["timeline"]),
-            "status": bid_card_data.get("status", "draft")
-        }
-        
-        # Add optional fields if present
-        if "budget_range" in bid_card_data:
-            insert_data["budget_range"] = json.dumps(bid_card_data["budget_range"])
-            
-        if "photo_urls" in bid_card_data:
-            insert_data["photo_urls"] = bid_card_data["photo_urls"]
-            
-        if "materials_preferences" in bid_card_data:
-            insert_data["materials_preferences"] = json.dumps(bid_card_data["materials_preferences"])
-            
-        if "special_requirements" in bid_card_data:
-            insert_data["special_requirements"] = bid_card_data["special_requirements"]
-            
-        if "accessibility_needs" in bid_card_data:
-            insert_data["accessibility_needs"] = json.dumps(bid_card_data["accessibility_needs"])
-            
-        if "scheduling_constraints" in bid_card_data:
-            insert_data["scheduling_constraints"] = json.dumps(bid_card_data["scheduling_constraints"])
-            
-        if "image_analysis_results" in bid_card_data:
-            insert_data["image_analysis_results"] = json.dumps(bid_card_data["image_analysis_results"])
+        insert_data, error = _build_bid_card_row(homeowner_id, bid_card_data)
+        if error:
+            return {
+                "status": "error",
+                "error": error,
+                "bid_card_id": None
+            }
+        bid_card_id = insert_data["id"]
         
         # Insert into database
-        result = supabase.table("instabids.bid_cards").insert(insert_data).execute()
+        query = supabase.table("instabids.bid_cards").insert(insert_data)
+        result = execute(query, "instabids.bid_cards", "insert")
         
         # Check for errors
         if "error" in result:
@@ -101,13 +135,15 @@ def save_bid_card(
                 "bid_card_id": None
             }
         
+        invalidate_bid_cards([bid_card_id])
+        
         # Success
         return {
             "status": "success",
             "bid_card_id": bid_card_id,
             "message": "Bid card saved successfully"
         }
-        
+    
     except Exception as e:
         return {
             "status": "error",
@@ -115,9 +151,191 @@ def save_bid_card(
             "bid_card_id": None
         }
 
+@db_tool
+def save_bid_cards(
+    homeowner_id_or_pairs: Union[str, Iterable[Tuple[str, Dict[str, Any]]]],
+    cards: Optional[List[Dict[str, Any]]] = None,
+    chunk_size: int = 500,
+    upsert: bool = False
+) -> Dict[str, Any]:
+    """
+    Saves many bid cards with chunked multi-row requests.
+    
+    All cards are validated before anything is written; invalid cards are
+    reported and skipped. Valid cards are written chunk_size rows per
+    request. If the database rejects a chunk's data, its rows are retried
+    one by one so a single bad row only fails itself; a row rejected as a
+    duplicate counts as saved if the stored row is identical. If a request
+    fails otherwise (e.g. a timeout), it may or may not have been applied,
+    so its cards are reported as "unknown"; saving them again with
+    upsert=True is safe.
+    
+    Args:
+        homeowner_id_or_pairs: ID of the homeowner owning all cards, or an
+            iterable of (homeowner_id, bid_card_data) pairs
+        cards: The bid card data to save (when a single homeowner ID is given)
+        chunk_size: Maximum number of rows per request
+        upsert: Update existing bid cards with the same ID instead of failing
+        
+    Returns:
+        Dict[str, Any]: Response with status and result:
+            - status: "success" if every card was saved, "partial" if some
+              were, "error" if none were
+            - results: One entry per card, in input order, with index,
+              bid_card_id, status ("success", "error" or "unknown") and error
+            - saved: Number of cards saved
+            - failed: Number of cards not saved
+            - unknown: Number of cards whose request failed without an answer
+    """
+    if isinstance(homeowner_id_or_pairs, str):
+        pairs = [(homeowner_id_or_pairs, card) for card in cards or []]
+    else:
+        pairs = list(homeowner_id_or_pairs)
+    
+    results: List[Dict[str, Any]] = []
+    
+    # Validate everything up front
+    pending = []
+    for index, (homeowner_id, bid_card_data) in enumerate(pairs):
+        row, error = _build_bid_card_row(homeowner_id, bid_card_data)
+        results.append({
+            "index": index,
+            "bid_card_id": row["id"] if row else bid_card_data.get("id"),
+            "status": "error" if error else "pending",
+            "error": error
+        })
+        if row:
+            pending.append((index, row))
+    
+    try:
+        supabase = _get_supabase_client()
+    except Exception as e:
+        for index, _ in pending:
+            results[index].update(status="error", error=f"Error saving bid card: {str(e)}")
+        pending = []
+    
+    # Rows in one request must have the same columns, so group by column set
+    groups: Dict[Tuple[str, ...], List[Tuple[int, Dict[str, Any]]]] = {}
+    for index, row in pending:
+        groups.setdefault(tuple(sorted(row)), []).append((index, row))
+    
+    for group in groups.values():
+        for start in range(0, len(group), chunk_size):
+            chunk = group[start:start + chunk_size]
+            try:
+                _write_bid_card_rows(supabase, [row for _, row in chunk], upsert)
+                for index, _ in chunk:
+                    results[index].update(status="success")
+                continue
+            except Exception as e:
+                if not _is_data_error(e):
+                    # Retrying row by row could fail rows the chunk already saved
+                    for index, _ in chunk:
+                        results[index].update(
+                            status="unknown", error=f"Error saving bid card: {str(e)}"
+                        )
+                    continue
+            
+            # The chunk was rejected as a whole; isolate the failing rows
+            duplicates = []
+            for index, row in chunk:
+                try:
+                    _write_bid_card_rows(supabase, [row], upsert)
+                    results[index].update(status="success")
+                except Exception as e:
+                    results[index].update(
+                        status="error" if _is_data_error(e) else "unknown",
+                        error=f"Error saving bid card: {str(e)}"
+                    )
+                    if getattr(e, "code", None) == _DUPLICATE_KEY_SQLSTATE:
+                        duplicates.append((index, row))
+            for index in _find_stored_rows(supabase, duplicates):
+                results[index].update(status="success", error=None)
+    
+    saved_ids = [result["bid_card_id"] for result in results if result["status"] == "success"]
+    unknown_ids = [result["bid_card_id"] for result in results if result["status"] == "unknown"]
+    invalidate_bid_cards(saved_ids + unknown_ids)
+    
+    saved = len(saved_ids)
+    failed = len(results) - saved - len(unknown_ids)
+    return {
+        "status": "success" if saved == len(results) else ("partial" if saved else "error"),
+        "results": results,
+        "saved": saved,
+        "failed": failed,
+        "unknown": len(unknown_ids)
+    }
+
+def _is_data_error(error: Exception) -> bool:
+    """
+    Checks whether the database rejected a request because of its data.
+    
+    Args:
+        error: The exception raised by the request
+        
+    Returns:
+        bool: True for PostgREST errors such as constraint violations or
+            invalid values; False for transport and server errors, after
+            which the request may still have been applied
+    """
+    code = getattr(error, "code", None)
+    return isinstance(code, str) and code.startswith(_DATA_ERROR_PREFIXES)
+
+def _find_stored_rows(
+    supabase: Client, candidates: List[Tuple[int, Dict[str, Any]]]
+) -> List[int]:
+    """
+    Finds rows rejected as duplicates that are already stored unchanged.
+    
+    Args:
+        supabase: The Supabase client
+        candidates: (index, row) pairs of the rejected rows
+        
+    Returns:
+        List[int]: Indexes of the rows whose stored version has the same values
+    """
+    if not candidates:
+        return []
+    
+    query = supabase.table("instabids.bid_cards") \
+        .select("*") \
+        .in_("id", [row["id"] for _, row in candidates])
+    try:
+        stored_rows = execute(query, "instabids.bid_cards", "select").data or []
+    except Exception:
+        return []
+    
+    stored = {str(row["id"]): _decode_bid_card_row(row) for row in stored_rows}
+    return [
+        index for index, row in candidates
+        if str(row["id"]) in stored
+        and all(stored[str(row["id"])].get(column) == value for column, value in row.items())
+    ]
+
+def _write_bid_card_rows(supabase: Client, rows: List[Dict[str, Any]], upsert: bool) -> None:
+    """
+    Inserts or upserts bid_cards rows in one request.
+    
+    Args:
+        supabase: The Supabase client
+        rows: Rows with identical columns
+        upsert: Update rows whose ID already exists
+    """
+    table = supabase.table("instabids.bid_cards")
+    if upsert:
+        execute(table.upsert(rows, on_conflict="id"), "instabids.bid_cards", "upsert")
+    else:
+        execute(table.insert(rows), "instabids.bid_cards", "insert")
+
+@db_tool
 def get_bid_card(bid_card_id: str) -> Dict[str, Any]:
     """
-    Retrieves a bid card from the database.
+    Retrieves a bid card, from the bid card cache when possible.
+    
+    Cached cards expire after BID_CARD_CACHE_TTL_SECONDS and are dropped
+    when saved through these tools, so a card changed by another writer can
+    be served stale for at most the TTL. The returned card is a copy and may
+    be modified freely.
     
     Args:
         bid_card_id: The ID of the bid card to retrieve
@@ -128,12 +346,22 @@ def get_bid_card(bid_card_id: str) -> Dict[str, Any]:
             - bid_card: The complete bid card data (if success)
             - error: Error message (if error)
     """
+    cache = _bid_card_cache
+    if cache is not None:
+        bid_card = cache.get(bid_card_id)
+        if bid_card is not None:
+            return {
+                "status": "success",
+                "bid_card": bid_card
+            }
+    
     try:
         # Get Supabase client
         supabase = _get_supabase_client()
         
         # Query the database
-        result = supabase.table("instabids.bid_cards").select("*").eq("id", bid_card_id).execute()
+        query = supabase.table("instabids.bid_cards").select("*").eq("id", bid_card_id)
+        result = execute(query, "instabids.bid_cards", "select")
         
         # Check for errors
         if "error" in result:
@@ -152,24 +380,17 @@ def get_bid_card(bid_card_id: str) -> Dict[str, Any]:
             }
         
         # Process the bid card data
-        bid_card = result.data[0]
+        bid_card = _decode_bid_card_row(result.data[0])
         
-        # Convert JSON strings back to objects
-        for key in ["location", "timeline", "budget_range", "materials_preferences", 
-                   "accessibility_needs", "scheduling_constraints", "image_analysis_results"]:
-            if key in bid_card and bid_card[key] and isinstance(bid_card[key], str):
-                try:
-                    bid_card[key] = json.loads(bid_card[key])
-                except:
-                    # Keep as string if not valid JSON
-                    pass
+        if cache is not None:
+            cache.set(bid_card_id, bid_card)
         
         # Success
         return {
             "status": "success",
             "bid_card": bid_card
         }
-        
+    
     except Exception as e:
         return {
             "status": "error",
@@ -177,21 +398,156 @@ def get_bid_card(bid_card_id: str) -> Dict[str, Any]:
             "bid_card": None
         }
 
+@db_tool
+def get_bid_cards(
+    bid_card_ids: Iterable[str],
+    fields: Optional[List[str]] = None,
+    chunk_size: int = 200
+) -> Dict[str, Any]:
+    """
+    Retrieves many bid cards with as few queries as possible.
+    
+    Cards in the bid card cache are served from it; the rest are fetched
+    with one ``IN`` query per chunk_size IDs.
+    
+    Args:
+        bid_card_ids: IDs of the bid cards to retrieve
+        fields: Columns to return (the ID is always included); all if None
+        chunk_size: Maximum number of IDs per query
+        
+    Returns:
+        Dict[str, Any]: Response with status and result:
+            - status: "success" or "error"
+            - bid_cards: The bid cards found, in the order of bid_card_ids
+            - missing: IDs with no bid card
+            - error: Error message (if error)
+    """
+    bid_card_ids = list(bid_card_ids)
+    columns = None
+    if fields is not None:
+        columns = ["id"] + [field for field in fields if field != "id"]
+    
+    found: Dict[str, Dict[str, Any]] = {}
+    to_fetch = []
+    cache = _bid_card_cache
+    for bid_card_id in dict.fromkeys(bid_card_ids):
+        bid_card = cache.get(bid_card_id) if cache is not None else None
+        if bid_card is None:
+            to_fetch.append(bid_card_id)
+        elif columns is None:
+            found[bid_card_id] = bid_card
+        else:
+            found[bid_card_id] = {
+                column: bid_card[column] for column in columns if column in bid_card
+            }
+    
+    try:
+        if to_fetch:
+            supabase = _get_supabase_client()
+            select = ",".join(columns) if columns is not None else "*"
+            
+            for start in range(0, len(to_fetch), chunk_size):
+                query = supabase.table("instabids.bid_cards") \
+                    .select(select) \
+                    .in_("id", to_fetch[start:start + chunk_size])
+                result = execute(query, "instabids.bid_cards", "select")
+                
+                for row in result.data or []:
+                    bid_card = _decode_bid_card_row(row)
+                    found[bid_card["id"]] = bid_card
+                    # Only complete cards are cached
+                    if cache is not None and columns is None:
+                        cache.set(bid_card["id"], bid_card)
+    
+    except Exception as e:
+        return {
+            "status": "error",
+            "error": f"Error retrieving bid cards: {str(e)}",
+            "bid_cards": [],
+            "missing": []
+        }
+    
+    bid_cards = []
+    missing = []
+    for bid_card_id in bid_card_ids:
+        if bid_card_id in found:
+            bid_cards.append(found[bid_card_id])
+        elif bid_card_id not in missing:
+            missing.append(bid_card_id)
+    
+    return {
+        "status": "success",
+        "bid_cards": bid_cards,
+        "missing": missing
+    }
+
+def _decode_bid_card_row(bid_card: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Converts a bid_cards row read from the database to a bid card.
+    
+    Args:
+        bid_card: The bid_cards row
+        
+    Returns:
+        Dict[str, Any]: The row, with legacy JSON string columns decoded in place
+    """
+    return BID_CARD_CODEC.decode(bid_card)
+
+def _check_radius(radius_miles: Optional[float]) -> Optional[float]:
+    """
+    Validates a search radius from a tool call, capping it at _MAX_RADIUS_MILES.
+    
+    Args:
+        radius_miles: The requested radius in miles, or None
+        
+    Returns:
+        Optional[float]: The radius to search, or None
+        
+    Raises:
+        ValueError: If the radius is not a positive number
+    """
+    if radius_miles is None:
+        return None
+    radius_miles = float(radius_miles)
+    # Also rejects NaN
+    if not radius_miles > 0:
+        raise ValueError(f"radius_miles must be positive, got {radius_miles}")
+    return min(radius_miles, _MAX_RADIUS_MILES)
+
+@db_tool
 def find_contractors(
     project_type: str,
     location: Dict[str, str],
     specialties: Optional[List[str]] = None,
-    limit: int = 5
+    limit: int = 5,
+    radius_miles: Optional[float] = None,
+    weights: Optional[Dict[str, float]] = None
 ) -> Dict[str, Any]:
     """
     Finds contractors based on project type, location, and specialties.
     
+    Contractors offering every word of the project type in the given city
+    and state are matched. With radius_miles, contractors serving within that
+    distance of the location's ZIP code are matched instead, each with a
+    distance_miles entry; locations without a known ZIP code fall back to
+    city and state matching.
+    
+    Matches are ranked by rating, verified status, distance, how many of the
+    specialties they offer and how often they answer invitations, and the
+    best are returned with their score. Matching uses the shared
+    ContractorIndex, which picks up contractor changes within its refresh
+    interval.
+    
     Args:
         project_type: Type of project (e.g., "bathroom remodel")
         location: Location details including city, state, and zip
-        specialties: Optional list of required specialties
+        specialties: Optional list of preferred specialties
         limit: Maximum number of contractors to return
-        
+        radius_miles: Optional search radius around location["zip"], in miles
+            (at most 500)
+        weights: Optional ranking weights by feature ("rating", "verified",
+            "distance", "specialty", "response_rate")
+            
     Returns:
         Dict[str, Any]: Response with status and result:
             - status: "success" or "error"
@@ -199,50 +555,19 @@ def find_contractors(
             - error: Error message (if error)
     """
     try:
-        # Get Supabase client
-        supabase = _get_supabase_client()
-        
-        # Build the query
-        query = supabase.table("instabids.contractors").select("*")
-        
-        # Filter by service area (simplified for this example)
-        # In a real implementation, this would be more sophisticated
-        # with geospatial queries or radius searches
-        if "city" in location:
-            query = query.like("service_areas->>city", f"%{location['city']}%")
-            
-        if "state" in location:
-            query = query.like("service_areas->>state", f"%{location['state']}%")
-            
-        # Filter by services that include the project type
-        query = query.like("services", f"%{project_type}%")
-        
-        # Filter by specialties if provided
-        if specialties:
-            for specialty in specialties:
-                query = query.like("services", f"%{specialty}%")
-        
-        # Limit results
-        query = query.limit(limit)
-        
-        # Execute query
-        result = query.execute()
-        
-        # Check for errors
-        if "error" in result:
-            return {
-                "status": "error",
-                "error": f"Database error: {result['error']}",
-                "contractors": []
-            }
+        # Match against the in-memory contractor index
+        contractors = get_contractor_index().search(
+            project_type, location, specialties=specialties, limit=limit,
+            radius_miles=_check_radius(radius_miles), weights=weights
+        )
         
         # Return results
         return {
             "status": "success",
-            "contractors": result.data,
-            "count": len(result.data)
+            "contractors": contractors,
+            "count": len(contractors)
         }
-        
+    
     except Exception as e:
         return {
             "status": "error",
@@ -0,0 +1,300 @@
+"""
+Geographic helpers for contractor radius search.
+
+ZIP codes are placed at their centroid, read from a ZIP centroid file named
+by ZIP_CENTROIDS_PATH. The file can be the U.S. Census Bureau ZCTA
+Gazetteer file (tab-separated, with GEOID, INTPTLAT and INTPTLONG columns)
+or a CSV with zip, lat and lon columns. Without the file, radius search is
+unavailable and find_contractors matches on city and state only.
+"""
+import csv
+import heapq
+import math
+import os
+import threading
+from typing import Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+from ..utils.logging import get_default_logger
+
+logger = get_default_logger()
+
+EARTH_RADIUS_MILES = 3958.8
+
+# Miles per degree of latitude
+_MILES_PER_DEGREE = 69.0
+
+_ZIP_COLUMNS = ("geoid", "zip", "zipcode", "zip_code", "zcta", "zcta5")
+_LAT_COLUMNS = ("intptlat", "lat", "latitude")
+_LON_COLUMNS = ("intptlong", "lon", "lng", "long", "longitude")
+
+Point = Tuple[float, float]
+
+def haversine_miles(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """
+    Great-circle distance between two points.
+    
+    Args:
+        lat1: Latitude of the first point, in degrees
+        lon1: Longitude of the first point, in degrees
+        lat2: Latitude of the second point, in degrees
+        lon2: Longitude of the second point, in degrees
+        
+    Returns:
+        float: The distance in miles
+    """
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    a = math.sin((phi2 - phi1) / 2) ** 2 + \
+        math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * math.asin(min(1.0, math.sqrt(a)))
+
+def normalize_zip(value: str) -> str:
+    """
+    Normalize a ZIP code to its five-digit form (e.g. "78701-1234" -> "78701").
+    
+    Args:
+        value: The ZIP code
+        
+    Returns:
+        str: The five-digit ZIP code, or "" if it is not one
+    """
+    digits = str(value).strip().split("-")[0]
+    if not digits.isdigit() or len(digits) > 5:
+        return ""
+    return digits.zfill(5)
+
+def load_zip_centroids(path: str) -> Dict[str, Point]:
+    """
+    Load ZIP centroids from a Gazetteer or CSV file.
+    
+    Args:
+        path: Path to the file
+        
+    Returns:
+        Dict[str, Point]: (latitude, longitude) by five-digit ZIP code
+        
+    Raises:
+        ValueError: If the file has no ZIP, latitude or longitude column
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        sample = f.readline()
+        f.seek(0)
+        reader = csv.reader(f, delimiter="\t" if "\t" in sample else ",")
+        header = [column.strip().lower() for column in next(reader, [])]
+        
+        columns = []
+        for names in (_ZIP_COLUMNS, _LAT_COLUMNS, _LON_COLUMNS):
+            matches = [header.index(name) for name in names if name in header]
+            if not matches:
+                raise ValueError(f"{path} needs one of the columns {', '.join(names)}")
+            columns.append(matches[0])
+        zip_column, lat_column, lon_column = columns
+        
+        centroids = {}
+        for row in reader:
+            try:
+                zip_code = normalize_zip(row[zip_column])
+                point = (float(row[lat_column]), float(row[lon_column]))
+            except (IndexError, ValueError):
+                continue
+            if zip_code:
+                centroids[zip_code] = point
+    
+    logger.info(f"Loaded {len(centroids)} ZIP centroids from {path}")
+    return centroids
+
+_zip_centroids: Optional[Dict[str, Point]] = None
+_zip_centroids_lock = threading.Lock()
+
+def get_zip_centroids() -> Dict[str, Point]:
+    """
+    Get the ZIP centroids from ZIP_CENTROIDS_PATH, loading them once.
+    
+    Returns:
+        Dict[str, Point]: (latitude, longitude) by ZIP code; empty if
+            ZIP_CENTROIDS_PATH is not set or cannot be read
+    """
+    global _zip_centroids
+    
+    if _zip_centroids is None:
+        with _zip_centroids_lock:
+            if _zip_centroids is None:
+                path = os.environ.get("ZIP_CENTROIDS_PATH")
+                centroids: Dict[str, Point] = {}
+                if not path:
+                    logger.warning("ZIP_CENTROIDS_PATH is not set; radius search is disabled")
+                else:
+                    try:
+                        centroids = load_zip_centroids(path)
+                    except (OSError, ValueError) as e:
+                        logger.error(f"Failed to load ZIP centroids: {e}")
+                _zip_centroids = centroids
+    return _zip_centroids
+
+class GeoGrid:
+    """
+    Grid index of keyed points for radius queries.
+    
+    Points are bucketed into cells of cell_degrees by cell_degrees. A radius
+    query only measures the points in cells overlapping the circle's
+    bounding box, so its cost depends on how many points are nearby rather
+    than on the total number of points. A key may have several points; its
+    distance is that of its nearest point.
+    """
+    
+    def __init__(self, cell_degrees: float = 0.05):
+        """
+        Initialize the grid.
+        
+        Args:
+            cell_degrees: Cell size in degrees of latitude and longitude
+        """
+        self.cell_degrees = cell_degrees
+        # Cell -> (latitude and longitude in radians, cos(latitude), key) per
+        # point, precomputed for the haversine formula
+        self._cells: Dict[Tuple[int, int], List[Tuple[float, float, float, Hashable]]] = {}
+        self._points: Dict[Hashable, List[Point]] = {}
+    
+    def __len__(self) -> int:
+        return len(self._points)
+    
+    def add(self, key: Hashable, points: Iterable[Point]) -> None:
+        """
+        Add a key at one or more points, replacing its previous points.
+        
+        Args:
+            key: The key
+            points: (latitude, longitude) pairs
+        """
+        self.remove(key)
+        points = list(dict.fromkeys(points))
+        if not points:
+            return
+        
+        self._points[key] = points
+        for lat, lon in points:
+            phi = math.radians(lat)
+            entry = (phi, math.radians(lon), math.cos(phi), key)
+            self._cells.setdefault(self._cell(lat, lon), []).append(entry)
+    
+    def remove(self, key: Hashable) -> None:
+        """
+        Remove a key, if present.
+        
+        Args:
+            key: The key
+        """
+        for cell in {self._cell(*point) for point in self._points.pop(key, [])}:
+            entries = [entry for entry in self._cells.get(cell, []) if entry[3] != key]
+            if entries:
+                self._cells[cell] = entries
+            else:
+                self._cells.pop(cell, None)
+    
+    def nearest(
+        self,
+        lat: float,
+        lon: float,
+        radius_miles: float,
+        limit: Optional[int] = None,
+        among: Optional[List[Set[Hashable]]] = None
+    ) -> List[Tuple[Hashable, float]]:
+        """
+        Find the keys nearest to a point, within a distance.
+        
+        Cells are visited in rings around the center's cell. With a limit,
+        the search stops once no unvisited cell can hold a point nearer than
+        the current limit-th match, so a query in a dense area measures
+        about as many points as it returns. When the rings would cover more
+        cells than the grid holds (a large radius or a sparse grid), only the
+        populated cells are checked instead, so the cost is bounded by the
+        size of the grid however large the radius.
+        
+        Args:
+            lat: Latitude of the center, in degrees
+            lon: Longitude of the center, in degrees
+            radius_miles: The radius in miles
+            limit: Maximum number of keys to return; all if None
+            among: Only consider keys that are in every one of these sets
+            
+        Returns:
+            List[Tuple[Hashable, float]]: (key, distance in miles) pairs,
+                nearest first
+        """
+        lat_span = radius_miles / _MILES_PER_DEGREE
+        cos_lat = math.cos(math.radians(min(abs(lat) + lat_span, 89.0)))
+        lon_span = min(radius_miles / (_MILES_PER_DEGREE * cos_lat), 180.0)
+        
+        min_row, min_col = self._cell(lat - lat_span, lon - lon_span)
+        max_row, max_col = self._cell(lat + lat_span, lon + lon_span)
+        center_row, center_col = self._cell(lat, lon)
+        rings = max(center_row - min_row, max_row - center_row,
+                    center_col - min_col, max_col - center_col)
+        
+        # Lower bound on the size of a cell, in miles, across the search area
+        cell_miles = self.cell_degrees * _MILES_PER_DEGREE * cos_lat
+        
+        # Compare haversine terms rather than distances, so only the results
+        # pay for the arcsine
+        phi0 = math.radians(lat)
+        lambda0 = math.radians(lon)
+        cos_phi0 = math.cos(phi0)
+        max_term = _haversine_term(radius_miles)
+        sin = math.sin
+        
+        terms: Dict[Hashable, float] = {}
+        
+        def measure(cell: Tuple[int, int]) -> None:
+            """Record the points of a cell that are within the radius."""
+            if not (min_row <= cell[0] <= max_row and min_col <= cell[1] <= max_col):
+                return
+            for phi, lam, cos_phi, key in self._cells.get(cell, ()):
+                if among and not all(key in keys for keys in among):
+                    continue
+                term = sin((phi - phi0) / 2) ** 2 + \
+                    cos_phi0 * cos_phi * sin((lam - lambda0) / 2) ** 2
+                if term <= max_term and term < terms.get(key, 2.0):
+                    terms[key] = term
+        
+        if (2 * rings + 1) ** 2 > len(self._cells):
+            # The rings would mostly walk empty cells
+            for cell in self._cells:
+                measure(cell)
+        else:
+            for ring in range(rings + 1):
+                for cell in _ring_cells(center_row, center_col, ring):
+                    measure(cell)
+                
+                # Points in later rings are at least ring whole cells away
+                if limit is not None and len(terms) >= limit:
+                    kth_term = heapq.nsmallest(limit, terms.values())[-1]
+                    if kth_term <= _haversine_term(ring * cell_miles):
+                        break
+        
+        ranked = sorted(terms.items(), key=lambda item: (item[1], item[0]))
+        if limit is not None:
+            ranked = ranked[:limit]
+        return [
+            (key, 2 * EARTH_RADIUS_MILES * math.asin(min(1.0, math.sqrt(term))))
+            for key, term in ranked
+        ]
+    
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        """Get the grid cell containing a point."""
+        return math.floor(lat / self.cell_degrees), math.floor(lon / self.cell_degrees)
+
+def _haversine_term(miles: float) -> float:
+    """Get the haversine term of a great-circle distance in miles."""
+    return math.sin(min(miles / EARTH_RADIUS_MILES, math.pi) / 2) ** 2
+
+def _ring_cells(row: int, col: int, ring: int) -> Iterable[Tuple[int, int]]:
+    """Yield the cells exactly ring cells away from a cell."""
+    if ring == 0:
+        yield row, col
+        return
+    for c in range(col - ring, col + ring + 1):
+        yield row - ring, c
+        yield row + ring, c
+    for r in range(row - ring + 1, row + ring):
+        yield r, col - ring
+        yield r, col + ring
\ No newline at end of file
@@ -9,6 +9,22 @@ from .logging import (
     get_agent_logger,
     get_logs_directory
 )
+from .supabase_client import (
+    get_supabase_client,
+    close_supabase_clients,
+    get_async_supabase_client,
+    close_async_supabase_clients,
+    set_supabase_client_factory
+)
+from .db_metrics import (
+    execute,
+    execute_async,
+    db_tags,
+    db_session,
+    db_tool,
+    track_round_trips,
+    get_db_metrics
+)
 
 __all__ = [
     'get_settings',
@@ -16,5 +32,17 @@ __all__ = [
     'setup_logger',
     'get_default_logger',
     'get_agent_logger',
-    'get_logs_directory'
+    'get_logs_directory',
+    'get_supabase_client',
+    'close_supabase_clients',
+    'get_async_supabase_client',
+    'close_async_supabase_clients',
+    'set_supabase_client_factory',
+    'execute',
+    'execute_async',
+    'db_tags',
+    'db_session',
+    'db_tool',
+    'track_round_trips',
+    'get_db_metrics'
 ]
\ No newline at end of file
@@ -0,0 +1,507 @@
+"""
+Instrumented execution of Supabase queries.
+
+Every query goes through execute (or execute_async) with the table and
+operation it runs, instead of calling the builder's .execute() directly.
+Each call is recorded in the process-wide DbMetrics: a latency histogram,
+row count and (if enabled) payload bytes per table, operation and tool.
+Calls are tagged with the session ID and tool name set by db_tags (or the
+db_session and db_tool decorators), and track_round_trips counts the round
+trips of a block of code, such as one agent turn.
+"""
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from .logging import get_default_logger
+
+logger = get_default_logger()
+
+# Upper bounds of the latency histogram buckets, in milliseconds; the last
+# bucket holds everything slower
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+_tags: ContextVar[Dict[str, str]] = ContextVar("instabids_db_tags", default={})
+_round_trips: ContextVar[Tuple["RoundTrips", ...]] = ContextVar(
+    "instabids_db_round_trips", default=()
+)
+
+class DbCall(NamedTuple):
+    """One database round trip."""
+    
+    table: str
+    operation: str
+    seconds: float
+    rows: int
+    bytes_sent: int
+    bytes_received: int
+    error: bool
+    session_id: Optional[str]
+    tool: Optional[str]
+
+class LatencyHistogram:
+    """
+    Latency histogram with fixed buckets (LATENCY_BUCKETS_MS).
+    """
+    
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+    
+    def observe(self, ms: float) -> None:
+        """
+        Add a latency.
+        
+        Args:
+            ms: The latency in milliseconds
+        """
+        self.counts[bisect_left(LATENCY_BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+    
+    def quantile(self, q: float) -> float:
+        """
+        Estimate a latency quantile.
+        
+        Args:
+            q: The quantile, e.g. 0.95
+            
+        Returns:
+            float: Upper bound of the bucket holding the quantile, in
+                milliseconds (the maximum for the last bucket); 0.0 if empty
+        """
+        if not self.count:
+            return 0.0
+        
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS_MS, self.counts):
+            seen += count
+            if seen >= rank:
+                return float(min(bound, self.max_ms))
+        return self.max_ms
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Summarize the histogram.
+        
+        Returns:
+            Dict[str, Any]: Count, mean, p50, p95, p99 and max latency in
+                milliseconds, and the count per bucket upper bound ("inf"
+                for the last bucket)
+        """
+        bounds = [str(bound) for bound in LATENCY_BUCKETS_MS] + ["inf"]
+        return {
+            "count": self.count,
+            "mean_ms": self.total_ms / self.count if self.count else 0.0,
+            "p50_ms": self.quantile(0.5),
+            "p95_ms": self.quantile(0.95),
+            "p99_ms": self.quantile(0.99),
+            "max_ms": self.max_ms,
+            "buckets": dict(zip(bounds, self.counts))
+        }
+
+class RoundTrips:
+    """
+    Database round trips made inside a track_round_trips block.
+    """
+    
+    def __init__(self, name: str):
+        self.name = name
+        self.round_trips = 0
+        self.seconds = 0.0
+        self.rows = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.errors = 0
+        # Round trips by "table operation"
+        self.by_query: Counter = Counter()
+    
+    def add(self, call: DbCall) -> None:
+        """
+        Count a round trip.
+        
+        Args:
+            call: The round trip
+        """
+        self.round_trips += 1
+        self.seconds += call.seconds
+        self.rows += call.rows
+        self.bytes_sent += call.bytes_sent
+        self.bytes_received += call.bytes_received
+        self.errors += call.error
+        self.by_query[f"{call.table} {call.operation}"] += 1
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Summarize the round trips.
+        
+        Returns:
+            Dict[str, Any]: Round trips, total database time, rows, bytes,
+                errors and round trips per query
+        """
+        return {
+            "name": self.name,
+            "round_trips": self.round_trips,
+            "db_ms": self.seconds * 1000,
+            "rows": self.rows,
+            "bytes_sent": self.bytes_sent,
+            "bytes_received": self.bytes_received,
+            "errors": self.errors,
+            "by_query": dict(self.by_query)
+        }
+
+class DbMetrics:
+    """
+    Aggregated database call metrics, per table, operation and tool.
+    
+    Safe to use from many threads. Listeners receive every DbCall, e.g. to
+    forward them to Prometheus or OpenTelemetry.
+    """
+    
+    def __init__(self, measure_payloads: bool = False):
+        """
+        Initialize the metrics.
+        
+        Args:
+            measure_payloads: Measure request and response sizes. Every
+                request and response is serialized again to measure it, which
+                is costly for large reads such as contractor index reloads,
+                so enable this only while investigating payload sizes.
+        """
+        self.measure_payloads = measure_payloads
+        self._series: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+        self._listeners: List[Callable[[DbCall], None]] = []
+        self._lock = threading.Lock()
+    
+    def record(self, call: DbCall) -> None:
+        """
+        Record a database call.
+        
+        Args:
+            call: The call
+        """
+        key = (call.table, call.operation, call.tool or "")
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {
+                    "latency": LatencyHistogram(),
+                    "errors": 0,
+                    "rows": 0,
+                    "bytes_sent": 0,
+                    "bytes_received": 0
+                }
+            series["latency"].observe(call.seconds * 1000)
+            series["errors"] += call.error
+            series["rows"] += call.rows
+            series["bytes_sent"] += call.bytes_sent
+            series["bytes_received"] += call.bytes_received
+            
+            for round_trips in _round_trips.get():
+                round_trips.add(call)
+            listeners = list(self._listeners)
+        
+        for listener in listeners:
+            try:
+                listener(call)
+            except Exception as e:
+                logger.warning(f"Database metrics listener failed: {e}")
+    
+    def add_listener(self, listener: Callable[[DbCall], None]) -> None:
+        """
+        Call a function with every recorded DbCall.
+        
+        Args:
+            listener: The function; it runs on the thread that made the call
+        """
+        with self._lock:
+            self._listeners.append(listener)
+    
+    def remove_listener(self, listener: Callable[[DbCall], None]) -> None:
+        """
+        Stop calling a listener added with add_listener.
+        
+        Args:
+            listener: The function
+        """
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+    
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """
+        Get the metrics recorded so far.
+        
+        Returns:
+            List[Dict[str, Any]]: One entry per table, operation and tool
+                ("" outside tools), with call and error counts, rows, bytes
+                and latency summary
+        """
+        with self._lock:
+            return [
+                {
+                    "table": table,
+                    "operation": operation,
+                    "tool": tool,
+                    "calls": series["latency"].count,
+                    "errors": series["errors"],
+                    "rows": series["rows"],
+                    "bytes_sent": series["bytes_sent"],
+                    "bytes_received": series["bytes_received"],
+                    "latency": series["latency"].to_dict()
+                }
+                for (table, operation, tool), series in sorted(self._series.items())
+            ]
+    
+    def reset(self) -> None:
+        """Forget every recorded call."""
+        with self._lock:
+            self._series.clear()
+
+_db_metrics = DbMetrics(
+    measure_payloads=os.environ.get("DB_METRICS_PAYLOAD_BYTES", "").lower() in ("1", "true")
+)
+
+def get_db_metrics() -> DbMetrics:
+    """
+    Get the process-wide database metrics.
+    
+    Returns:
+        DbMetrics: The metrics every execute call records into
+    """
+    return _db_metrics
+
+@contextmanager
+def db_tags(session_id: Optional[str] = None, tool: Optional[str] = None) -> Iterator[None]:
+    """
+    Tag the database calls made inside the block.
+    
+    Tags are kept in a context variable, so they follow the code into
+    asyncio tasks and asyncio.to_thread. Tags left as None keep their value
+    from an enclosing block.
+    
+    Args:
+        session_id: ID of the agent session being served
+        tool: Name of the tool being run
+    """
+    tags = dict(_tags.get())
+    if session_id is not None:
+        tags["session_id"] = session_id
+    if tool is not None:
+        tags["tool"] = tool
+    token = _tags.set(tags)
+    try:
+        yield
+    finally:
+        _tags.reset(token)
+
+def db_tool(func: Callable) -> Callable:
+    """
+    Decorate a tool so its database calls are tagged with its name.
+    
+    Works on both sync and async tools, and keeps the tool's name, signature
+    and docstring for the agent.
+    
+    Args:
+        func: The tool
+        
+    Returns:
+        Callable: The tagged tool
+    """
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            with db_tags(tool=func.__name__):
+                return await func(*args, **kwargs)
+        return async_wrapper
+    
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with db_tags(tool=func.__name__):
+            return func(*args, **kwargs)
+    return wrapper
+
+def db_session(func: Callable) -> Callable:
+    """
+    Decorate a session service method so its database calls are tagged with
+    the session ID.
+    
+    The ID is the method's session_id argument, or the id of its session
+    argument. Works on both sync and async methods; generator methods would
+    leak the tag into their consumer, so decorate the methods they call
+    instead.
+    
+    Args:
+        func: The method
+        
+    Returns:
+        Callable: The tagged method
+        
+    Raises:
+        TypeError: If the method has neither a session_id nor a session parameter
+    """
+    parameters = list(inspect.signature(func).parameters)
+    if "session_id" in parameters:
+        name = "session_id"
+    elif "session" in parameters:
+        name = "session"
+    else:
+        raise TypeError(f"{func.__name__} has no session_id or session parameter")
+    position = parameters.index(name)
+    
+    def session_id_of(args: Tuple, kwargs: Dict[str, Any]) -> Optional[str]:
+        value = kwargs.get(name) if name in kwargs else (
+            args[position] if len(args) > position else None
+        )
+        if name == "session" and value is not None:
+            value = getattr(value, "id", None)
+        return value
+    
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            with db_tags(session_id=session_id_of(args, kwargs)):
+                return await func(*args, **kwargs)
+        return async_wrapper
+    
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with db_tags(session_id=session_id_of(args, kwargs)):
+            return func(*args, **kwargs)
+    return wrapper
+
+@contextmanager
+def track_round_trips(name: str = "block") -> Iterator[RoundTrips]:
+    """
+    Count the database round trips made inside the block.
+    
+    Blocks may nest; a call counts toward every enclosing block. The count
+    is logged when the block exits, tagged with the current session ID.
+    
+    Example:
+        with db_tags(session_id=session.id), track_round_trips("turn") as trips:
+            ...
+        trips.round_trips
+        
+    Args:
+        name: Name of the block in the log message
+        
+    Yields:
+        RoundTrips: The counts, updated as calls complete
+    """
+    round_trips = RoundTrips(name)
+    token = _round_trips.set(_round_trips.get() + (round_trips,))
+    try:
+        yield round_trips
+    finally:
+        _round_trips.reset(token)
+        session_id = _tags.get().get("session_id")
+        session = f" (session {session_id})" if session_id else ""
+        logger.info(
+            f"{name}{session}: {round_trips.round_trips} database round trips, "
+            f"{round_trips.seconds * 1000:.1f} ms, {round_trips.rows} rows"
+        )
+
+def execute(query: Any, table: str, operation: str) -> Any:
+    """
+    Execute a query builder and record the round trip.
+    
+    Args:
+        query: The query builder, e.g. client.table(...).select(...).eq(...)
+        table: The table queried, or the function for RPC calls
+        operation: "select", "insert", "upsert", "update", "delete" or "rpc"
+        
+    Returns:
+        The query's response
+        
+    Raises:
+        Exception: Whatever the query raises, after it is recorded
+    """
+    start = time.perf_counter()
+    try:
+        result = query.execute()
+    except Exception:
+        _record(query, None, table, operation, time.perf_counter() - start, True)
+        raise
+    _record(query, result, table, operation, time.perf_counter() - start, False)
+    return result
+
+async def execute_async(query: Any, table: str, operation: str) -> Any:
+    """
+    Execute an async query builder and record the round trip.
+    
+    Args:
+        query: The query builder of an async client
+        table: The table queried, or the function for RPC calls
+        operation: "select", "insert", "upsert", "update", "delete" or "rpc"
+        
+    Returns:
+        The query's response
+        
+    Raises:
+        Exception: Whatever the query raises, after it is recorded
+    """
+    start = time.perf_counter()
+    try:
+        result = await query.execute()
+    except Exception:
+        _record(query, None, table, operation, time.perf_counter() - start, True)
+        raise
+    _record(query, result, table, operation, time.perf_counter() - start, False)
+    return result
+
+def _record(
+    query: Any,
+    result: Any,
+    table: str,
+    operation: str,
+    seconds: float,
+    error: bool
+) -> None:
+    """Record one round trip in the process-wide metrics."""
+    data = getattr(result, "data", None)
+    if isinstance(data, list):
+        rows = len(data)
+    else:
+        rows = 0 if data is None else 1
+    
+    bytes_sent = bytes_received = 0
+    if _db_metrics.measure_payloads:
+        # postgrest query builders keep their request body in .json
+        bytes_sent = _json_size(getattr(query, "json", None))
+        bytes_received = _json_size(data)
+    
+    tags = _tags.get()
+    call = DbCall(
+        table=table,
+        operation=operation,
+        seconds=seconds,
+        rows=rows,
+        bytes_sent=bytes_sent,
+        bytes_received=bytes_received,
+        error=error,
+        session_id=tags.get("session_id"),
+        tool=tags.get("tool")
+    )
+    _db_metrics.record(call)
+
+def _json_size(value: Any) -> int:
+    """Get the size of a value serialized as JSON, in bytes (0 if empty)."""
+    if not value:
+        return 0
+    try:
+        return len(json.dumps(value, separators=(",", ":"), default=str))
+    except (TypeError, ValueError):
+        return 0
\ No newline at end of file
@@ -0,0 +1,947 @@
+"""
+In-process fake Supabase client for load tests and benchmarks.
+
+FakeSupabaseClient implements the part of the supabase-py query builder the
+tools and session services use (table/select/insert/upsert/update/delete,
+the eq, neq, gt, gte, lt, lte, like, ilike, is_, in_ and or_ filters, order,
+limit, execute, and rpc) against FakeDatabase, an in-memory store of the
+tables in db/migrations. The RPC functions of the migrations are
+implemented in Python, as are the updated_at triggers, the session touch
+on event inserts and ON DELETE CASCADE from agent_sessions.
+
+Every round trip can be delayed by a fixed latency plus seeded random
+jitter, so runs are repeatable offline. use_fake_supabase makes
+get_supabase_client and get_async_supabase_client return fakes sharing one
+database:
+
+    database = use_fake_supabase(latency_seconds=0.005)
+    with track_round_trips("save") as trips:
+        save_bid_card(homeowner_id, bid_card_data)
+
+Columns are not declared: a row holds the columns it was written with plus
+its table's defaults, and selecting a column a row lacks returns null.
+Values travel as JSON, as they would over the wire.
+"""
+import asyncio
+import functools
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from .supabase_client import set_supabase_client_factory
+
+class FakeTable(NamedTuple):
+    """Schema of a fake table: the parts of it the fake enforces."""
+    
+    primary_key: Tuple[str, ...]
+    # Column -> function returning its default value
+    defaults: Dict[str, Callable[[], Any]]
+    # Other unique column sets
+    unique: Tuple[Tuple[str, ...], ...] = ()
+    # Columns with a hash index, used for eq filters
+    indexes: Tuple[str, ...] = ()
+    # Integer primary key column assigned from a sequence (BIGSERIAL)
+    serial: Optional[str] = None
+    # Set updated_at on every update (the *_modtime triggers)
+    modtime: bool = False
+
+def _now() -> str:
+    """Get the current time as PostgREST returns timestamps."""
+    return datetime.now(timezone.utc).isoformat()
+
+def _uuid() -> str:
+    return str(uuid.uuid4())
+
+def _empty_object() -> Dict[str, Any]:
+    return {}
+
+_TIMESTAMPS = {"created_at": _now, "updated_at": _now}
+
+# The tables of db/migrations
+TABLES: Dict[str, FakeTable] = {
+    "instabids.profiles": FakeTable(("id",), dict(_TIMESTAMPS), modtime=True),
+    "instabids.homeowners": FakeTable(
+        ("id",), {"preferences": _empty_object, **_TIMESTAMPS}, modtime=True
+    ),
+    "instabids.contractors": FakeTable(
+        ("id",),
+        {
+            "services": _empty_object,
+            "service_areas": _empty_object,
+            "verified": lambda: False,
+            **_TIMESTAMPS
+        },
+        modtime=True
+    ),
+    "instabids.bid_cards": FakeTable(
+        ("id",),
+        {
+            "id": _uuid,
+            "status": lambda: "draft",
+            "materials_preferences": _empty_object,
+            "accessibility_needs": _empty_object,
+            "scheduling_constraints": _empty_object,
+            "image_analysis_results": _empty_object,
+            **_TIMESTAMPS
+        },
+        modtime=True
+    ),
+    "instabids.bid_card_revisions": FakeTable(
+        ("id",),
+        {"id": _uuid, "revision_type": lambda: "update", "created_at": _now},
+        unique=(("bid_card_id", "revision_number"),),
+        indexes=("bid_card_id",)
+    ),
+    "instabids.invitations": FakeTable(
+        ("id",),
+        {"id": _uuid, "invitation_sent_at": _now, **_TIMESTAMPS},
+        unique=(("bid_card_id", "contractor_id"),),
+        indexes=("bid_card_id", "contractor_id"),
+        modtime=True
+    ),
+    "instabids.matches": FakeTable(
+        ("id",),
+        {"id": _uuid, "match_timestamp": _now, "status": lambda: "active", **_TIMESTAMPS},
+        unique=(("bid_card_id", "contractor_id"),),
+        modtime=True
+    ),
+    "instabids.conversations": FakeTable(("id",), {"id": _uuid, **_TIMESTAMPS}, modtime=True),
+    "instabids.messages": FakeTable(
+        ("id",), {"id": _uuid, "read": lambda: False, "created_at": _now}
+    ),
+    "instabids.agent_sessions": FakeTable(
+        ("id",),
+        {
+            "state": _empty_object,
+            "initial_state": _empty_object,
+            "version": lambda: 0,
+            **_TIMESTAMPS
+        },
+        indexes=("user_id",),
+        modtime=True
+    ),
+    "instabids.agent_events": FakeTable(
+        ("id",),
+        {"timestamp": lambda: 0.0, "created_at": _now},
+        indexes=("session_id",),
+        serial="id"
+    ),
+    "instabids.agent_events_archive": FakeTable(
+        ("id",), {"created_at": _now, "archived_at": _now}, indexes=("session_id",)
+    ),
+    "instabids.agent_session_snapshots": FakeTable(
+        ("session_id",), {"state": _empty_object, "event_count": lambda: 0, "created_at": _now}
+    )
+}
+
+# Parent table -> (child table, referencing column) deleted with it
+_CASCADES = {
+    "instabids.agent_sessions": (
+        ("instabids.agent_events", "session_id"),
+        ("instabids.agent_session_snapshots", "session_id")
+    )
+}
+
+# Columns compact_agent_session_events copies to agent_events_archive
+_ARCHIVED_EVENT_COLUMNS = (
+    "id", "session_id", "invocation_id", "author", "timestamp", "event_data", "event_blob",
+    "created_at"
+)
+
+try:
+    from postgrest.exceptions import APIError as _APIError
+except ImportError:
+    _APIError = Exception
+
+class FakeAPIError(_APIError):
+    """
+    Error of a fake query, like postgrest's APIError.
+    
+    Has the same code attribute, e.g. "23505" for a duplicate key or
+    "40001" for a session version conflict.
+    """
+    
+    def __init__(self, code: str, message: str):
+        Exception.__init__(self, message)
+        self.code = code
+        self.message = message
+        self.details = None
+        self.hint = None
+
+class FakeResponse:
+    """Response of a fake query, like postgrest's APIResponse."""
+    
+    def __init__(self, data: Any, count: Optional[int] = None):
+        self.data = data
+        self.count = count
+    
+    def __iter__(self) -> Iterator[Tuple[str, Any]]:
+        # Iterates like the pydantic model it stands in for
+        yield "data", self.data
+        yield "count", self.count
+
+class _TableData:
+    """Rows and indexes of one fake table."""
+    
+    def __init__(self, name: str, spec: FakeTable):
+        self.name = name
+        self.spec = spec
+        # Normalized primary key -> row, in insertion order
+        self.rows: Dict[Tuple, Dict[str, Any]] = {}
+        self.unique: Dict[Tuple[str, ...], Dict[Tuple, Tuple]] = {
+            columns: {} for columns in spec.unique
+        }
+        self.indexes: Dict[str, Dict[Any, Dict[Tuple, None]]] = {
+            column: {} for column in spec.indexes
+        }
+        self.sequence = 0
+    
+    def add(self, row: Dict[str, Any]) -> None:
+        """Add a row, enforcing the primary key and unique constraints."""
+        pk = _key(row, self.spec.primary_key)
+        if pk in self.rows:
+            raise _duplicate(self.name, self.spec.primary_key, row)
+        for columns, keys in self.unique.items():
+            key = _key(row, columns)
+            # As in Postgres, rows with nulls never conflict
+            if None not in key and key in keys:
+                raise _duplicate(self.name, columns, row)
+        
+        self.rows[pk] = row
+        self._index(pk, row)
+    
+    def remove(self, pk: Tuple) -> Dict[str, Any]:
+        """Remove a row by normalized primary key."""
+        row = self.rows.pop(pk)
+        self._unindex(pk, row)
+        return row
+    
+    def replace(self, pk: Tuple, row: Dict[str, Any]) -> None:
+        """Replace a row with its updated version."""
+        old = self.remove(pk)
+        try:
+            self.add(row)
+        except FakeAPIError:
+            self.add(old)
+            raise
+    
+    def _index(self, pk: Tuple, row: Dict[str, Any]) -> None:
+        for columns, keys in self.unique.items():
+            key = _key(row, columns)
+            if None not in key:
+                keys[key] = pk
+        for column, index in self.indexes.items():
+            index.setdefault(_normalize(row.get(column)), {})[pk] = None
+    
+    def _unindex(self, pk: Tuple, row: Dict[str, Any]) -> None:
+        for columns, keys in self.unique.items():
+            key = _key(row, columns)
+            if keys.get(key) == pk:
+                del keys[key]
+        for column, index in self.indexes.items():
+            value = _normalize(row.get(column))
+            pks = index.get(value)
+            if pks is not None:
+                pks.pop(pk, None)
+                if not pks:
+                    del index[value]
+
+class FakeDatabase:
+    """
+    In-memory tables and RPC functions behind fake clients.
+    
+    Safe to use from many threads; every query runs under one lock, like a
+    database serializing conflicting writes.
+    """
+    
+    def __init__(self, tables: Optional[Dict[str, FakeTable]] = None):
+        """
+        Initialize an empty database.
+        
+        Args:
+            tables: Table schemas by name; TABLES if None
+        """
+        self.tables = dict(TABLES if tables is None else tables)
+        self.rpcs: Dict[str, Callable[["FakeDatabase", Dict[str, Any]], Any]] = dict(_RPCS)
+        self.round_trips = 0
+        self._data = {name: _TableData(name, spec) for name, spec in self.tables.items()}
+        self._lock = threading.RLock()
+    
+    def seed(self, table: str, rows: List[Dict[str, Any]]) -> None:
+        """
+        Load rows without counting a round trip, e.g. contractors before a run.
+        
+        Args:
+            table: The table name
+            rows: The rows
+        """
+        with self._lock:
+            self._insert(table, _wire(rows))
+    
+    def rows(self, table: str) -> List[Dict[str, Any]]:
+        """
+        Get a copy of every row of a table.
+        
+        Args:
+            table: The table name
+            
+        Returns:
+            List[Dict[str, Any]]: The rows, in insertion order
+        """
+        with self._lock:
+            return _wire(list(self._table(table).rows.values()))
+    
+    def clear(self) -> None:
+        """Delete every row and reset the round trip count."""
+        with self._lock:
+            self._data = {name: _TableData(name, spec) for name, spec in self.tables.items()}
+            self.round_trips = 0
+    
+    def execute(self, query: "FakeQueryBuilder") -> FakeResponse:
+        """
+        Run a query built by a fake client.
+        
+        Args:
+            query: The query
+            
+        Returns:
+            FakeResponse: The response
+            
+        Raises:
+            FakeAPIError: If the query fails
+        """
+        with self._lock:
+            self.round_trips += 1
+            if query.function is not None:
+                rpc = self.rpcs.get(query.function)
+                if rpc is None:
+                    raise FakeAPIError(
+                        "PGRST202", f"Could not find the function public.{query.function}"
+                    )
+                return FakeResponse(_wire(rpc(self, _wire(query.json or {}))))
+            
+            method = query.method
+            if method in ("insert", "upsert"):
+                rows = query.json if isinstance(query.json, list) else [query.json]
+                data = self._insert(
+                    query.table, _wire(rows), upsert=method == "upsert",
+                    on_conflict=query.on_conflict, ignore_duplicates=query.ignore_duplicates
+                )
+                return FakeResponse(_wire(data))
+            
+            matched = self._match(query.table, query.filters)
+            if method == "update":
+                data = self._update(query.table, matched, _wire(query.json))
+            elif method == "delete":
+                data = self._delete(query.table, matched)
+            else:
+                count = len(matched) if query.count else None
+                data = _project(_limit(_sort(matched, query.orders), query.limit_), query.columns)
+                return FakeResponse(_wire(data), count)
+            return FakeResponse(_wire(data))
+    
+    def _table(self, name: str) -> _TableData:
+        data = self._data.get(name)
+        if data is None:
+            raise FakeAPIError("42P01", f'relation "{name}" does not exist')
+        return data
+    
+    def _insert(
+        self,
+        table: str,
+        rows: List[Dict[str, Any]],
+        upsert: bool = False,
+        on_conflict: Optional[str] = None,
+        ignore_duplicates: bool = False
+    ) -> List[Dict[str, Any]]:
+        data = self._table(table)
+        spec = data.spec
+        conflict = tuple(column.strip() for column in on_conflict.split(",")) \
+            if on_conflict else spec.primary_key
+        
+        written = []
+        for values in rows:
+            if upsert:
+                existing = self._find(data, conflict, values)
+                if existing is not None:
+                    if ignore_duplicates:
+                        continue
+                    row = dict(data.rows[existing], **values)
+                    if spec.modtime and "updated_at" not in values:
+                        row["updated_at"] = _now()
+                    data.replace(existing, row)
+                    written.append(row)
+                    continue
+            
+            row = {column: default() for column, default in spec.defaults.items()
+                   if column not in values}
+            row.update(values)
+            if spec.serial and row.get(spec.serial) is None:
+                data.sequence += 1
+                row[spec.serial] = data.sequence
+            elif spec.serial:
+                data.sequence = max(data.sequence, int(row[spec.serial]))
+            data.add(row)
+            written.append(row)
+        
+        if table == "instabids.agent_events" and written:
+            # touch_agent_sessions_on_event
+            touched = {row.get("session_id") for row in written}
+            sessions = self._table("instabids.agent_sessions")
+            now = _now()
+            for session_id in touched:
+                session = sessions.rows.get((_normalize(session_id),))
+                if session is not None:
+                    session["updated_at"] = now
+        return written
+    
+    def _find(
+        self,
+        data: _TableData,
+        columns: Tuple[str, ...],
+        values: Dict[str, Any]
+    ) -> Optional[Tuple]:
+        """Get the primary key of the row matching values on columns, if any."""
+        key = _key(values, columns)
+        if columns == data.spec.primary_key:
+            return key if key in data.rows else None
+        if columns in data.unique:
+            return data.unique[columns].get(key)
+        for pk, row in data.rows.items():
+            if _key(row, columns) == key:
+                return pk
+        return None
+    
+    def _match(self, table: str, filters: List[Tuple]) -> List[Dict[str, Any]]:
+        """Get the rows of a table matching every filter."""
+        data = self._table(table)
+        
+        # Narrow down with the primary key or a hash index when possible
+        candidates: Any = data.rows.values()
+        for column, op, value in filters:
+            if op != "eq":
+                continue
+            if data.spec.primary_key == (column,):
+                row = data.rows.get((_normalize(value),))
+                candidates = [row] if row is not None else []
+                break
+            if column in data.indexes:
+                pks = data.indexes[column].get(_normalize(value), {})
+                candidates = [data.rows[pk] for pk in pks]
+                break
+        
+        return [row for row in candidates if all(_test(row, f) for f in filters)]
+    
+    def _update(
+        self,
+        table: str,
+        rows: List[Dict[str, Any]],
+        values: Dict[str, Any]
+    ) -> List[Dict[str, Any]]:
+        data = self._table(table)
+        updated = []
+        for row in rows:
+            pk = _key(row, data.spec.primary_key)
+            new_row = dict(row, **values)
+            if data.spec.modtime and "updated_at" not in values:
+                new_row["updated_at"] = _now()
+            data.replace(pk, new_row)
+            updated.append(new_row)
+        return updated
+    
+    def _delete(self, table: str, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        data = self._table(table)
+        deleted = [data.remove(_key(row, data.spec.primary_key)) for row in rows]
+        
+        for child, column in _CASCADES.get(table, ()):
+            if child in self._data:
+                for row in deleted:
+                    self._delete(child, self._match(child, [(column, "eq", row.get("id"))]))
+        return deleted
+
+class FakeQueryBuilder:
+    """
+    Query built on a FakeSupabaseClient, like postgrest's request builders.
+    
+    Filters and modifiers return the builder, so calls chain as with the
+    real client.
+    """
+    
+    def __init__(
+        self,
+        client: "FakeSupabaseClient",
+        table: Optional[str] = None,
+        function: Optional[str] = None,
+        params: Optional[Dict[str, Any]] = None
+    ):
+        """
+        Initialize a query on a table, or a call of an RPC function.
+        
+        Args:
+            client: The client running the query
+            table: The table queried
+            function: The RPC function called
+            params: The RPC function's parameters
+        """
+        self.client = client
+        self.table = table
+        self.function = function
+        self.method = "rpc" if function is not None else "select"
+        # Request body, as postgrest builders keep it
+        self.json: Any = params
+        self.columns: Optional[List[str]] = None
+        self.count: Optional[str] = None
+        self.on_conflict: Optional[str] = None
+        self.ignore_duplicates = False
+        self.filters: List[Tuple] = []
+        self.orders: List[Tuple[str, bool, bool]] = []
+        self.limit_: Optional[int] = None
+    
+    def select(self, *columns: str, count: Optional[str] = None) -> "FakeQueryBuilder":
+        self.method = "select"
+        names = [name.strip() for column in columns for name in column.split(",")]
+        self.columns = None if not names or "*" in names else names
+        self.count = count
+        return self
+    
+    def insert(self, json: Any, **kwargs: Any) -> "FakeQueryBuilder":
+        self.method = "insert"
+        self.json = json
+        return self
+    
+    def upsert(
+        self,
+        json: Any,
+        on_conflict: str = "",
+        ignore_duplicates: bool = False,
+        **kwargs: Any
+    ) -> "FakeQueryBuilder":
+        self.method = "upsert"
+        self.json = json
+        self.on_conflict = on_conflict or None
+        self.ignore_duplicates = ignore_duplicates
+        return self
+    
+    def update(self, json: Dict[str, Any], **kwargs: Any) -> "FakeQueryBuilder":
+        self.method = "update"
+        self.json = json
+        return self
+    
+    def delete(self, **kwargs: Any) -> "FakeQueryBuilder":
+        self.method = "delete"
+        return self
+    
+    def eq(self, column: str, value: Any) -> "FakeQueryBuilder":
+        return self._filter(column, "eq", value)
+    
+    def neq(self, column: str, value: Any) -> "FakeQueryBuilder":
+        return self._filter(column, "neq", value)
+    
+    def gt(self, column: str, value: Any) -> "FakeQueryBuilder":
+        return self._filter(column, "gt", value)
+    
+    def gte(self, column: str, value: Any) -> "FakeQueryBuilder":
+        return self._filter(column, "gte", value)
+    
+    def lt(self, column: str, value: Any) -> "FakeQueryBuilder":
+        return self._filter(column, "lt", value)
+    
+    def lte(self, column: str, value: Any) -> "FakeQueryBuilder":
+        return self._filter(column, "lte", value)
+    
+    def like(self, column: str, pattern: str) -> "FakeQueryBuilder":
+        return self._filter(column, "like", pattern)
+    
+    def ilike(self, column: str, pattern: str) -> "FakeQueryBuilder":
+        return self._filter(column, "ilike", pattern)
+    
+    def is_(self, column: str, value: Any) -> "FakeQueryBuilder":
+        return self._filter(column, "is", value)
+    
+    def in_(self, column: str, values: Any) -> "FakeQueryBuilder":
+        return self._filter(column, "in", list(values))
+    
+    def or_(self, filters: str, **kwargs: Any) -> "FakeQueryBuilder":
+        self.filters.append(("", "or", _parse_logic(filters)))
+        return self
+    
+    def order(
+        self,
+        column: str,
+        desc: bool = False,
+        nullsfirst: bool = False,
+        **kwargs: Any
+    ) -> "FakeQueryBuilder":
+        self.orders.append((column, desc, nullsfirst))
+        return self
+    
+    def limit(self, size: int, **kwargs: Any) -> "FakeQueryBuilder":
+        self.limit_ = size
+        return self
+    
+    def execute(self) -> FakeResponse:
+        """
+        Run the query after the client's injected latency.
+        
+        Returns:
+            FakeResponse: The response
+            
+        Raises:
+            FakeAPIError: If the query fails
+        """
+        delay = self.client.delay()
+        if delay > 0:
+            time.sleep(delay)
+        return self.client.database.execute(self)
+    
+    def _filter(self, column: str, op: str, value: Any) -> "FakeQueryBuilder":
+        self.filters.append((column, op, value))
+        return self
+
+class FakeAsyncQueryBuilder(FakeQueryBuilder):
+    """Query built on a FakeAsyncSupabaseClient; execute is awaited."""
+    
+    async def execute(self) -> FakeResponse:
+        delay = self.client.delay()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return self.client.database.execute(self)
+
+class FakeSupabaseClient:
+    """
+    Fake of supabase's Client, backed by a FakeDatabase.
+    """
+    
+    _builder = FakeQueryBuilder
+    
+    def __init__(
+        self,
+        database: Optional[FakeDatabase] = None,
+        latency_seconds: float = 0.0,
+        jitter_seconds: float = 0.0,
+        seed: int = 0
+    ):
+        """
+        Initialize the client.
+        
+        Args:
+            database: The database; a new empty one if None
+            latency_seconds: Delay added to every round trip
+            jitter_seconds: Maximum random delay added on top of latency_seconds
+            seed: Seed of the jitter, so runs are repeatable
+        """
+        self.database = database if database is not None else FakeDatabase()
+        self.latency_seconds = latency_seconds
+        self.jitter_seconds = jitter_seconds
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+    
+    def table(self, table_name: str) -> FakeQueryBuilder:
+        return self._builder(self, table=table_name)
+    
+    def from_(self, table_name: str) -> FakeQueryBuilder:
+        return self.table(table_name)
+    
+    def rpc(self, fn: str, params: Optional[Dict[str, Any]] = None) -> FakeQueryBuilder:
+        return self._builder(self, function=fn, params=params or {})
+    
+    def delay(self) -> float:
+        """
+        Get the injected latency of the next round trip.
+        
+        Returns:
+            float: Seconds to wait
+        """
+        if self.jitter_seconds <= 0:
+            return self.latency_seconds
+        with self._random_lock:
+            return self.latency_seconds + self._random.uniform(0, self.jitter_seconds)
+
+class FakeAsyncSupabaseClient(FakeSupabaseClient):
+    """Fake of supabase's AsyncClient, backed by a FakeDatabase."""
+    
+    _builder = FakeAsyncQueryBuilder
+
+def use_fake_supabase(
+    database: Optional[FakeDatabase] = None,
+    latency_seconds: float = 0.0,
+    jitter_seconds: float = 0.0,
+    seed: int = 0
+) -> FakeDatabase:
+    """
+    Make the Supabase client registry return fake clients sharing a database.
+    
+    SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY are set to placeholders if
+    unset, since the services require them. Objects that already hold a
+    client (e.g. a SupabaseMemoryService) keep it; create them after this
+    call. Call set_supabase_client_factory(None) to go back to real clients.
+    
+    Args:
+        database: The database; a new empty one if None
+        latency_seconds: Delay added to every round trip
+        jitter_seconds: Maximum random delay added on top of latency_seconds
+        seed: Seed of the jitter
+        
+    Returns:
+        FakeDatabase: The database behind the fake clients
+    """
+    if database is None:
+        database = FakeDatabase()
+    os.environ.setdefault("SUPABASE_URL", "http://fake-supabase.local")
+    os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "fake-service-role-key")
+    
+    set_supabase_client_factory(
+        lambda url, key: FakeSupabaseClient(database, latency_seconds, jitter_seconds, seed),
+        lambda url, key: FakeAsyncSupabaseClient(database, latency_seconds, jitter_seconds, seed)
+    )
+    return database
+
+def _merge_agent_session_state(database: FakeDatabase, params: Dict[str, Any]) -> int:
+    """public.merge_agent_session_state"""
+    session_id = params["p_session_id"]
+    expected_version = params.get("p_expected_version")
+    sessions = database._table("instabids.agent_sessions")
+    session = sessions.rows.get((_normalize(session_id),))
+    
+    if session is None:
+        raise FakeAPIError("P0002", f"agent session {session_id} not found")
+    if expected_version is not None and session.get("version") != expected_version:
+        raise FakeAPIError(
+            "40001",
+            f"agent session {session_id} was modified concurrently "
+            f"(expected version {expected_version})"
+        )
+    
+    state = session.get("state")
+    if isinstance(state, str):
+        state = json.loads(state)
+    session["state"] = dict(state or {}, **params["p_state_delta"])
+    session["version"] = session.get("version", 0) + 1
+    session["updated_at"] = _now()
+    return session["version"]
+
+def _compact_agent_session_events(database: FakeDatabase, params: Dict[str, Any]) -> int:
+    """public.compact_agent_session_events"""
+    watermark = (params["p_watermark_timestamp"], params["p_watermark_id"])
+    events = [
+        row for row in database._match(
+            "instabids.agent_events", [("session_id", "eq", params["p_session_id"])]
+        )
+        if (row.get("timestamp"), row.get("id")) <= watermark
+    ]
+    removed = database._delete("instabids.agent_events", events)
+    
+    if params.get("p_archive", True):
+        database._insert("instabids.agent_events_archive", [
+            {column: row.get(column) for column in _ARCHIVED_EVENT_COLUMNS} for row in removed
+        ])
+    return len(removed)
+
+def _contractor_response_rates(
+    database: FakeDatabase,
+    params: Dict[str, Any]
+) -> List[Dict[str, Any]]:
+    """public.contractor_response_rates"""
+    counts: Dict[Any, List[int]] = {}
+    since = params["p_since"]
+    for row in database._table("instabids.invitations").rows.values():
+        sent_at = row.get("invitation_sent_at")
+        if sent_at is None or sent_at < since:
+            continue
+        count = counts.setdefault(row.get("contractor_id"), [0, 0])
+        count[0] += 1
+        count[1] += row.get("response") is not None
+    return [
+        {"contractor_id": contractor_id, "invited": invited, "responded": responded}
+        for contractor_id, (invited, responded) in counts.items()
+    ]
+
+_RPCS: Dict[str, Callable[[FakeDatabase, Dict[str, Any]], Any]] = {
+    "merge_agent_session_state": _merge_agent_session_state,
+    "compact_agent_session_events": _compact_agent_session_events,
+    "contractor_response_rates": _contractor_response_rates
+}
+
+def _wire(value: Any) -> Any:
+    """Copy a value the way sending it as JSON would."""
+    return json.loads(json.dumps(value))
+
+def _normalize(value: Any) -> Any:
+    """Get the key of a value in primary keys and indexes, so 41 and "41" match."""
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            number = float(value)
+        except ValueError:
+            return value
+        return number if math.isfinite(number) else value
+    return json.dumps(value, sort_keys=True)
+
+def _key(row: Dict[str, Any], columns: Tuple[str, ...]) -> Tuple:
+    return tuple(_normalize(row.get(column)) for column in columns)
+
+def _duplicate(table: str, columns: Tuple[str, ...], row: Dict[str, Any]) -> FakeAPIError:
+    values = ", ".join(str(row.get(column)) for column in columns)
+    return FakeAPIError(
+        "23505",
+        f"duplicate key value violates unique constraint on {table} "
+        f"({', '.join(columns)})=({values})"
+    )
+
+def _coerce(value: Any, like: Any) -> Any:
+    """Convert a filter value (possibly a string from a URL) to the type of a column value."""
+    if isinstance(value, str) and not isinstance(like, str):
+        if isinstance(like, bool):
+            return value.lower() == "true"
+        if isinstance(like, (int, float)):
+            try:
+                return float(value)
+            except ValueError:
+                return value
+    return value
+
+@functools.lru_cache(maxsize=256)
+def _like(pattern: str, flags: int = 0) -> "re.Pattern[str]":
+    """Compile a LIKE pattern (% or * for any text, _ for any character)."""
+    parts = [".*" if char in "%*" else "." if char == "_" else re.escape(char)
+             for char in pattern]
+    return re.compile("".join(parts), flags | re.DOTALL)
+
+def _test(row: Dict[str, Any], condition: Tuple) -> bool:
+    """Check whether a row matches a (column, op, value) filter."""
+    column, op, value = condition
+    if op == "or":
+        return any(_test(row, part) for part in value)
+    if op == "and":
+        return all(_test(row, part) for part in value)
+    
+    actual = row.get(column)
+    if op == "is":
+        if value is None or str(value).lower() == "null":
+            return actual is None
+        return actual is _coerce(value, True)
+    if op == "in":
+        return any(actual == _coerce(item, actual) for item in value)
+    if actual is None:
+        return False
+    if op in ("like", "ilike"):
+        flags = re.IGNORECASE if op == "ilike" else 0
+        return isinstance(actual, str) and _like(value, flags).fullmatch(actual) is not None
+    
+    value = _coerce(value, actual)
+    try:
+        if op == "eq":
+            return actual == value
+        if op == "neq":
+            return actual != value
+        if op == "gt":
+            return actual > value
+        if op == "gte":
+            return actual >= value
+        if op == "lt":
+            return actual < value
+        if op == "lte":
+            return actual <= value
+    except TypeError:
+        return False
+    raise FakeAPIError("PGRST100", f"Unsupported filter operator: {op}")
+
+def _parse_logic(expression: str) -> List[Tuple]:
+    """
+    Parse a PostgREST logic filter such as "a.gt.1,and(a.eq.1,b.gt.2)".
+    
+    Returns:
+        List[Tuple]: One filter per comma-separated condition
+    """
+    conditions = []
+    for part in _split_top_level(expression):
+        if part.startswith("and(") and part.endswith(")"):
+            conditions.append(("", "and", _parse_logic(part[4:-1])))
+        elif part.startswith("or(") and part.endswith(")"):
+            conditions.append(("", "or", _parse_logic(part[3:-1])))
+        else:
+            column, op, value = part.split(".", 2)
+            if op == "in":
+                value = [item.strip().strip('"') for item in value.strip("()").split(",")]
+            conditions.append((column, op, value))
+    return conditions
+
+def _split_top_level(expression: str) -> List[str]:
+    """Split on commas that are not inside parentheses."""
+    parts = []
+    depth = 0
+    start = 0
+    for i, char in enumerate(expression):
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "," and depth == 0:
+            parts.append(expression[start:i].strip())
+            start = i + 1
+    parts.append(expression[start:].strip())
+    return [part for part in parts if part]
+
+def _sort(rows: List[Dict[str, Any]], orders: List[Tuple[str, bool, bool]]) -> List[Dict[str, Any]]:
+    """Sort rows by several columns, with nulls placed as Postgres does."""
+    rows = list(rows)
+    for column, desc, nullsfirst in reversed(orders):
+        present = [row for row in rows if row.get(column) is not None]
+        nulls = [row for row in rows if row.get(column) is None]
+        present.sort(key=lambda row: row[column], reverse=desc)
+        # Nulls sort as the largest value
+        rows = nulls + present if nullsfirst or desc else present + nulls
+    return rows
+
+def _limit(rows: List[Dict[str, Any]], limit: Optional[int]) -> List[Dict[str, Any]]:
+    return rows if limit is None else rows[:limit]
+
+def _project(rows: List[Dict[str, Any]], columns: Optional[List[str]]) -> List[Dict[str, Any]]:
+    if columns is None:
+        return rows
+    return [{column: row.get(column) for column in columns} for row in rows]
+
+def _benchmark(turns: int = 200, latency_seconds: float = 0.002) -> None:
+    """Count the round trips and time of agent-like turns against a fake database."""
+    from ..sessions.memory_service import SupabaseMemoryService
+    from ..tools import database_tools
+    from .db_metrics import track_round_trips
+    
+    use_fake_supabase(latency_seconds=latency_seconds)
+    service = SupabaseMemoryService()
+    bid_card = {
+        "project_type": "Bathroom Remodel",
+        "project_scope": "Replace tub with walk-in shower",
+        "timeline": {"start": "next month"},
+        "location": {"city": "Austin", "state": "TX", "zip": "78701"}
+    }
+    
+    start = time.perf_counter()
+    with track_round_trips("benchmark") as trips:
+        for turn in range(turns):
+            user_id = f"user-{turn}"
+            session = service.create_session("benchmark", user_id, {})
+            saved = database_tools.save_bid_card(user_id, bid_card)
+            database_tools.get_bid_card(saved["bid_card_id"])
+            database_tools.find_contractors("bathroom remodel", bid_card["location"])
+            service.get_session("benchmark", user_id, session.id)
+    elapsed = time.perf_counter() - start
+    
+    print(f"{turns} turns at {latency_seconds * 1000:.1f} ms latency: "
+          f"{trips.round_trips / turns:.2f} round trips and {elapsed / turns * 1000:.2f} ms "
+          f"per turn ({turns / elapsed:.0f} turns/s)")
+    for query, count in sorted(trips.by_query.items()):
+        print(f"  {query}: {count / turns:.2f} per turn")
+
+if __name__ == "__main__":
+    _benchmark()
\ No newline at end of file
@@ -0,0 +1,269 @@
+"""
+Process-wide Supabase client registry for InstaBids.
+"""
+import asyncio
+import os
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .logging import get_default_logger
+
+logger = get_default_logger()
+
+# Default number of pooled HTTP connections per client
+DEFAULT_POOL_SIZE = 10
+
+_clients: Dict[Tuple[str, str], Any] = {}
+_http_clients: Dict[Tuple[str, str], Any] = {}
+_lock = threading.Lock()
+_pid = os.getpid()
+
+# Async clients are bound to the event loop that created them
+_async_clients: Dict[Tuple[str, str], Tuple[Any, "asyncio.Future[Any]"]] = {}
+_async_http_clients: Dict[Tuple[str, str], Any] = {}
+
+# Client factories replacing supabase's; see set_supabase_client_factory
+_client_factory: Optional[Callable[[str, str], Any]] = None
+_async_client_factory: Optional[Callable[[str, str], Any]] = None
+
+def get_supabase_client(url: Optional[str] = None, key: Optional[str] = None) -> Any:
+    """
+    Get the shared Supabase client, creating it on first use.
+    
+    One client per (url, key) is kept for the life of the process, so its
+    keep-alive HTTP connections are reused by every caller instead of a new
+    client (and TLS handshake) per call. Safe to call from many threads; a
+    forked worker creates its own client on first use rather than sharing
+    the parent's connections.
+    
+    Args:
+        url: Supabase URL; SUPABASE_URL if None
+        key: Supabase key; SUPABASE_SERVICE_ROLE_KEY if None
+        
+    Returns:
+        Client: The Supabase client.
+        
+    Raises:
+        ValueError: If the URL or key is not set
+    """
+    url = url or os.environ.get("SUPABASE_URL")
+    key = key or os.environ.get("SUPABASE_SERVICE_ROLE_KEY")
+    
+    if not url or not key:
+        raise ValueError("SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY must be set")
+    
+    if os.getpid() != _pid:
+        _reset_after_fork()
+    
+    client = _clients.get((url, key))
+    if client is not None:
+        return client
+    
+    with _lock:
+        client = _clients.get((url, key))
+        if client is None:
+            client = _create_client(url, key)
+            _clients[(url, key)] = client
+    return client
+
+async def get_async_supabase_client(
+    url: Optional[str] = None,
+    key: Optional[str] = None
+) -> Optional[Any]:
+    """
+    Get the shared async Supabase client of the running event loop.
+    
+    Like get_supabase_client, one client per (url, key) is reused by every
+    caller, with a connection pool of SUPABASE_POOL_SIZE. Concurrent first
+    calls wait for the same client instead of each creating one.
+    
+    Args:
+        url: Supabase URL; SUPABASE_URL if None
+        key: Supabase key; SUPABASE_SERVICE_ROLE_KEY if None
+        
+    Returns:
+        AsyncClient: The async client, or None if the installed supabase
+            package has no async client
+            
+    Raises:
+        ValueError: If the URL or key is not set
+    """
+    url = url or os.environ.get("SUPABASE_URL")
+    key = key or os.environ.get("SUPABASE_SERVICE_ROLE_KEY")
+    
+    if not url or not key:
+        raise ValueError("SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY must be set")
+    
+    if _async_client_factory is None:
+        import supabase
+        if not hasattr(supabase, "acreate_client"):
+            return None
+    
+    if os.getpid() != _pid:
+        _reset_after_fork()
+    
+    loop = asyncio.get_running_loop()
+    entry = _async_clients.get((url, key))
+    if entry is None or entry[0] is not loop:
+        entry = (loop, asyncio.ensure_future(_create_async_client(url, key)))
+        _async_clients[(url, key)] = entry
+    
+    try:
+        return await asyncio.shield(entry[1])
+    except Exception:
+        # Let the next call try again
+        if _async_clients.get((url, key)) is entry:
+            del _async_clients[(url, key)]
+        raise
+
+def set_supabase_client_factory(
+    factory: Optional[Callable[[str, str], Any]],
+    async_factory: Optional[Callable[[str, str], Any]] = None
+) -> None:
+    """
+    Create clients with the given factories instead of supabase's.
+    
+    Used to run against an in-process fake (see fake_supabase) or a
+    wrapped client. Clients created before the call are forgotten, so every
+    caller gets a client from the new factory on its next call.
+    
+    Args:
+        factory: Called with (url, key) to create a sync client; None
+            restores supabase.create_client
+        async_factory: Called with (url, key) to create an async client;
+            None restores supabase.acreate_client
+    """
+    global _client_factory, _async_client_factory
+    
+    close_supabase_clients()
+    with _lock:
+        _client_factory = factory
+        _async_client_factory = async_factory
+        _async_clients.clear()
+
+def close_supabase_clients() -> None:
+    """Close pooled connections and forget all clients (e.g. on shutdown)."""
+    with _lock:
+        for http_client in _http_clients.values():
+            try:
+                http_client.close()
+            except Exception as e:
+                logger.warning(f"Failed to close Supabase HTTP client: {e}")
+        _http_clients.clear()
+        _clients.clear()
+
+async def close_async_supabase_clients() -> None:
+    """Close the async clients' pooled connections and forget them."""
+    http_clients = list(_async_http_clients.values())
+    _async_http_clients.clear()
+    _async_clients.clear()
+    for http_client in http_clients:
+        try:
+            await http_client.aclose()
+        except Exception as e:
+            logger.warning(f"Failed to close async Supabase HTTP client: {e}")
+
+def _create_client(url: str, key: str) -> Any:
+    """
+    Create a Supabase client with a connection pool of SUPABASE_POOL_SIZE.
+    
+    Supabase releases that cannot take a custom HTTP client get a default
+    client, which still keeps its connections alive.
+    The factory set by set_supabase_client_factory, if any, is used instead.
+    
+    Args:
+        url: Supabase URL
+        key: Supabase key
+        
+    Returns:
+        The new client
+    """
+    if _client_factory is not None:
+        return _client_factory(url, key)
+    
+    from supabase import create_client
+    
+    pool_size = int(os.environ.get("SUPABASE_POOL_SIZE", DEFAULT_POOL_SIZE))
+    
+    try:
+        import httpx
+        from supabase import ClientOptions
+        
+        http_client = httpx.Client(
+            limits=httpx.Limits(
+                max_connections=pool_size,
+                max_keepalive_connections=pool_size
+            )
+        )
+        try:
+            options = ClientOptions(httpx_client=http_client)
+        except TypeError:
+            http_client.close()
+            raise
+    except (ImportError, TypeError):
+        logger.info("Supabase client does not accept an HTTP client; using its default pool")
+        return create_client(url, key)
+    
+    _http_clients[(url, key)] = http_client
+    logger.info(f"Created shared Supabase client (pool size {pool_size})")
+    return create_client(url, key, options=options)
+
+async def _create_async_client(url: str, key: str) -> Any:
+    """
+    Create an async Supabase client with a connection pool of
+    SUPABASE_POOL_SIZE, falling back to the client's default pool.
+    The async factory set by set_supabase_client_factory, if any, is used
+    instead.
+    
+    Args:
+        url: Supabase URL
+        key: Supabase key
+        
+    Returns:
+        The new async client
+    """
+    if _async_client_factory is not None:
+        return _async_client_factory(url, key)
+    
+    from supabase import acreate_client
+    
+    pool_size = int(os.environ.get("SUPABASE_POOL_SIZE", DEFAULT_POOL_SIZE))
+    
+    try:
+        import httpx
+        from supabase import AsyncClientOptions
+        
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=pool_size,
+                max_keepalive_connections=pool_size
+            )
+        )
+        try:
+            options = AsyncClientOptions(httpx_client=http_client)
+        except TypeError:
+            await http_client.aclose()
+            raise
+    except (ImportError, TypeError):
+        logger.info("Async Supabase client does not accept an HTTP client; using its default pool")
+        return await acreate_client(url, key)
+    
+    _async_http_clients[(url, key)] = http_client
+    logger.info(f"Created shared async Supabase client (pool size {pool_size})")
+    return await acreate_client(url, key, options=options)
+
+def _reset_after_fork() -> None:
+    """Forget the parent process's clients and lock in a forked child."""
+    global _lock, _pid
+    
+    # The parent's lock may have been held at fork time, and its sockets
+    # must not be shared between processes
+    _lock = threading.Lock()
+    _pid = os.getpid()
+    _clients.clear()
+    _http_clients.clear()
+    _async_clients.clear()
+    _async_http_clients.clear()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
\ No newline at end of file
@@ -0,0 +1,33 @@
+"""
+Shared fixtures and helpers for the unit tests.
+"""
+from types import SimpleNamespace
+
+import pytest
+
+from instabids.tools import database_tools
+from instabids.utils.fake_supabase import use_fake_supabase
+from instabids.utils.supabase_client import set_supabase_client_factory
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    """Route every Supabase client to a fresh in-process FakeDatabase."""
+    monkeypatch.setenv("SUPABASE_URL", "http://fake-supabase.local")
+    monkeypatch.setenv("SUPABASE_SERVICE_ROLE_KEY", "fake-service-role-key")
+    # Reads must reach the fake rather than a bid card cached by another test
+    monkeypatch.setattr(database_tools, "_bid_card_cache", None)
+    database = use_fake_supabase()
+    yield database
+    set_supabase_client_factory(None)
+
+
+def make_event(timestamp, **state_delta):
+    """Build a minimal event carrying a state delta."""
+    return SimpleNamespace(
+        invocation_id="inv",
+        author="user",
+        timestamp=timestamp,
+        content=None,
+        actions=SimpleNamespace(state_delta=state_delta)
+    )
\ No newline at end of file
@@ -0,0 +1,76 @@
+"""
+Unit tests for the asyncio database tools, against the in-process fake.
+"""
+import asyncio
+import threading
+
+from instabids.tools import async_database_tools, database_tools
+from instabids.tools.cache import CacheBackend, LocalCacheBackend
+
+BID_CARD = {
+    "project_type": "Bathroom Remodel",
+    "project_scope": "Replace tub with walk-in shower",
+    "timeline": {"start": "next month"},
+    "location": {"city": "Austin", "state": "TX"},
+}
+
+
+class RecordingBackend(CacheBackend):
+    """Blocking backend that records which thread each call runs on."""
+    
+    blocking = True
+    
+    def __init__(self):
+        self.cache = LocalCacheBackend()
+        self.threads = []
+    
+    def get(self, key):
+        self.threads.append(threading.get_ident())
+        return self.cache.get(key)
+    
+    def set(self, key, value, ttl_seconds=None):
+        self.threads.append(threading.get_ident())
+        self.cache.set(key, value, ttl_seconds)
+    
+    def delete(self, key):
+        self.threads.append(threading.get_ident())
+        self.cache.delete(key)
+    
+    def clear(self):
+        self.cache.clear()
+
+
+def test_blocking_cache_is_called_off_the_event_loop(fake_db):
+    backend = RecordingBackend()
+    database_tools.set_bid_card_cache(backend)
+    
+    async def run():
+        saved = await async_database_tools.save_bid_card("homeowner-1", BID_CARD)
+        bid_card_id = saved["bid_card_id"]
+        first = await async_database_tools.get_bid_card(bid_card_id)
+        second = await async_database_tools.get_bid_cards([bid_card_id, "missing"])
+        return threading.get_ident(), bid_card_id, first, second
+    
+    loop_thread, bid_card_id, first, second = asyncio.run(run())
+    
+    assert first["status"] == "success"
+    assert [card["id"] for card in second["bid_cards"]] == [bid_card_id]
+    assert second["missing"] == ["missing"]
+    assert backend.cache.get(bid_card_id)["project_scope"] == BID_CARD["project_scope"]
+    assert backend.threads
+    assert loop_thread not in backend.threads
+
+
+def test_local_cache_serves_async_reads(fake_db):
+    database_tools.set_bid_card_cache(LocalCacheBackend())
+    
+    async def run():
+        saved = await async_database_tools.save_bid_card("homeowner-1", BID_CARD)
+        await async_database_tools.get_bid_card(saved["bid_card_id"])
+        return saved["bid_card_id"]
+    
+    bid_card_id = asyncio.run(run())
+    # Served from the cache without another query
+    round_trips = fake_db.round_trips
+    assert asyncio.run(async_database_tools.get_bid_card(bid_card_id))["status"] == "success"
+    assert fake_db.round_trips == round_trips
\ No newline at end of file
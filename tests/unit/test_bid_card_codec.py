@@ -0,0 +1,59 @@
+"""
+Unit tests for the bid card column spec and RowCodec.
+"""
+import pytest
+
+from instabids.tools.bid_card_codec import BID_CARD_CODEC, Column, RowCodec
+
+BID_CARD = {
+    "project_type": "Bathroom Remodel",
+    "project_scope": "Replace tub with walk-in shower",
+    "timeline": {"start": "next month"},
+    "location": {"city": "Austin", "state": "TX"},
+}
+
+
+def test_encode_fills_defaults_and_keeps_json_native():
+    row = BID_CARD_CODEC.encode(dict(BID_CARD, unknown="dropped"), homeowner_id="h1")
+    
+    assert row["homeowner_id"] == "h1"
+    assert row["project_name"] == "Bathroom Remodel Project"
+    assert row["status"] == "draft"
+    assert row["timeline"] == {"start": "next month"}
+    assert isinstance(row["id"], str) and row["id"]
+    assert "unknown" not in row
+
+
+def test_encode_keeps_given_values_over_defaults():
+    row = BID_CARD_CODEC.encode(dict(BID_CARD, id="card-1", status="open"))
+    assert row["id"] == "card-1"
+    assert row["status"] == "open"
+
+
+def test_encode_requires_required_columns():
+    data = dict(BID_CARD)
+    del data["location"]
+    with pytest.raises(ValueError, match="location"):
+        BID_CARD_CODEC.encode(data)
+
+
+def test_decode_unwraps_legacy_json_strings():
+    row = BID_CARD_CODEC.decode({
+        "timeline": '{"start": "soon"}',
+        "location": {"city": "Austin"},
+        "budget_range": "[not json",
+        "project_scope": '{"kept": "as text"}',
+    })
+    
+    assert row["timeline"] == {"start": "soon"}
+    assert row["location"] == {"city": "Austin"}
+    assert row["budget_range"] == "[not json"
+    # Plain columns are never decoded
+    assert row["project_scope"] == '{"kept": "as text"}'
+
+
+def test_codec_rejects_invalid_specs():
+    with pytest.raises(ValueError):
+        RowCodec([Column("id"), Column("id")])
+    with pytest.raises(ValueError):
+        RowCodec([Column("id", "blob")])
\ No newline at end of file
@@ -0,0 +1,96 @@
+"""
+Unit tests for session compaction in the in-memory and Supabase services.
+"""
+import pytest
+
+from instabids.sessions.memory_service import InMemorySessionService, SupabaseMemoryService
+
+from conftest import make_event
+
+
+def test_in_memory_compaction_folds_old_events():
+    service = InMemorySessionService()
+    session = service.create_session("app", "user", {"step": 0})
+    for index in range(10):
+        service.append_event(session, make_event(float(index), step=index))
+    
+    snapshot = service.compact_session("app", "user", session.id, keep_last=4)
+    assert snapshot.event_count == 6
+    assert snapshot.state == {"step": 5}
+    assert len(service.list_events("app", "user", session.id)) == 4
+    
+    for index in range(10, 13):
+        service.append_event(session, make_event(float(index), step=index))
+    snapshot = service.compact_session("app", "user", session.id, keep_last=4)
+    assert snapshot.event_count == 9
+    assert snapshot.state == {"step": 8}
+
+
+def test_in_memory_compaction_skips_events_already_folded():
+    service = InMemorySessionService()
+    session = service.create_session("app", "user")
+    for index in range(10):
+        service.append_event(session, make_event(float(index), step=index))
+    session_data = service.sessions[session.id]
+    events = list(session_data["events"])
+    
+    first = service.compact_session("app", "user", session.id, keep_last=5)
+    # As if the folded events had not been removed
+    session_data["events"] = events
+    session_data["first_seq"] = 0
+    
+    retried = service.compact_session("app", "user", session.id, keep_last=5)
+    assert retried.event_count == first.event_count == 5
+    assert retried.watermark == first.watermark
+    assert len(service.list_events("app", "user", session.id)) == 5
+
+
+@pytest.fixture
+def supabase_session(fake_db):
+    service = SupabaseMemoryService()
+    session = service.create_session("app", "user", {"step": 0})
+    for index in range(10):
+        service.append_event(session, make_event(float(index), step=index))
+    return service, session
+
+
+def test_supabase_compaction_moves_folded_events(fake_db, supabase_session):
+    service, session = supabase_session
+    
+    snapshot = service.compact_session("app", "user", session.id, keep_last=4)
+    assert snapshot.event_count == 6
+    assert snapshot.state == {"step": 5}
+    assert len(fake_db.rows("instabids.agent_events")) == 4
+    assert len(fake_db.rows("instabids.agent_events_archive")) == 6
+
+
+def test_supabase_compaction_retry_does_not_double_count(fake_db, supabase_session, monkeypatch):
+    service, session = supabase_session
+    execute = fake_db.execute
+    
+    def fail_move(query):
+        if query.function == "compact_agent_session_events":
+            raise TimeoutError("read timed out")
+        return execute(query)
+    
+    monkeypatch.setattr(fake_db, "execute", fail_move)
+    with pytest.raises(TimeoutError):
+        service.compact_session("app", "user", session.id, keep_last=4)
+    monkeypatch.setattr(fake_db, "execute", execute)
+    
+    # The snapshot was stored but the folded events are still live
+    assert len(fake_db.rows("instabids.agent_events")) == 10
+    snapshot, tail = service.get_history("app", "user", session.id, max_events=10)
+    assert snapshot.event_count == 6
+    assert [event["timestamp"] for event in tail] == [6.0, 7.0, 8.0, 9.0]
+    
+    retried = service.compact_session("app", "user", session.id, keep_last=4)
+    assert retried.event_count == 6
+    assert retried.state == {"step": 5}
+    assert len(fake_db.rows("instabids.agent_events")) == 4
+    
+    for index in range(10, 12):
+        service.append_event(session, make_event(float(index), step=index))
+    snapshot = service.compact_session("app", "user", session.id, keep_last=4)
+    assert snapshot.event_count == 8
+    assert snapshot.state == {"step": 7}
\ No newline at end of file
@@ -0,0 +1,96 @@
+"""
+Unit tests for ContractorIndex.
+"""
+import pytest
+
+from instabids.tools.contractor_index import ContractorIndex
+from instabids.utils.fake_supabase import FakeDatabase, FakeSupabaseClient
+
+AUSTIN = [{"city": "Austin", "state": "TX"}]
+
+
+def make_index(**kwargs):
+    database = FakeDatabase()
+    database.seed("instabids.contractors", [
+        {"id": "c1", "name": "Tile Co", "services": ["bathroom remodel"],
+         "service_areas": AUSTIN, "rating": 4.5},
+        {"id": "c2", "name": "Roof Co", "services": ["roofing"],
+         "service_areas": AUSTIN, "rating": 4.0},
+    ])
+    index = ContractorIndex(FakeSupabaseClient(database), zip_centroids={}, **kwargs)
+    return database, index
+
+
+def unreachable(query):
+    raise ConnectionError("db down")
+
+
+def test_search_matches_service_and_location():
+    _, index = make_index()
+    matches = index.search("Bathroom Remodels", {"city": "austin", "state": "Texas"})
+    assert [row["id"] for row in matches] == ["c1"]
+
+
+def test_failed_refresh_keeps_serving_loaded_index(monkeypatch):
+    database, index = make_index(refresh_interval_seconds=0, retry_backoff_seconds=60)
+    index.search("roofing", {"city": "Austin", "state": "TX"})
+    
+    calls = []
+    
+    def record_and_fail(query):
+        calls.append(query)
+        unreachable(query)
+    
+    monkeypatch.setattr(database, "execute", record_and_fail)
+    matches = index.search("roofing", {"city": "Austin", "state": "TX"})
+    assert [row["id"] for row in matches] == ["c2"]
+    assert len(calls) == 1
+    
+    # Backing off: the next search does not go to the database
+    assert not index.needs_refresh()
+    index.search("roofing", {"city": "Austin", "state": "TX"})
+    assert len(calls) == 1
+
+
+def test_refresh_resumes_after_backoff(monkeypatch):
+    database, index = make_index(refresh_interval_seconds=0, retry_backoff_seconds=0)
+    index.search("roofing", {"city": "Austin", "state": "TX"})
+    
+    execute = database.execute
+    monkeypatch.setattr(database, "execute", unreachable)
+    index.search("roofing", {"city": "Austin", "state": "TX"})
+    
+    monkeypatch.setattr(database, "execute", execute)
+    database.seed("instabids.contractors", [
+        {"id": "c3", "name": "Roof Two", "services": ["roofing"],
+         "service_areas": AUSTIN, "rating": 5.0},
+    ])
+    matches = index.search("roofing", {"city": "Austin", "state": "TX"})
+    assert {row["id"] for row in matches} == {"c2", "c3"}
+
+
+def test_initial_load_failure_raises(monkeypatch):
+    database, index = make_index()
+    monkeypatch.setattr(database, "execute", unreachable)
+    with pytest.raises(ConnectionError):
+        index.search("roofing", {"city": "Austin", "state": "TX"})
+
+def test_refresh_pages_past_rows_sharing_one_timestamp(monkeypatch):
+    database, index = make_index(refresh_interval_seconds=0, page_size=2)
+    index.search("roofing", {"city": "Austin", "state": "TX"})
+    
+    # One bulk update gives more rows than a page the same updated_at
+    updated_at = "2030-01-01T00:00:00+00:00"
+    database.seed("instabids.contractors", [
+        {"id": f"r{number}", "name": f"Roofer {number}", "services": ["roofing"],
+         "service_areas": AUSTIN, "rating": 3.0, "updated_at": updated_at}
+        for number in range(5)
+    ])
+    reloads = []
+    reload = index._reload
+    monkeypatch.setattr(index, "_reload", lambda: reloads.append(1) or reload())
+    
+    for _ in range(3):
+        matches = index.search("roofing", {"city": "Austin", "state": "TX"}, limit=10)
+        assert {row["id"] for row in matches} == {"c2"} | {f"r{number}" for number in range(5)}
+    assert reloads == []
\ No newline at end of file
@@ -0,0 +1,134 @@
+"""
+Unit tests for the bid card database tools, against the in-process fake.
+"""
+import asyncio
+import json
+from types import SimpleNamespace
+
+from instabids.tools import async_database_tools, database_tools
+from instabids.tools.database_tools import (
+    find_contractors,
+    get_bid_card,
+    get_bid_cards,
+    save_bid_cards,
+)
+
+
+def make_card(number, **fields):
+    return dict({
+        "id": f"card-{number}",
+        "project_type": "Bathroom Remodel",
+        "project_scope": f"Scope {number}",
+        "timeline": {"start": "next month"},
+        "location": {"city": "Austin", "state": "TX"},
+    }, **fields)
+
+
+def test_save_bid_cards_writes_chunks(fake_db):
+    result = save_bid_cards("homeowner-1", [make_card(n) for n in range(5)], chunk_size=2)
+    
+    assert result["status"] == "success"
+    assert result["saved"] == 5
+    assert fake_db.round_trips == 3
+    stored = {row["id"]: row for row in fake_db.rows("instabids.bid_cards")}
+    assert stored["card-0"]["timeline"] == {"start": "next month"}
+    assert stored["card-0"]["homeowner_id"] == "homeowner-1"
+
+
+def test_invalid_cards_are_reported_and_skipped(fake_db):
+    invalid = make_card(1)
+    del invalid["timeline"]
+    result = save_bid_cards("homeowner-1", [make_card(0), invalid])
+    
+    assert result["status"] == "partial"
+    assert result["results"][1]["status"] == "error"
+    assert "timeline" in result["results"][1]["error"]
+    assert [row["id"] for row in fake_db.rows("instabids.bid_cards")] == ["card-0"]
+
+
+def test_rejected_chunk_isolates_the_bad_row(fake_db):
+    fake_db.seed("instabids.bid_cards", [dict(make_card(1, project_scope="Other"),
+                                              homeowner_id="someone-else")])
+    result = save_bid_cards("homeowner-1", [make_card(0), make_card(1), make_card(2)])
+    
+    assert [entry["status"] for entry in result["results"]] == ["success", "error", "success"]
+    assert result["failed"] == 1
+    stored = {row["id"]: row for row in fake_db.rows("instabids.bid_cards")}
+    assert stored["card-1"]["homeowner_id"] == "someone-else"
+
+
+def test_resaving_identical_cards_counts_as_saved(fake_db):
+    cards = [make_card(0), make_card(1)]
+    assert save_bid_cards("homeowner-1", cards)["saved"] == 2
+    
+    result = save_bid_cards("homeowner-1", cards + [make_card(2)])
+    assert result["status"] == "success"
+    assert result["saved"] == 3
+
+
+def test_transport_error_reports_chunk_as_unknown(fake_db, monkeypatch):
+    calls = []
+    
+    def timeout(query):
+        calls.append(query)
+        raise TimeoutError("read timed out")
+    
+    monkeypatch.setattr(fake_db, "execute", timeout)
+    result = save_bid_cards("homeowner-1", [make_card(n) for n in range(4)])
+    
+    # One request, no row-by-row retries of a chunk that may have been applied
+    assert len(calls) == 1
+    assert result["status"] == "error"
+    assert result["unknown"] == 4
+    assert result["failed"] == 0
+    assert {entry["status"] for entry in result["results"]} == {"unknown"}
+
+
+def test_upsert_updates_existing_cards(fake_db):
+    save_bid_cards("homeowner-1", [make_card(0)])
+    result = save_bid_cards("homeowner-1", [make_card(0, project_scope="Changed")], upsert=True)
+    
+    assert result["status"] == "success"
+    assert fake_db.rows("instabids.bid_cards")[0]["project_scope"] == "Changed"
+
+
+def test_get_bid_cards_decodes_legacy_json_strings(fake_db):
+    save_bid_cards("homeowner-1", [make_card(0)])
+    fake_db.seed("instabids.bid_cards", [dict(
+        make_card(1), homeowner_id="homeowner-1", timeline=json.dumps({"start": "soon"})
+    )])
+    
+    assert get_bid_card("card-1")["bid_card"]["timeline"] == {"start": "soon"}
+    result = get_bid_cards(["card-1", "card-0", "missing"])
+    assert [card["id"] for card in result["bid_cards"]] == ["card-1", "card-0"]
+    assert result["missing"] == ["missing"]
+
+def test_find_contractors_caps_and_validates_radius(monkeypatch):
+    searches = []
+    index = SimpleNamespace(search=lambda *args, **kwargs: searches.append(kwargs) or [])
+    monkeypatch.setattr(database_tools, "get_contractor_index", lambda: index)
+    location = {"city": "Austin", "state": "TX", "zip": "78701"}
+    
+    assert find_contractors("roofing", location, radius_miles=6000)["status"] == "success"
+    assert searches[-1]["radius_miles"] == database_tools._MAX_RADIUS_MILES
+    
+    for radius in (0, -5, float("nan")):
+        result = find_contractors("roofing", location, radius_miles=radius)
+        assert result["status"] == "error"
+        assert "radius_miles" in result["error"]
+    assert len(searches) == 1
+
+def test_async_find_contractors_caps_radius(monkeypatch):
+    searches = []
+    index = SimpleNamespace(
+        needs_refresh=lambda: False,
+        search=lambda *args, **kwargs: searches.append(kwargs) or []
+    )
+    monkeypatch.setattr(async_database_tools, "get_contractor_index", lambda: index)
+    location = {"city": "Austin", "state": "TX", "zip": "78701"}
+    
+    result = asyncio.run(async_database_tools.find_contractors("roofing", location, radius_miles=1e6))
+    assert result["status"] == "success"
+    assert searches[-1]["radius_miles"] == database_tools._MAX_RADIUS_MILES
+    result = asyncio.run(async_database_tools.find_contractors("roofing", location, radius_miles=0))
+    assert result["status"] == "error"
\ No newline at end of file
@@ -0,0 +1,86 @@
+"""
+Unit tests for database call metrics and tagging.
+"""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from instabids.sessions.memory_service import SupabaseMemoryService
+from instabids.tools.database_tools import get_bid_card
+from instabids.utils.db_metrics import (
+    DbMetrics,
+    _tags,
+    db_session,
+    db_tags,
+    db_tool,
+    get_db_metrics,
+    track_round_trips,
+)
+
+
+@pytest.fixture
+def calls():
+    recorded = []
+    get_db_metrics().add_listener(recorded.append)
+    yield recorded
+    get_db_metrics().remove_listener(recorded.append)
+
+
+def test_payload_sizes_are_not_measured_by_default():
+    assert DbMetrics().measure_payloads is False
+
+
+def test_db_session_reads_session_id_or_session_argument():
+    class Service:
+        @db_session
+        def by_id(self, app_name, user_id, session_id):
+            return get_tags()
+        
+        @db_session
+        def by_session(self, session, event=None):
+            return get_tags()
+    
+    def get_tags():
+        return dict(_tags.get())
+    
+    service = Service()
+    assert service.by_id("app", "user", "s1")["session_id"] == "s1"
+    assert service.by_id("app", "user", session_id="s2")["session_id"] == "s2"
+    assert service.by_session(SimpleNamespace(id="s3"))["session_id"] == "s3"
+    with db_tags(tool="save_bid_card"):
+        assert service.by_id("app", "user", "s4") == {"tool": "save_bid_card", "session_id": "s4"}
+
+
+def test_db_session_requires_a_session_parameter():
+    with pytest.raises(TypeError):
+        db_session(lambda self, app_name: None)
+
+
+def test_supabase_memory_service_tags_calls_with_session_id(fake_db, calls):
+    service = SupabaseMemoryService()
+    calls.clear()
+    
+    session = service.create_session("app", "user", {"step": 1})
+    service.append_event(session, SimpleNamespace(
+        invocation_id="inv", author="user", timestamp=1.0, content=None,
+        actions=SimpleNamespace(state_delta={"step": 2})
+    ))
+    service.get_session("app", "user", session.id)
+    list(service.iter_events("app", "user", session.id))
+    
+    assert calls
+    assert {call.session_id for call in calls} == {session.id}
+
+
+def test_db_tool_and_round_trips(fake_db, calls):
+    @db_tool
+    async def lookup():
+        return await asyncio.to_thread(get_bid_card, "missing")
+    
+    with track_round_trips("turn") as trips:
+        asyncio.run(lookup())
+    
+    assert trips.round_trips == 1
+    assert trips.by_query == {"instabids.bid_cards select": 1}
+    assert calls[-1].tool == "get_bid_card"
\ No newline at end of file
@@ -0,0 +1,105 @@
+"""
+Unit tests for EventBuffer.
+"""
+import pytest
+
+from instabids.sessions.event_buffer import EventBuffer
+
+
+class RejectedError(Exception):
+    """Stand-in for a PostgREST error carrying a SQLSTATE."""
+    
+    def __init__(self, code):
+        super().__init__(f"rejected with {code}")
+        self.code = code
+
+
+class RecordingStore:
+    """Flush function that records written rows and fails for chosen sessions."""
+    
+    def __init__(self):
+        self.rows = []
+        self.state_deltas = {}
+        self.rejected = set()
+        self.unreachable = False
+    
+    def __call__(self, rows, state_deltas):
+        if self.unreachable:
+            raise ConnectionError("connection reset")
+        for row in rows:
+            if row["session_id"] in self.rejected:
+                raise RejectedError("23503")
+        self.rows.extend(rows)
+        self.state_deltas.update(state_deltas)
+
+
+def make_buffer(store, **kwargs):
+    # Thresholds high enough that only explicit flushes write
+    return EventBuffer(store, max_batch_size=1000, max_delay_seconds=60, **kwargs)
+
+
+def test_flush_writes_rows_in_append_order():
+    store = RecordingStore()
+    buffer = make_buffer(store)
+    for index in range(3):
+        buffer.enqueue("a", {"session_id": "a", "n": index}, {"step": index})
+    
+    assert buffer.flush() == 3
+    assert [row["n"] for row in store.rows] == [0, 1, 2]
+    assert store.state_deltas == {"a": {"step": 2}}
+    buffer.close()
+
+
+def test_rejected_session_does_not_block_other_sessions():
+    store = RecordingStore()
+    store.rejected.add("bad")
+    buffer = make_buffer(store, max_attempts=2)
+    buffer.enqueue("bad", {"session_id": "bad"})
+    buffer.enqueue("good", {"session_id": "good"})
+    
+    with pytest.raises(RejectedError):
+        buffer.flush()
+    assert store.rows == [{"session_id": "good"}]
+    assert buffer.stats()["queue_depth"] == 1
+    
+    # Second rejection reaches max_attempts: dead-lettered, not raised
+    buffer.enqueue("good", {"session_id": "good"})
+    assert buffer.flush() == 1
+    stats = buffer.stats()
+    assert stats["queue_depth"] == 0
+    assert stats["events_dead_lettered"] == 1
+    assert [entry["session_id"] for entry in buffer.dead_letters()] == ["bad"]
+    buffer.close()
+
+
+def test_transport_errors_are_retried_without_dead_lettering():
+    store = RecordingStore()
+    store.unreachable = True
+    buffer = make_buffer(store, max_attempts=1)
+    buffer.enqueue("a", {"session_id": "a"})
+    buffer.enqueue("b", {"session_id": "b"})
+    
+    for _ in range(3):
+        with pytest.raises(ConnectionError):
+            buffer.flush()
+    assert buffer.stats()["events_dead_lettered"] == 0
+    assert buffer.stats()["queue_depth"] == 2
+    
+    store.unreachable = False
+    assert buffer.flush() == 2
+    buffer.close()
+
+
+def test_requeued_events_keep_their_order():
+    store = RecordingStore()
+    store.unreachable = True
+    buffer = make_buffer(store)
+    buffer.enqueue("a", {"session_id": "a", "n": 0})
+    with pytest.raises(ConnectionError):
+        buffer.flush()
+    
+    buffer.enqueue("a", {"session_id": "a", "n": 1})
+    store.unreachable = False
+    assert buffer.flush() == 2
+    assert [row["n"] for row in store.rows] == [0, 1]
+    buffer.close()
\ No newline at end of file
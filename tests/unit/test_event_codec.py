@@ -0,0 +1,138 @@
+"""
+Unit tests for BinaryEventCodec.
+"""
+import json
+import os
+import struct
+from types import SimpleNamespace
+
+import pytest
+
+from instabids.sessions import event_codec
+from instabids.sessions.event_codec import BinaryEventCodec, from_bytea, to_bytea
+
+
+class Part:
+    """Pydantic-like model for the model tag tests."""
+    
+    def __init__(self, text, data=None):
+        self.text = text
+        self.data = data
+    
+    def model_dump(self, exclude_none=False):
+        dumped = {"text": self.text, "data": self.data}
+        if exclude_none:
+            dumped = {key: value for key, value in dumped.items() if value is not None}
+        return dumped
+    
+    @classmethod
+    def model_validate(cls, fields):
+        return cls(**fields)
+
+
+@pytest.fixture
+def trusted_tests(monkeypatch):
+    """Trust the classes of this module."""
+    monkeypatch.setattr(event_codec, "_TRUSTED_MODULE_PREFIXES", (__name__,))
+
+
+@pytest.fixture(autouse=True)
+def fresh_class_cache(monkeypatch):
+    monkeypatch.setattr(event_codec, "_model_classes", {})
+
+
+def test_round_trip_keeps_json_data():
+    codec = BinaryEventCodec()
+    payload = {
+        "content": {"role": "user", "parts": [{"text": "Replace the tub"}]},
+        "actions": {"state_delta": {"step": 2, "done": False, "score": 0.5, "note": None}},
+    }
+    assert codec.decode(codec.encode(payload)) == payload
+
+
+def test_round_trip_normalizes_non_json_types():
+    codec = BinaryEventCodec()
+    payload = {
+        "content": ("a", "b"),
+        "actions": SimpleNamespace(state_delta={1: "one"}),
+        # A dict that already uses the tag key is escaped, not mistaken for a tag
+        "tagged": {"__t": "bytes", "v": "not base64"},
+    }
+    assert codec.decode(codec.encode(payload)) == {
+        "content": ["a", "b"],
+        "actions": {"state_delta": {"1": "one"}},
+        "tagged": {"__t": "bytes", "v": "not base64"},
+    }
+
+
+def test_bytes_round_trip():
+    codec = BinaryEventCodec()
+    image = os.urandom(64)
+    decoded = codec.decode(codec.encode({"content": {"data": image, "more": bytearray(b"ab")}}))
+    assert decoded["content"] == {"data": image, "more": b"ab"}
+
+
+def test_payloads_at_threshold_are_compressed():
+    codec = BinaryEventCodec(compress_threshold=100)
+    small = codec.encode({"content": "x" * 10})
+    large_payload = {"content": "repeated words " * 100}
+    large = codec.encode(large_payload)
+    
+    assert small[3] & event_codec._FLAG_ZLIB == 0
+    assert large[3] & event_codec._FLAG_ZLIB
+    assert len(large) < len(json.dumps(large_payload))
+    assert codec.decode(large) == large_payload
+
+
+def test_incompressible_payloads_are_stored_plain():
+    # zlib's own overhead makes a short payload larger
+    codec = BinaryEventCodec(compress_threshold=10)
+    payload = {"content": "abcdefghij"}
+    data = codec.encode(payload)
+    
+    assert data[3] & event_codec._FLAG_ZLIB == 0
+    assert codec.decode(data) == payload
+
+
+def test_bad_header_is_rejected():
+    codec = BinaryEventCodec()
+    with pytest.raises(ValueError, match="too short"):
+        codec.decode(b"IE")
+    with pytest.raises(ValueError, match="header"):
+        codec.decode(b'{"content": null}')
+
+
+def test_newer_format_version_is_rejected():
+    codec = BinaryEventCodec()
+    data = codec.encode({"content": None})
+    newer = struct.pack(">2sBB", b"IE", event_codec._FORMAT_VERSION + 1, 0) + data[4:]
+    with pytest.raises(ValueError, match="version"):
+        codec.decode(newer)
+
+
+def test_trusted_models_are_rebuilt(trusted_tests):
+    codec = BinaryEventCodec()
+    decoded = codec.decode(codec.encode({"content": Part("hello", data=b"\x00\x01")}))
+    
+    assert isinstance(decoded["content"], Part)
+    assert decoded["content"].text == "hello"
+    assert decoded["content"].data == b"\x00\x01"
+
+
+def test_untrusted_models_decode_to_fields():
+    codec = BinaryEventCodec()
+    data = codec.encode({"content": Part("hello")})
+    assert codec.decode(data) == {"content": {"text": "hello"}}
+    
+    # A forged tag naming a module outside the trusted packages is never imported
+    forged = json.dumps({"content": {"__t": "os:system", "v": {"command": "true"}}})
+    data = struct.pack(">2sBB", b"IE", event_codec._FORMAT_VERSION, 0) + forged.encode()
+    assert codec.decode(data) == {"content": {"command": "true"}}
+
+
+def test_bytea_round_trip():
+    data = BinaryEventCodec().encode({"content": "hello"})
+    assert from_bytea(to_bytea(data)) == data
+    assert from_bytea(memoryview(data)) == data
+    with pytest.raises(ValueError):
+        from_bytea("not hex")
\ No newline at end of file
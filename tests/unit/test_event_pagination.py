@@ -0,0 +1,30 @@
+"""
+Unit tests for keyset pagination of stored session events.
+"""
+from instabids.sessions.memory_service import SupabaseMemoryService
+
+from conftest import make_event
+
+
+def test_pages_cover_every_event_once(fake_db):
+    service = SupabaseMemoryService()
+    session = service.create_session("app", "user")
+    for index in range(7):
+        service.append_event(session, make_event(float(index % 3), step=index))
+    
+    events = list(service.iter_events("app", "user", session.id, page_size=2))
+    assert sorted(event["actions"]["state_delta"]["step"] for event in events) == list(range(7))
+    newest = list(service.iter_events("app", "user", session.id, newest_first=True, page_size=3))
+    assert newest == events[::-1]
+
+
+def test_events_without_timestamp_are_paged_once(fake_db):
+    service = SupabaseMemoryService()
+    session = service.create_session("app", "user")
+    for index in range(5):
+        service.append_event(session, make_event(None, step=index))
+    service.append_event(session, make_event(1.0, step=5))
+    
+    assert {row["timestamp"] for row in fake_db.rows("instabids.agent_events")} == {0.0, 1.0}
+    events = list(service.iter_events("app", "user", session.id, page_size=2))
+    assert [event["actions"]["state_delta"]["step"] for event in events] == list(range(6))
\ No newline at end of file
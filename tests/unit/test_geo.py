@@ -0,0 +1,55 @@
+"""
+Unit tests for the geographic helpers and GeoGrid.
+"""
+import random
+import time
+
+from instabids.tools.geo import GeoGrid, haversine_miles, normalize_zip
+
+AUSTIN = (30.2672, -97.7431)
+DALLAS = (32.7767, -96.7970)
+
+
+def test_normalize_zip():
+    assert normalize_zip("78701-1234") == "78701"
+    assert normalize_zip("501") == "00501"
+    assert normalize_zip("abcde") == ""
+
+
+def test_nearest_orders_by_distance_within_radius():
+    grid = GeoGrid()
+    grid.add("austin", [AUSTIN])
+    grid.add("dallas", [DALLAS])
+    grid.add("both", [AUSTIN, DALLAS])
+    
+    matches = grid.nearest(*AUSTIN, radius_miles=50)
+    assert sorted(key for key, _ in matches) == ["austin", "both"]
+    
+    matches = grid.nearest(*DALLAS, radius_miles=300, among=[{"austin", "dallas"}])
+    assert [key for key, _ in matches] == ["dallas", "austin"]
+    assert abs(matches[1][1] - haversine_miles(*AUSTIN, *DALLAS)) < 1e-6
+
+
+def test_large_radius_on_sparse_grid_is_fast():
+    grid = GeoGrid()
+    grid.add("austin", [AUSTIN])
+    
+    started = time.perf_counter()
+    assert [key for key, _ in grid.nearest(*DALLAS, radius_miles=6000)] == ["austin"]
+    assert time.perf_counter() - started < 0.1
+
+
+def test_sparse_scan_matches_ring_walk():
+    rng = random.Random(7)
+    grid = GeoGrid(cell_degrees=0.5)
+    for number in range(300):
+        grid.add(number, [(30 + rng.uniform(-3, 3), -97 + rng.uniform(-3, 3))])
+    
+    # A small radius walks the rings, a large one scans the populated cells
+    near = grid.nearest(30.0, -97.0, radius_miles=40)
+    far = dict(grid.nearest(30.0, -97.0, radius_miles=2000))
+    assert near
+    assert all(abs(far[key] - distance) < 1e-9 for key, distance in near)
+    assert len(far) == 300
+    assert [key for key, _ in grid.nearest(30.0, -97.0, radius_miles=2000, limit=5)] == \
+        [key for key, _ in near[:5]]
\ No newline at end of file
@@ -0,0 +1,144 @@
+"""
+Unit tests for InMemorySessionService.
+"""
+import json
+import os
+import threading
+
+from instabids.sessions import memory_service
+from instabids.sessions.memory_service import InMemorySessionService
+
+from conftest import make_event
+
+
+def test_spilled_session_is_loaded_back():
+    service = InMemorySessionService(max_sessions=1)
+    first = service.create_session("app", "user", {"step": 1})
+    service.create_session("app", "user")
+    
+    assert service.memory_stats()["sessions_spilled"] == 1
+    session = service.get_session("app", "user", first.id)
+    assert session is not None
+    assert session.state["step"] == 1
+    service.close()
+
+
+def test_unpicklable_session_stays_in_memory():
+    service = InMemorySessionService(max_sessions=1)
+    locked = service.create_session("app", "user", {"lock": threading.Lock()})
+    # Spilling the locked session fails; creating another must still succeed
+    other = service.create_session("app", "user")
+    
+    assert service.get_session("app", "user", locked.id) is not None
+    assert service.get_session("app", "user", other.id) is not None
+    assert service.memory_stats()["sessions_in_memory"] == 2
+    assert service.list_sessions("app", "user") == [locked.id, other.id]
+    service.close()
+
+
+def test_unpicklable_session_does_not_block_other_evictions():
+    service = InMemorySessionService(max_sessions=2)
+    locked = service.create_session("app", "user", {"lock": threading.Lock()})
+    spillable = service.create_session("app", "user")
+    service.create_session("app", "user")
+    
+    stats = service.memory_stats()
+    assert stats["sessions_in_memory"] == 2
+    assert stats["sessions_spilled"] == 1
+    assert service.get_session("app", "user", locked.id) is not None
+    assert service.get_session("app", "user", spillable.id) is not None
+    service.close()
+
+
+def test_spilled_events_are_listed_in_order():
+    service = InMemorySessionService(max_events_per_session=2)
+    session = service.create_session("app", "user")
+    for index in range(5):
+        service.append_event(session, make_event(float(index), count=index))
+    
+    events = service.list_events("app", "user", session.id)
+    assert [event.timestamp for event in events] == [0.0, 1.0, 2.0, 3.0, 4.0]
+    assert service.get_session("app", "user", session.id).state["count"] == 4
+    service.close()
+
+
+def test_close_removes_temporary_spill_file():
+    service = InMemorySessionService(max_sessions=1)
+    service.create_session("app", "user")
+    path = service._spill_store.path
+    assert os.path.exists(path)
+    
+    service.close()
+    assert not os.path.exists(path)
+
+
+def test_session_state_serializes_as_plain_dict():
+    service = InMemorySessionService()
+    session = service.create_session("app", "user", {"step": 1})
+    service.append_event(session, make_event(1.0, project="kitchen"))
+    
+    loaded = service.get_session("app", "user", session.id)
+    assert isinstance(loaded.state, dict)
+    assert json.loads(json.dumps(loaded.state)) == {"step": 1, "project": "kitchen"}
+    assert json.loads(loaded.model_dump_json())["state"] == {"step": 1, "project": "kitchen"}
+
+
+def test_session_state_copies_are_isolated():
+    service = InMemorySessionService()
+    session = service.create_session("app", "user", {"step": 1})
+    first = service.get_session("app", "user", session.id)
+    first.state["step"] = 99
+    
+    second = service.get_session("app", "user", session.id)
+    assert second.state == {"step": 1}
+    
+    # The caller's own session object sees the appended delta
+    service.append_event(first, make_event(1.0, done=True))
+    assert first.state == {"step": 99, "done": True}
+    assert service.get_session("app", "user", session.id).state == {"step": 1, "done": True}
+
+def test_expired_sessions_are_found_oldest_activity_first(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(memory_service.time, "time", lambda: now[0])
+    service = InMemorySessionService()
+    sessions = []
+    for _ in range(3):
+        sessions.append(service.create_session("app", "user"))
+        now[0] += 1.0
+    # The first session is active again; the LRU order no longer matches activity
+    service.append_event(sessions[0], make_event(3.0, step=1))
+    service.get_session("app", "user", sessions[1].id)
+    
+    now[0] = 10.0
+    assert service.find_expired_sessions(idle_seconds=8.5) == [sessions[1].id]
+    assert service.find_expired_sessions(idle_seconds=7.5) == [sessions[1].id, sessions[2].id]
+    assert service.find_expired_sessions(idle_seconds=7.5, limit=1) == [sessions[1].id]
+    
+    assert service.delete_sessions([sessions[1].id], idle_seconds=7.5) == [sessions[1].id]
+    assert service.find_expired_sessions(idle_seconds=5.0) == [sessions[2].id, sessions[0].id]
+
+
+def test_activity_index_stays_bounded():
+    service = InMemorySessionService()
+    session = service.create_session("app", "user")
+    for index in range(500):
+        service.append_event(session, make_event(float(index)))
+    
+    assert len(service._activity_heap) <= 2 * len(service.sessions) + 64
+    assert service.find_expired_sessions(idle_seconds=-1) == [session.id]
+
+
+def test_backward_page_after_the_oldest_event_is_empty():
+    service = InMemorySessionService()
+    session = service.create_session("app", "user")
+    for index in range(3):
+        service.append_event(session, make_event(float(index)))
+    
+    page = service.list_events_page("app", "user", session.id, limit=3, newest_first=True)
+    assert [event.timestamp for event in page.events] == [2.0, 1.0, 0.0]
+    
+    last = service.list_events_page(
+        "app", "user", session.id, cursor=page.next_cursor, newest_first=True
+    )
+    assert last.events == []
+    assert last.next_cursor is None
\ No newline at end of file
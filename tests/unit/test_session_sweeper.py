@@ -0,0 +1,39 @@
+"""
+Unit tests for SessionSweeper.
+"""
+from types import SimpleNamespace
+
+from instabids.sessions.memory_service import InMemorySessionService
+from instabids.sessions.session_cache import CachedSessionService
+from instabids.sessions.session_sweeper import SessionSweeper
+
+
+def test_sweep_deletes_in_batches():
+    service = InMemorySessionService()
+    for _ in range(5):
+        service.create_session("app", "user")
+    sweeper = SessionSweeper(service, idle_seconds=1e-9, batch_size=2, pause_seconds=0)
+    
+    assert sweeper.sweep_once() == 5
+    assert sweeper.stats()["batches"] == 3
+    assert service.list_sessions("app", "user") == []
+
+
+def test_sweep_through_cache_drops_cached_sessions():
+    cache = CachedSessionService(InMemorySessionService(), ttl_seconds=3600)
+    expired = cache.create_session("app", "user", {"step": 1})
+    assert cache.get_session("app", "user", expired.id) is not None
+    
+    sweeper = SessionSweeper(cache, idle_seconds=1e-9, pause_seconds=0)
+    assert sweeper.sweep_once() == 1
+    assert cache.get_session("app", "user", expired.id) is None
+    assert cache.stats()["size"] == 0
+
+
+def test_cache_keeps_sessions_the_service_skips():
+    service = SimpleNamespace(delete_sessions=lambda session_ids, idle_seconds=None: [])
+    cache = CachedSessionService(service)
+    cache._store(SimpleNamespace(id="s1", app_name="app", user_id="user", state={}))
+    
+    assert cache.delete_sessions(["s1"], idle_seconds=60) == []
+    assert cache.stats()["size"] == 1
\ No newline at end of file
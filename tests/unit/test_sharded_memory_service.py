@@ -0,0 +1,124 @@
+"""
+Unit and multithreaded stress tests for ShardedInMemorySessionService.
+"""
+import sys
+import threading
+
+import pytest
+
+from instabids.sessions.sharded_memory_service import ShardedInMemorySessionService
+
+from conftest import make_event
+
+THREADS = 8
+EVENTS_PER_THREAD = 200
+
+
+def run_threads(target, count=THREADS):
+    """Run target(index) on count threads started together; re-raise the first error."""
+    barrier = threading.Barrier(count)
+    errors = []
+    
+    def run(index):
+        barrier.wait()
+        try:
+            target(index)
+        except Exception as e:
+            errors.append(e)
+    
+    threads = [threading.Thread(target=run, args=(index,)) for index in range(count)]
+    # Switch threads far more often than usual to shake out races
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-5)
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(switch_interval)
+    if errors:
+        raise errors[0]
+
+
+def test_rejects_zero_shards():
+    with pytest.raises(ValueError):
+        ShardedInMemorySessionService(num_shards=0)
+
+
+def test_concurrent_appends_to_shared_sessions_are_not_lost():
+    service = ShardedInMemorySessionService(num_shards=4)
+    sessions = [service.create_session("app", "user") for _ in range(4)]
+    
+    def append(index):
+        for number in range(EVENTS_PER_THREAD):
+            session = sessions[number % len(sessions)]
+            service.append_event(session, make_event(float(number), **{f"t{index}": number}))
+    
+    run_threads(append)
+    
+    total = 0
+    for session in sessions:
+        events = service.list_events("app", "user", session.id)
+        total += len(events)
+        state = service.get_session("app", "user", session.id).state
+        assert set(state) == {f"t{index}" for index in range(THREADS)}
+    assert total == THREADS * EVENTS_PER_THREAD
+
+
+def test_concurrent_sessions_with_spilling():
+    service = ShardedInMemorySessionService(
+        num_shards=4, max_sessions=8, max_events_per_session=5
+    )
+    created = [[] for _ in range(THREADS)]
+    
+    def work(index):
+        user_id = f"user-{index}"
+        for number in range(20):
+            session = service.create_session("app", user_id, {"number": number})
+            created[index].append(session.id)
+            for step in range(8):
+                service.append_event(session, make_event(float(step), step=step))
+        # Read everything back, loading spilled sessions and events from disk
+        for number, session_id in enumerate(created[index]):
+            session = service.get_session("app", user_id, session_id)
+            assert session.state == {"number": number, "step": 7}
+            assert len(service.list_events("app", user_id, session_id)) == 8
+    
+    run_threads(work)
+    
+    for index in range(THREADS):
+        assert service.list_sessions("app", f"user-{index}") == created[index]
+    stats = service.memory_stats()
+    assert stats["sessions_in_memory"] + stats["sessions_spilled"] == THREADS * 20
+    service.close()
+
+
+def test_concurrent_create_and_delete():
+    service = ShardedInMemorySessionService(num_shards=4)
+    
+    def churn(index):
+        user_id = f"user-{index}"
+        for _ in range(100):
+            session = service.create_session("app", user_id)
+            service.append_event(session, make_event(1.0, seen=True))
+            assert service.delete_session("app", user_id, session.id)
+    
+    run_threads(churn)
+    
+    stats = service.memory_stats()
+    assert stats["sessions_in_memory"] == 0
+    for index in range(THREADS):
+        assert service.list_sessions("app", f"user-{index}") == []
+
+def test_paging_backward_ends_at_the_oldest_event():
+    service = ShardedInMemorySessionService(num_shards=2)
+    session = service.create_session("app", "user")
+    for number in range(5):
+        service.append_event(session, make_event(float(number), step=number))
+    
+    # A limit stops the iteration even if the last page is returned again
+    events = list(service.iter_events(
+        "app", "user", session.id, limit=20, newest_first=True, page_size=1
+    ))
+    assert [event.timestamp for event in events] == [4.0, 3.0, 2.0, 1.0, 0.0]
\ No newline at end of file
@@ -0,0 +1,112 @@
+"""
+Unit tests for SqliteSessionService.
+"""
+import sqlite3
+import threading
+
+import pytest
+
+from instabids.sessions.sqlite_session_service import SqliteSessionService
+
+from conftest import make_event
+
+
+@pytest.fixture
+def service(tmp_path):
+    service = SqliteSessionService(str(tmp_path / "sessions.sqlite"))
+    yield service
+    service.close()
+
+
+def test_append_event_merges_state(service):
+    session = service.create_session("app", "user", {"step": 1})
+    service.append_event(session, make_event(1.0, project="kitchen"))
+    service.append_event(session, make_event(2.0, step=2))
+    
+    loaded = service.get_session("app", "user", session.id)
+    assert loaded.state == {"step": 2, "project": "kitchen"}
+    assert len(service.list_events("app", "user", session.id)) == 2
+
+
+def test_append_event_to_missing_session_is_ignored(service):
+    session = service.create_session("app", "user")
+    assert service.delete_session("app", "user", session.id)
+    
+    # Logged and ignored like InMemorySessionService, not an IntegrityError
+    assert service.append_event(session, make_event(1.0, step=1)) is None
+    assert service.list_events("app", "user", session.id) == []
+    
+    # The connection is usable again afterwards
+    other = service.create_session("app", "user")
+    service.append_event(other, make_event(1.0, step=1))
+    assert service.get_session("app", "user", other.id).state == {"step": 1}
+
+
+def test_concurrent_appends_keep_every_key(service):
+    session = service.create_session("app", "user")
+    
+    def append(index):
+        for number in range(20):
+            service.append_event(session, make_event(float(number), **{f"t{index}-{number}": 1}))
+    
+    threads = [threading.Thread(target=append, args=(index,)) for index in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert len(service.get_session("app", "user", session.id).state) == 80
+    assert len(service.list_events("app", "user", session.id)) == 80
+
+
+def test_pages_cover_every_event_once(service):
+    session = service.create_session("app", "user")
+    for number in range(25):
+        service.append_event(session, make_event(float(number % 5)))
+    
+    events = list(service.iter_events("app", "user", session.id, page_size=7))
+    assert len(events) == 25
+    assert [event["timestamp"] for event in events] == sorted(number % 5 for number in range(25))
+
+
+def test_expired_sessions_are_found_and_deleted(service):
+    session = service.create_session("app", "user")
+    assert service.find_expired_sessions(idle_seconds=3600) == []
+    assert service.find_expired_sessions(idle_seconds=-1) == [session.id]
+    assert service.delete_sessions([session.id]) == [session.id]
+    assert service.get_session("app", "user", session.id) is None
+
+def test_events_without_timestamp_are_paged(service):
+    session = service.create_session("app", "user")
+    for number in range(5):
+        service.append_event(session, make_event(None, step=number))
+    
+    events = list(service.iter_events("app", "user", session.id, page_size=2))
+    assert [event["actions"]["state_delta"]["step"] for event in events] == list(range(5))
+    
+    page = service.list_events_page("app", "user", session.id, limit=2)
+    assert page.next_cursor.timestamp == 0.0
+    rest = service.list_events_page("app", "user", session.id, cursor=page.next_cursor, limit=10)
+    assert len(rest.events) == 3
+
+
+def test_null_timestamps_of_older_databases_are_backfilled(tmp_path):
+    path = str(tmp_path / "old.sqlite")
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE agent_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id TEXT NOT NULL,
+            invocation_id TEXT,
+            author TEXT,
+            timestamp REAL,
+            event_blob BLOB NOT NULL
+        );
+        INSERT INTO agent_events (session_id, timestamp, event_blob) VALUES ('s1', NULL, x'00');
+    """)
+    conn.close()
+    
+    service = SqliteSessionService(path)
+    timestamps = service._conn().execute("SELECT timestamp FROM agent_events").fetchall()
+    assert timestamps == [(0.0,)]
+    service.close()
\ No newline at end of file
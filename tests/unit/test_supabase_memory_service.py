@@ -0,0 +1,57 @@
+"""
+Unit tests for the optimistic-concurrency guard of the Supabase session services.
+"""
+import asyncio
+
+import pytest
+
+from google.adk.session import Session
+
+from instabids.sessions.async_memory_service import AsyncSupabaseMemoryService
+from instabids.sessions.memory_service import SessionConflictError, SupabaseMemoryService
+
+from conftest import make_event
+
+
+def test_version_guard_follows_the_session_object(fake_db):
+    writer = SupabaseMemoryService()
+    session = writer.create_session("app", "user")
+    stale = writer.get_session("app", "user", session.id)
+    
+    # A service that never loaded the session still guards its appends
+    other = SupabaseMemoryService()
+    other.append_event(session, make_event(1.0, step=1))
+    other.append_event(session, make_event(2.0, step=2))
+    
+    with pytest.raises(SessionConflictError):
+        other.append_event(stale, make_event(3.0, step=3))
+    assert writer.get_session("app", "user", session.id).state == {"step": 2}
+
+
+def test_session_from_elsewhere_is_guarded_at_the_stored_version(fake_db):
+    service = SupabaseMemoryService()
+    session = service.create_session("app", "user")
+    service.append_event(session, make_event(1.0, step=1))
+    
+    # e.g. rebuilt by a read-through cache, so it carries no version
+    copy = Session(id=session.id, app_name="app", user_id="user", state={"step": 1})
+    service.append_event(copy, make_event(2.0, step=2))
+    
+    with pytest.raises(SessionConflictError):
+        service.append_event(session, make_event(3.0, step=3))
+
+
+def test_async_version_guard_follows_the_session_object(fake_db):
+    async def scenario():
+        writer = await AsyncSupabaseMemoryService.create()
+        session = await writer.create_session("app", "user")
+        stale = await writer.get_session("app", "user", session.id)
+        
+        other = await AsyncSupabaseMemoryService.create()
+        await other.append_event(session, make_event(1.0, step=1))
+        
+        with pytest.raises(SessionConflictError):
+            await other.append_event(stale, make_event(2.0, step=2))
+        return await writer.get_session("app", "user", session.id)
+    
+    assert asyncio.run(scenario()).state == {"step": 1}
\ No newline at end of file